@@ -1,2 +1 @@
-$files = Get-Childitem -Recurse -Force *.BF
-ForEach ($file in $files) {PersonaEditorCMD.exe $file -expptp /sub}
\ No newline at end of file
+python PEditorMSG.py ptp --type BF .
\ No newline at end of file
@@ -1,2 +1 @@
-$files = Get-Childitem -Recurse -Force *.BMD
-ForEach ($file in $files) {PersonaEditorCMD.exe $file -expptp /sub}
\ No newline at end of file
+python PEditorMSG.py ptp --type BMD .
\ No newline at end of file
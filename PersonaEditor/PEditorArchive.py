@@ -0,0 +1,257 @@
+"""Índice dos contêineres BIN (BIN, PAK, PAC, P00, ARC) da pasta IN/, sem extrair nada.
+
+Os arquivos são lidos por mmap e o índice guarda, para cada subarquivo (inclusive os de
+contêineres dentro de contêineres), o arquivo de origem, o offset absoluto, o tamanho e o
+tipo. O índice fica em disco (IN/.arc_index.json) e só os arquivos cujo mtime/tamanho
+mudou são relidos.
+
+Formatos reconhecidos:
+  CNT32: u32 nº de entradas; cada entrada = nome (32 bytes) + u32 tamanho + dados.
+  PAK252: nome (252 bytes) + u32 tamanho + dados, alinhado em 64 bytes; termina com nome vazio.
+
+Uso: python PEditorArchive.py [PASTA_IN] [--find NOME] [--type BF] [--rebuild]
+"""
+import argparse
+import fnmatch
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+INDEX_NAME = ".arc_index.json"
+INDEX_VERSION = 1
+CONTAINER_EXTS = {"BIN", "PAK", "PAC", "P00", "ARC", "PACK"}
+MAX_ENTRIES = 10000
+# Assinatura no offset 8 dos formatos da Atlus que o PersonaEditor abre.
+MAGICS = {b"FLW0": "BF", b"MSG1": "BMD", b"PMD1": "PM1", b"TMX0": "TMX", b"SPR0": "SPR"}
+
+ArchiveEntry = namedtuple("ArchiveEntry", "archive path offset length type")
+
+
+def _name(buf, offset, size):
+    raw = bytes(buf[offset:offset + size]).split(b'\0', 1)[0]
+    if not raw or any(c < 0x20 or c > 0x7e for c in raw):
+        return None
+    return raw.decode('ascii')
+
+
+def _zero_tail(buf, start, end):
+    return start >= end or not bytes(buf[start:end]).strip(b'\0')
+
+
+def _parse_cnt32(buf, start, end):
+    if end - start < 40:
+        return None
+    count, = struct.unpack_from('<I', buf, start)
+    if not 0 < count <= MAX_ENTRIES:
+        return None
+    entries = []; offset = start + 4
+    for _ in range(count):
+        if offset + 36 > end:
+            return None
+        name = _name(buf, offset, 32)
+        size, = struct.unpack_from('<I', buf, offset + 32)
+        if name is None or offset + 36 + size > end:
+            return None
+        entries.append((name, offset + 36, size))
+        offset += 36 + size
+    return entries if _zero_tail(buf, offset, end) else None
+
+
+def _parse_pak252(buf, start, end):
+    entries = []; offset = start
+    while offset + 256 <= end:
+        if not buf[offset]:
+            break
+        name = _name(buf, offset, 252)
+        size, = struct.unpack_from('<I', buf, offset + 252)
+        if name is None or offset + 256 + size > end:
+            return None
+        entries.append((name, offset + 256, size))
+        offset = start + ((offset - start + 256 + size + 63) & ~63)
+    return entries if entries and _zero_tail(buf, offset, end) else None
+
+
+def detect_container(buf, start=0, end=None):
+    """(formato, [(nome, offset, tamanho)]) do contêiner em buf[start:end], ou (None, None)."""
+    end = len(buf) if end is None else end
+    for kind, parse in (("CNT32", _parse_cnt32), ("PAK252", _parse_pak252)):
+        entries = parse(buf, start, end)
+        if entries:
+            return kind, entries
+    return None, None
+
+
+def parse_container(buf, start=0, end=None):
+    """[(nome, offset, tamanho)] do contêiner em buf[start:end], ou None se não for um."""
+    return detect_container(buf, start, end)[1]
+
+
+def _extension(name):
+    return os.path.splitext(name)[1][1:].upper()
+
+
+def entry_type(name, buf, offset, length):
+    """Tipo pela assinatura (BF, BMD, PM1...) ou, sem assinatura conhecida, pela extensão."""
+    if length >= 12:
+        kind = MAGICS.get(bytes(buf[offset + 8:offset + 12]))
+        if kind:
+            return kind
+    return _extension(name) or "HEX"
+
+
+def _walk(buf, archive, prefix, start, end, out):
+    for name, offset, length in parse_container(buf, start, end) or ():
+        path = f"{prefix}/{name}" if prefix else name
+        if _extension(name) in CONTAINER_EXTS and parse_container(buf, offset, offset + length):
+            out.append(ArchiveEntry(archive, path, offset, length, "BIN"))
+            _walk(buf, archive, path, offset, offset + length, out)
+        else:
+            out.append(ArchiveEntry(archive, path, offset, length, entry_type(name, buf, offset, length)))
+
+
+def scan_archive(path, archive=None):
+    """Todas as entradas (recursivas) de um contêiner; lista vazia se não for um."""
+    archive = archive or path
+    out = []
+    if os.path.getsize(path) == 0:
+        return out
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        _walk(m, archive, "", 0, len(m), out)
+    return out
+
+
+@contextmanager
+def open_entry(path, entry):
+    """memoryview só leitura do subarquivo `entry` dentro de `path`, válido dentro do with."""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        whole = memoryview(m)
+        view = whole[entry.offset:entry.offset + entry.length]
+        try:
+            yield view
+        finally:
+            view.release(); whole.release()
+
+
+def _stamp(st):
+    return [st.st_mtime_ns, st.st_size]
+
+
+class ArchiveIndex:
+    """Índice persistente nome do subarquivo -> ArchiveEntry de todos os contêineres de `root`."""
+
+    def __init__(self, root, index_path=None):
+        self.root = root
+        self.index_path = index_path or os.path.join(root, INDEX_NAME)
+        self.archives = {}  # caminho relativo -> {"stamp": [mtime_ns, tamanho], "entries": [...]}
+        self._by_name = None
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                self.archives = data.get("archives", {})
+        except (OSError, ValueError):
+            self.archives = {}
+
+    def save(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": INDEX_VERSION, "archives": self.archives}, f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+
+    def _containers(self, directory):
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    yield from self._containers(entry.path)
+                elif entry.is_file() and _extension(entry.name) in CONTAINER_EXTS:
+                    yield entry
+
+    def refresh(self):
+        """Relê só os contêineres novos ou alterados; devolve quantos foram relidos."""
+        seen = set(); changed = 0
+        for entry in self._containers(self.root):
+            rel = os.path.relpath(entry.path, self.root).replace(os.sep, '/')
+            seen.add(rel)
+            stamp = _stamp(entry.stat())
+            cached = self.archives.get(rel)
+            if cached and cached["stamp"] == stamp:
+                continue
+            entries = scan_archive(entry.path, rel)
+            self.archives[rel] = {"stamp": stamp, "entries": [list(e[1:]) for e in entries]}
+            changed += 1
+        for rel in set(self.archives) - seen:
+            del self.archives[rel]; changed += 1
+        if changed:
+            self._by_name = None
+        return changed
+
+    def entries(self):
+        for rel, data in self.archives.items():
+            for path, offset, length, kind in data["entries"]:
+                yield ArchiveEntry(rel, path, offset, length, kind)
+
+    def find(self, name):
+        """Entradas cujo nome (sem a pasta) é `name`, sem diferenciar maiúsculas."""
+        if self._by_name is None:
+            by_name = {}
+            for entry in self.entries():
+                by_name.setdefault(entry.path.rsplit('/', 1)[-1].lower(), []).append(entry)
+            self._by_name = by_name
+        return self._by_name.get(name.lower(), [])
+
+    def glob(self, pattern, kind=None):
+        """Entradas cujo caminho interno casa com `pattern` (fnmatch, sem diferenciar maiúsculas)."""
+        pattern = pattern.lower()
+        return [e for e in self.entries()
+                if (kind is None or e.type == kind) and fnmatch.fnmatchcase(e.path.lower(), pattern)]
+
+    def archive_path(self, entry):
+        return os.path.join(self.root, entry.archive)
+
+    def open(self, entry):
+        """with index.open(entry) as view: ... — memoryview do subarquivo, sem extrair."""
+        return open_entry(self.archive_path(entry), entry)
+
+    def read(self, entry):
+        with self.open(entry) as view:
+            return bytes(view)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Indexa os contêineres BIN/PAC/ARC da pasta IN sem extrair os arquivos.")
+    parser.add_argument("root", nargs="?", default=os.path.join("..", "IN"), help="Pasta dos arquivos originais (padrão: %(default)s)")
+    parser.add_argument("--index", default=None, help=f"Arquivo do índice (padrão: ROOT/{INDEX_NAME})")
+    parser.add_argument("--find", default=None, help="Nome ou padrão (ex.: *.bf) dos subarquivos a listar")
+    parser.add_argument("--type", default=None, help="Filtra pelo tipo (BF, BMD, PM1, SPR...)")
+    parser.add_argument("--rebuild", action="store_true", help="Ignora o índice salvo e relê tudo")
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.root):
+        parser.error(f"pasta não encontrada: {args.root}")
+
+    start = time.perf_counter()
+    index = ArchiveIndex(args.root, args.index)
+    if args.rebuild:
+        index.archives = {}
+    changed = index.refresh()
+    if changed:
+        index.save()
+    entries = list(index.entries())
+    print(f"{len(index.archives)} contêiner(es), {len(entries)} subarquivo(s); "
+          f"{changed} relido(s) em {time.perf_counter() - start:.2f}s.")
+    if args.find or args.type:
+        kind = args.type.upper() if args.type else None
+        for entry in index.glob(args.find or "*", kind):
+            print(f"{entry.archive}\t{entry.path}\t{entry.offset}\t{entry.length}\t{entry.type}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""Execução em lote do PersonaEditorCMD.exe, independente da interface Qt."""
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PEditorProfile import Timing, communicate
+
+
+def default_workers():
+    """Número padrão de processos simultâneos (quantidade de CPUs)."""
+    return os.cpu_count() or 1
+
+
+def build_command(exe_path, file_path, base_args, import_file=None):
+    """Monta a linha de comando final de um arquivo a partir dos argumentos base."""
+    command_and_args = list(base_args)
+    main_cmd = command_and_args.pop(0)
+    final_command = [exe_path, os.path.basename(file_path), main_cmd]
+    if main_cmd == "-imptext" and import_file:
+        final_command.append(import_file)
+    final_command.extend(command_and_args)
+    return final_command
+
+
+def format_command(command):
+    return ' '.join(f'"{c}"' if ' ' in c else c for c in command)
+
+
+def output_path(file_path, base_args):
+    """Arquivo que o PersonaEditorCMD grava para `file_path` com estes argumentos.
+
+    O -exptext acrescenta ao <nome>.TXT e o -expptp grava <nome>.PTP, ao lado do
+    arquivo (NOME.BF e NOME.PM1 na mesma pasta escrevem no mesmo). O -save grava
+    <nome>(NEW).<ext>, ou o próprio arquivo com /ovrw. Nos demais comandos a chave é o
+    próprio arquivo de entrada.
+    """
+    command = base_args[0] if base_args else ""
+    stem, ext = os.path.splitext(file_path)
+    if command == "-exptext":
+        return stem + ".TXT"
+    if command == "-expptp":
+        return stem + ".PTP"
+    if "-save" in base_args and "/ovrw" not in base_args:
+        return f"{stem}(NEW){ext}"
+    return file_path
+
+
+def output_key(file_path, base_args):
+    """Chave do arquivo que o comando vai escrever; jobs com a mesma chave rodam em sequência no mesmo grupo."""
+    return os.path.normcase(os.path.realpath(output_path(file_path, base_args))).lower()
+
+
+class Job:
+    def __init__(self, file_path, command, cwd=None, key=None, args=None):
+        self.file_path = file_path
+        self.command = command
+        self.args = args if args is not None else command[1:]  # argumentos da ferramenta, sem o executável
+        self.cwd = cwd if cwd is not None else os.path.dirname(file_path)
+        self.key = key if key is not None else os.path.normcase(os.path.realpath(file_path))
+
+
+def make_jobs(exe_path, files, base_args, import_file=None):
+    return [Job(f, build_command(exe_path, f, base_args, import_file), key=output_key(f, base_args)) for f in files]
+
+
+def group_jobs(jobs):
+    """Agrupa os jobs pela chave de saída, preservando a ordem original."""
+    groups = {}
+    for job in jobs:
+        groups.setdefault(job.key, []).append(job)
+    return list(groups.values())
+
+
+class Result:
+    def __init__(self, job, returncode=None, stdout="", stderr="", error=None, cancelled=False, timing=None):
+        self.job = job
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.error = error
+        self.cancelled = cancelled
+        self.timing = timing  # Timing do PEditorProfile; None se o processo não chegou a abrir
+        self.duration = 0.0
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and self.error is None and not self.cancelled
+
+    def log_lines(self):
+        """Mensagens de log no mesmo formato usado pela interface."""
+        job = self.job
+        lines = [f"\n> Processando: {os.path.basename(job.file_path)}",
+                 f"  Diretório de Trabalho: {job.cwd}",
+                 f"  Comando: {format_command(job.command)}"]
+        if self.cancelled:
+            lines.append("  Status: Cancelado"); return lines
+        if self.error is not None:
+            lines.append(f"ERRO CRÍTICO ao executar o processo: {self.error}"); return lines
+        if self.stdout: lines.append(f"  Saída:\n{self.stdout.strip()}")
+        if self.stderr: lines.append(f"  ERROS:\n{self.stderr.strip()}")
+        if self.returncode == 0: lines.append("  Status: Sucesso!")
+        else: lines.append(f"  Status: Falha com código de saída {self.returncode}")
+        return lines
+
+
+class BatchRunner:
+    """Executa os jobs em paralelo, com no máximo `workers` processos ao mesmo tempo.
+
+    `on_result` é chamado (a partir das threads de trabalho) a cada arquivo concluído.
+    Com `profiler` (PEditorProfile.Profiler), as medições de cada processo vão para ele.
+    Com `pool` (PEditorWorker.WorkerPool), os arquivos vão para os workers residentes e só
+    abrem um processo próprio se o pool desistir.
+    `cancel()` descarta os jobs pendentes e encerra os processos em andamento.
+    """
+
+    def __init__(self, jobs, workers=None, on_result=None, profiler=None, pool=None):
+        self.jobs = list(jobs)
+        self.workers = max(1, workers or default_workers())
+        self.on_result = on_result
+        self.profiler = profiler
+        self.pool = pool
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._running = set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+        with self._lock:
+            running = list(self._running)
+        for proc in running:
+            try:
+                proc.kill()
+            except OSError:
+                pass
+        if self.pool is not None:
+            self.pool.close(kill=True)
+
+    def run(self):
+        """Executa todos os grupos e devolve os resultados na ordem dos jobs."""
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for group_results in pool.map(self._run_group, group_jobs(self.jobs)):
+                for result in group_results:
+                    results[id(result.job)] = result
+        return [results[id(job)] for job in self.jobs]
+
+    def _run_group(self, group):
+        results = []
+        for job in group:
+            result = Result(job, cancelled=True) if self.cancelled else self._run_job(job)
+            results.append(result)
+            if self.profiler is not None:
+                self.profiler.record(result)
+            if self.on_result:
+                self.on_result(result)
+        return results
+
+    def _run_job(self, job):
+        start = time.perf_counter()
+        result = None
+        if self.pool is not None:
+            result = self.pool.run(job)
+            if result is None and self.cancelled:
+                result = Result(job, cancelled=True)
+        if result is None:
+            result = self._spawn(job)
+        result.duration = time.perf_counter() - start
+        return result
+
+    def _spawn(self, job):
+        startupinfo = None
+        if os.name == 'nt':
+            startupinfo = subprocess.STARTUPINFO(); startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        start = time.perf_counter()
+        try:
+            proc = subprocess.Popen(job.command, cwd=job.cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                    text=True, encoding='utf-8', errors='replace', startupinfo=startupinfo)
+        except Exception as e:
+            # Falha ao iniciar o executável: interrompe o lote como antes.
+            self._cancel.set()
+            return Result(job, error=e)
+        spawn = time.perf_counter() - start
+        with self._lock:
+            self._running.add(proc)
+        if self.cancelled:
+            proc.kill()
+        try:
+            stdout, stderr, usage = communicate(proc)
+        finally:
+            with self._lock:
+                self._running.discard(proc)
+        timing = Timing(start, spawn, time.perf_counter() - start, *usage)
+        cancelled = self.cancelled and proc.returncode != 0
+        return Result(job, proc.returncode, stdout, stderr, cancelled=cancelled, timing=timing)
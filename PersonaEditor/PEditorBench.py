@@ -0,0 +1,385 @@
+"""Benchmark das etapas de extração/importação e comparação entre execuções.
+
+Cada etapa roda sobre um corpus fixo (os primeiros --limit arquivos, em ordem
+alfabética, de IN/ e Text/; --native-limit nas etapas nativas, que são bem mais rápidas)
+copiado para uma pasta temporária. As etapas nativas e o xlsx-tsv, que duram pouco, rodam
+três vezes sobre os mesmos arquivos e fica a passada mais rápida. A parte medida roda num
+processo próprio, para que o pico de memória (RSS) seja só dela. O resultado de cada
+etapa (arquivos/s, MB/s, pico de RSS, latência p50/p95 por arquivo) vai para um JSON,
+e o comando compare aponta as regressões entre dois JSONs. Etapas que levam menos de
+--min-seconds (0,2 s) na base são ruído: o tempo delas não é comparado, só a memória.
+
+As etapas que usam o PersonaEditorCMD podem rodar com um stub em Python (--stub, o
+padrão fora do Windows) que faz a mesma leitura/escrita com os módulos nativos. Com o
+stub, bf-ptp e ptp-tsv medem direto as funções nativas (PEditorMSG/PEditorPTP) e saem
+com "native": true no JSON; com --exe elas também rodam pelo PersonaEditorCMD. Com
+--resident as etapas da ferramenta usam os workers residentes do PEditorWorker.
+
+Uso: python PEditorBench.py run [--stages arc-bf,bf-ptp,...] [--limit N] [--native-limit N] [--exe "CMD"] [--stub] [--out ARQ]
+     python PEditorBench.py compare BASE.json NOVO.json [--tolerance 0.15] [--min-seconds 0.2]
+"""
+import argparse
+import hashlib
+import importlib.util
+import json
+import math
+import multiprocessing
+import os
+import platform
+import shlex
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from PEditorBatch import BatchRunner, default_workers, make_jobs
+from PEditorWorker import WorkerPool
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULT_VERSION = 1
+DEFAULT_LIMIT = 200
+NATIVE_LIMIT = 1000  # as etapas nativas levam ~1 ms por arquivo: precisam de mais arquivos para passar do ruído
+REPEATS = 3  # passadas das etapas nativas e do xlsx-tsv (vale a mais rápida)
+STAGES = ("arc-bf", "bf-ptp", "ptp-tsv", "tsv-ptp", "ptp-bf", "xlsx-tsv")
+NATIVE_STAGES = ("bf-ptp", "ptp-tsv")  # medidas com as funções nativas quando não há --exe
+# métrica -> True se maior é melhor
+METRICS = {"seconds": False, "p95_ms": False, "files_per_s": True, "peak_rss_kb": False}
+TIME_METRICS = ("seconds", "p95_ms", "files_per_s")
+MIN_SECONDS = 0.2  # etapas mais curtas que isto na base são só ruído para as métricas de tempo
+
+
+def corpus(root, extensions, limit):
+    """Os primeiros `limit` arquivos de `root` (recursivo, em ordem) com uma das extensões."""
+    found = []
+    for dirpath, dirs, files in os.walk(root):
+        dirs.sort()
+        found.extend(os.path.join(dirpath, f) for f in sorted(files) if f.upper().endswith(extensions))
+        if len(found) >= limit:
+            break
+    return found[:limit]
+
+
+def corpus_digest(paths):
+    """Hash dos nomes e tamanhos do corpus, para o compare avisar quando ele mudou."""
+    h = hashlib.blake2b(digest_size=8)
+    for path in paths:
+        h.update(f"{os.path.basename(path)}:{os.path.getsize(path)}\n".encode('utf-8'))
+    return h.hexdigest()
+
+
+def _copy(paths, work_dir):
+    copied = []
+    for path in paths:
+        target = os.path.join(work_dir, os.path.basename(path))
+        shutil.copyfile(path, target); copied.append(target)
+    return copied
+
+
+def _charmap():
+    from PEditorFont import load_charmaps
+    return load_charmaps(SCRIPT_DIR)[0]
+
+
+def _export_ptps(sources):
+    from PEditorMSG import export_ptp
+    return [ptp for source in sources for ptp in export_ptp(source)[1]]
+
+
+def _write_tsv(ptp_paths, tsv_path):
+    """TSV de importação com o texto antigo na coluna nova, para o -imptext ter o que gravar."""
+    from PEditorPTP import PTP, export_rows
+    charmap = _charmap()
+    with open(tsv_path, 'w', encoding='utf-8', newline='') as f:
+        for path in ptp_paths:
+            for row in export_rows(PTP.load(path), os.path.basename(path), charmap):
+                columns = row[:-1].split("\t"); columns[5] = columns[4]
+                f.write("\t".join(columns) + "\n")
+
+
+def _load_xlsx_tsv():
+    spec = importlib.util.spec_from_file_location("xlsx_tsv", os.path.join(SCRIPT_DIR, "..", "XLSX-TSV.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Preparação (processo principal): copia o corpus e devolve o que a etapa medida recebe.
+
+def setup_stage(name, work_dir, options):
+    limit = options["native_limit"] if name in NATIVE_STAGES and options["stub"] else options["limit"]
+    if name == "arc-bf":
+        sources = corpus(options["in_dir"], (".ARC",), limit)
+        return sources, {"files": _copy(sources, work_dir), "args": ["-expbf", "/sub"]}
+    if name in ("bf-ptp", "ptp-tsv", "tsv-ptp"):
+        sources = corpus(options["in_dir"], (".BF", ".PM1"), limit)
+        files = _copy(sources, work_dir)
+        if name == "bf-ptp":
+            return sources, {"files": files, "args": ["-expptp", "/sub"]}
+        ptps = _export_ptps(files)
+        if name == "ptp-tsv":
+            return sources, {"files": ptps, "args": ["-exptext", "/sub"]}
+        tsv_path = os.path.join(work_dir, "bench.tsv"); _write_tsv(ptps, tsv_path)
+        return sources, {"files": ptps, "args": ["-imptext", "/sub", "/auto", "600", "-save", "/ovrw"], "import_file": tsv_path}
+    if name == "ptp-bf":
+        sources = corpus(options["in_dir"], (".BF",), limit)
+        files = _copy(sources, work_dir); _export_ptps(files)
+        return sources, {"files": files, "args": ["-impptp", "/sub", "-save", "/ovrw"]}
+    if name == "xlsx-tsv":
+        from PEditorText import text_files
+        sources = [p for p in text_files(options["text_dir"]) if p.lower().endswith(".txt")][:limit]
+        xlsx_path = os.path.join(work_dir, "input.xlsx")
+        _load_xlsx_tsv().tsv_to_xlsx(sources, xlsx_path)
+        return sources, {"files": [xlsx_path], "sheets": len(sources), "out_dir": os.path.join(work_dir, "Text")}
+    raise ValueError(f"Etapa desconhecida: {name}")
+
+
+# Parte medida (processo separado).
+
+def _peak_rss_kb():
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _export_ptp(path):
+    from PEditorMSG import export_ptp
+    _, _, error = export_ptp(path)
+    if error:
+        raise ValueError(error)
+
+
+def _timed(function, paths):
+    latencies = []; failed = 0
+    for path in paths:
+        start = time.perf_counter()
+        try:
+            function(path)
+        except Exception:
+            failed += 1
+        latencies.append(time.perf_counter() - start)
+    return latencies, failed
+
+
+def _run_tool(plan, options):
+    jobs = make_jobs("PersonaEditorCMD.exe", plan["files"], plan["args"], plan.get("import_file"))
+    for job in jobs:
+        job.command = options["tool"] + job.args
+    pool = None
+    if options["resident"]:
+        pool = WorkerPool("", stand_in=True) if options["stub"] else WorkerPool(options["tool"][-1])
+    try:
+        results = BatchRunner(jobs, options["workers"], pool=pool).run()
+    finally:
+        if pool is not None:
+            pool.close()
+    if pool is not None and pool.disabled:
+        print(f"AVISO: modo residente indisponível ({pool.disabled}).")
+    return [r.duration for r in results], sum(1 for r in results if not r.ok)
+
+
+def _measure_once(name, plan, options):
+    """(latências, falhas) de uma passada das etapas medidas aqui mesmo (nativas e xlsx-tsv)."""
+    if name == "bf-ptp":
+        return _timed(_export_ptp, plan["files"])
+    if name == "ptp-tsv":
+        from PEditorPTP import export_text
+        charmap = _charmap()
+        return _timed(lambda p: export_text(p, charmap), plan["files"])
+    start = time.perf_counter()
+    _load_xlsx_tsv().xlsx_to_tsv(plan["files"][0], plan["out_dir"], options["workers"])
+    return [time.perf_counter() - start], 0
+
+
+def measure_stage(name, plan, options):
+    if name == "xlsx-tsv" or (name in NATIVE_STAGES and options["stub"]):
+        # Etapas curtas: REPEATS passadas sobre os mesmos arquivos, fica a mais rápida.
+        best = None
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            latencies, failed = _measure_once(name, plan, options)
+            seconds = time.perf_counter() - start
+            if best is None or seconds < best[0]:
+                best = (seconds, latencies, failed)
+        seconds, latencies, failed = best
+    else:
+        start = time.perf_counter()
+        latencies, failed = _run_tool(plan, options)
+        seconds = time.perf_counter() - start
+    return {"seconds": seconds, "latencies": latencies, "failed": failed, "peak_rss_kb": _peak_rss_kb()}
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)] if ordered else 0.0
+
+
+def run_stage(name, options):
+    with tempfile.TemporaryDirectory(prefix=f"bench-{name}-") as work_dir:
+        sources, plan = setup_stage(name, work_dir, options)
+        if not plan["files"]:
+            return {"skipped": "corpus vazio"}
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(1, mp_context=context) as pool:
+            measured = pool.submit(measure_stage, name, plan, options).result()
+    size = sum(os.path.getsize(p) for p in sources)
+    files = plan.get("sheets", len(plan["files"]))
+    seconds = measured["seconds"] or 1e-9
+    latencies = measured["latencies"]
+    return {"files": files, "bytes": size, "seconds": round(seconds, 4),
+            "files_per_s": round(files / seconds, 2), "mb_per_s": round(size / seconds / (1 << 20), 3),
+            "peak_rss_kb": measured["peak_rss_kb"],
+            "p50_ms": round(_percentile(latencies, 0.5) * 1000, 2), "p95_ms": round(_percentile(latencies, 0.95) * 1000, 2),
+            "failed": measured["failed"], "corpus": corpus_digest(sources),
+            "native": name in NATIVE_STAGES and options["stub"]}
+
+
+def compare(base, new, tolerance, min_seconds=MIN_SECONDS):
+    """[(etapa, métrica, base, novo, variação)] das métricas que pioraram mais que `tolerance`.
+
+    Etapas que levaram menos de `min_seconds` na base não têm as métricas de tempo comparadas.
+    """
+    regressions = []
+    for name, stage in new["stages"].items():
+        old = base["stages"].get(name)
+        if not old or "skipped" in old or "skipped" in stage:
+            continue
+        short = old.get("seconds", 0) < min_seconds
+        for metric, higher_is_better in METRICS.items():
+            if short and metric in TIME_METRICS:
+                continue
+            before, after = old.get(metric), stage.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append((name, metric, before, after, change))
+    return regressions
+
+
+# Stub do PersonaEditorCMD: mesma leitura/escrita, sem o .NET.
+
+def stub_tool(argv):
+    if len(argv) < 2:
+        print(f"stub: argumentos insuficientes: {argv}", file=sys.stderr); return 2
+    file_name, command, rest = argv[0], argv[1], argv[2:]
+    path = os.path.abspath(file_name)
+    if command == "-expbf":
+        from PEditorArchive import scan_archive
+        with open(path, 'rb') as f:
+            data = f.read()
+        for entry in scan_archive(path):
+            if entry.type == "BF":
+                with open(os.path.basename(entry.path), 'wb') as out:
+                    out.write(data[entry.offset:entry.offset + entry.length])
+    elif command == "-expptp":
+        from PEditorMSG import export_ptp
+        if export_ptp(path)[2]:
+            return 1
+    elif command == "-imptext":
+        from PEditorPTP import import_text
+        import_text(path, rest[0], _charmap())
+    elif command in ("-impptp", "-impall"):
+        if "-save" in rest:
+            with open(path, 'rb') as f:
+                data = f.read()
+            with open(path + ".tmp", 'wb') as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+    else:
+        print(f"stub: comando não suportado: {command}", file=sys.stderr); return 2
+    return 0
+
+
+def _print_stage(name, stage):
+    if "skipped" in stage:
+        print(f"{name:<9} pulada: {stage['skipped']}"); return
+    rss = f"{stage['peak_rss_kb'] / 1024:.0f} MB" if stage["peak_rss_kb"] else "-"
+    print(f"{name:<9} {stage['files']:>5} arq  {stage['seconds']:>8.2f}s  {stage['files_per_s']:>8.1f} arq/s  "
+          f"{stage['mb_per_s']:>7.2f} MB/s  RSS {rss:>7}  p50 {stage['p50_ms']:>8.1f} ms  p95 {stage['p95_ms']:>8.1f} ms"
+          + (f"  {stage['failed']} falha(s)" if stage["failed"] else ""))
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] == "stub":
+        return stub_tool(argv[1:])
+    parser = argparse.ArgumentParser(description="Mede as etapas de extração/importação e compara execuções.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="Roda o benchmark e grava o JSON")
+    run.add_argument("--stages", default=",".join(STAGES), help="Etapas separadas por vírgula (padrão: todas)")
+    run.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help="Arquivos por etapa (padrão: %(default)s)")
+    run.add_argument("--native-limit", type=int, default=NATIVE_LIMIT,
+                     help="Arquivos das etapas nativas (bf-ptp e ptp-tsv com o stub) (padrão: %(default)s)")
+    run.add_argument("--workers", type=int, default=None, help="Processos simultâneos (padrão: nº de CPUs)")
+    run.add_argument("--in-dir", default=os.path.join("..", "IN"))
+    run.add_argument("--text-dir", default=os.path.join("..", "Text"))
+    run.add_argument("--exe", default=None, help='Comando do PersonaEditorCMD (ex.: "dotnet PersonaEditorCMD.exe")')
+    run.add_argument("--stub", action="store_true", help="Usa o stub em Python no lugar do PersonaEditorCMD")
+    run.add_argument("--resident", action="store_true", help="Usa os workers residentes (PEditorWorker)")
+    run.add_argument("--out", default="benchmark.json", help="JSON de saída (padrão: %(default)s)")
+    cmp_parser = commands.add_parser("compare", help="Compara dois JSONs e aponta regressões")
+    cmp_parser.add_argument("base"); cmp_parser.add_argument("new")
+    cmp_parser.add_argument("--tolerance", type=float, default=0.15, help="Piora tolerada (padrão: %(default)s = 15%%)")
+    cmp_parser.add_argument("--min-seconds", type=float, default=MIN_SECONDS,
+                            help="Etapas mais curtas que isto na base não têm o tempo comparado (padrão: %(default)s s)")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.base, 'r', encoding='utf-8') as f:
+            base = json.load(f)
+        with open(args.new, 'r', encoding='utf-8') as f:
+            new = json.load(f)
+        for name, stage in new["stages"].items():
+            old = base["stages"].get(name, {})
+            if old.get("corpus") and stage.get("corpus") and old["corpus"] != stage["corpus"]:
+                print(f"AVISO: o corpus da etapa {name} mudou; a comparação pode não valer.")
+            if old.get("seconds", 0) and old["seconds"] < args.min_seconds and "skipped" not in stage:
+                print(f"AVISO: a etapa {name} levou {old['seconds']:.3f}s na base (< {args.min_seconds}s); "
+                      "o tempo dela não é comparado (aumente o --limit).")
+            if old.get("native", False) != stage.get("native", False):
+                print(f"AVISO: a etapa {name} foi medida com as funções nativas em só uma das execuções.")
+        if base.get("tool") != new.get("tool"):
+            print(f"AVISO: ferramenta diferente ({base.get('tool')} x {new.get('tool')}).")
+        regressions = compare(base, new, args.tolerance, args.min_seconds)
+        for name, metric, before, after, change in regressions:
+            print(f"REGRESSÃO {name} {metric}: {before} -> {after} ({change:+.0%})")
+        print(f"{len(regressions)} regressão(ões) acima de {args.tolerance:.0%}.")
+        return 1 if regressions else 0
+
+    if args.stub or (args.exe is None and os.name != 'nt'):
+        tool = [sys.executable, os.path.abspath(__file__), "stub"]; tool_name = "stub"
+    else:
+        tool = shlex.split(args.exe, posix=os.name != 'nt') if args.exe else [os.path.join(SCRIPT_DIR, "PersonaEditorCMD.exe")]
+        # os jobs rodam na pasta de cada arquivo: o caminho do .exe precisa ser absoluto
+        tool[-1] = os.path.abspath(tool[-1]) if os.path.isfile(tool[-1]) else tool[-1]
+        tool_name = " ".join(tool)
+    options = {"limit": args.limit, "native_limit": args.native_limit, "workers": args.workers or default_workers(), "tool": tool,
+               "stub": tool_name == "stub", "resident": args.resident,
+               "in_dir": os.path.abspath(args.in_dir), "text_dir": os.path.abspath(args.text_dir)}
+    result = {"version": RESULT_VERSION, "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "platform": platform.platform(),
+              "python": platform.python_version(), "tool": tool_name, "resident": args.resident, "limit": args.limit,
+              "native_limit": args.native_limit,
+              "workers": options["workers"], "stages": {}}
+    for name in [s.strip() for s in args.stages.split(",") if s.strip()]:
+        if name not in STAGES:
+            parser.error(f"etapa desconhecida: {name} (opções: {', '.join(STAGES)})")
+        result["stages"][name] = stage = run_stage(name, options)
+        _print_stage(name, stage)
+    tmp_path = args.out + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    os.replace(tmp_path, args.out)
+    print(f"Resultado gravado em {args.out}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
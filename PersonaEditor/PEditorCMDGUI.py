@@ -1,22 +1,234 @@
 import sys
 import os
-import subprocess
+import shutil
+import tempfile
 import xml.etree.ElementTree as ET
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QFileDialog,
-    QLineEdit, QGroupBox, QComboBox, QCheckBox, QLabel, QTextEdit, QListWidget,
-    QSpinBox, QListWidgetItem, QFrame
+    QLineEdit, QGroupBox, QComboBox, QCheckBox, QLabel, QPlainTextEdit, QListView,
+    QSpinBox, QFrame, QTabWidget, QTableView, QHeaderView, QAbstractItemView
 )
-from PyQt6.QtCore import QSettings, Qt
+from PyQt6.QtCore import (
+    QSettings, Qt, QThread, QTimer, QAbstractTableModel, QAbstractListModel, QModelIndex, QSortFilterProxyModel
+)
+from PyQt6.QtGui import QFont
+
+from PEditorBatch import BatchRunner, default_workers, make_jobs, output_path
+from PEditorCache import CACHE_FILE, BuildCache
+from PEditorFont import font_registry
+from PEditorImport import CHANGES_NAME, plan_jobs, summary_lines
+from PEditorLog import STATUS_CANCELLED, STATUS_FAIL, STATUS_OK, LogQueue
+from PEditorProfile import Profiler
+from PEditorScan import TYPES, ContentDedup, Scanner
+from PEditorUnify import split_unified, unify_files
+from PEditorWorker import WorkerPool
+from PEditorWidth import check_paths, format_overflow, load_new_font
 
 APP_NAME = "PersonaEditorGUI"
 APP_AUTHOR = "SeuNomeOuEmpresa"
+LOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "PEditorGUI.log")
+TRACE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "PEditorGUI.trace.json")
+CONSOLE_MAX_LINES = 10000
+LOG_DRAIN_MS = 100
+MAX_REMOVE_RANGES = 64  # acima disto a remoção reconstrói a lista de uma vez (cada faixa custa O(n))
+
+
+class BatchThread(QThread):
+    """Roda o BatchRunner fora da thread da interface; o log de cada arquivo vai para a LogQueue."""
+
+    def __init__(self, jobs, workers, log_queue, cache_path=None, resident_exe=None, import_plan=False, parent=None):
+        super().__init__(parent)
+        self.jobs = jobs
+        self.log_queue = log_queue
+        self.profiler = Profiler()
+        self.pool = WorkerPool(resident_exe) if resident_exe else None
+        self.runner = BatchRunner(jobs, workers, on_result=log_queue.report, profiler=self.profiler, pool=self.pool)
+        self.cache_path = cache_path
+        self.import_plan = import_plan
+        self.results = []
+
+    def cancel(self):
+        self.runner.cancel()
+
+    def run(self):
+        work_dir = None
+        if self.import_plan:
+            work_dir = tempfile.mkdtemp(prefix="peditor_import_")
+            try:
+                self.jobs, plan = plan_jobs(self.jobs, os.path.join(work_dir, CHANGES_NAME))
+                self.runner.jobs = self.jobs
+                for line in summary_lines(plan): self.log_queue.log(line)
+            except (OSError, ValueError) as e:
+                self.log_queue.log(f"AVISO: Planejador de importação indisponível ({e}); importando todos os arquivos.")
+        try:
+            self._run_batch()
+        finally:
+            if work_dir is not None:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _run_batch(self):
+        cache = None
+        if self.cache_path:
+            cache = BuildCache(self.cache_path)
+            dirty, clean = cache.split(self.jobs)
+            self.log_queue.log(f"Modo incremental: {len(dirty)} arquivo(s) alterado(s), {len(clean)} sem alterações (pulados).")
+            self.runner.jobs = dirty
+        try:
+            self.results = self.runner.run()
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+        if self.pool is not None and self.pool.disabled:
+            self.log_queue.log(f"AVISO: Modo residente indisponível ({self.pool.disabled}); um processo por arquivo.")
+        if cache is not None:
+            cache.record(self.results)
+            try:
+                cache.save()
+            except OSError as e:
+                self.log_queue.log(f"AVISO: Não foi possível salvar o cache incremental: {e}")
+
+
+class ScanThread(QThread):
+    """Roda o Scanner fora da thread da interface; os caminhos saem em lotes por scanner.drain()."""
+
+    def __init__(self, scanner, parent=None):
+        super().__init__(parent)
+        self.scanner = scanner
+
+    def cancel(self):
+        self.scanner.cancel()
+
+    def run(self):
+        self.scanner.run()
+
+
+class FileListModel(QAbstractListModel):
+    """Arquivos de entrada do lote; só o que aparece na tela é desenhado, então aguenta 100k+ linhas."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+        self._keys = set()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return self.rows[index.row()]
+        return None
+
+    def add(self, paths):
+        """Acrescenta os caminhos que ainda não estão na lista."""
+        new = []
+        for path in paths:
+            key = os.path.normcase(os.path.abspath(path))
+            if key not in self._keys:
+                self._keys.add(key); new.append(path)
+        if not new: return
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(new) - 1)
+        self.rows.extend(new)
+        self.endInsertRows()
+
+    def remove(self, rows):
+        """Remove as linhas em faixas contíguas (do fim para o começo); muitas faixas soltas viram um reset só."""
+        ranges = []
+        for row in sorted(set(rows), reverse=True):
+            if ranges and ranges[-1][0] == row + 1:
+                ranges[-1][0] = row
+            else:
+                ranges.append([row, row])
+        if len(ranges) > MAX_REMOVE_RANGES:
+            removed = set(rows)
+            self.beginResetModel()
+            self.rows = [path for i, path in enumerate(self.rows) if i not in removed]
+            self._keys = {os.path.normcase(os.path.abspath(path)) for path in self.rows}
+            self.endResetModel(); return
+        for first, last in ranges:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            for path in self.rows[first:last + 1]:
+                self._keys.discard(os.path.normcase(os.path.abspath(path)))
+            del self.rows[first:last + 1]
+            self.endRemoveRows()
+
+    def clear(self):
+        self.beginResetModel(); self.rows = []; self._keys = set(); self.endResetModel()
+
+
+class FileStatusModel(QAbstractTableModel):
+    """Status de cada arquivo processado (arquivo, status, duração, código de saída)."""
+    HEADERS = ("Arquivo", "Status", "Duração (s)", "Código")
+    COLORS = {STATUS_OK: Qt.GlobalColor.darkGreen, STATUS_FAIL: Qt.GlobalColor.red, STATUS_CANCELLED: Qt.GlobalColor.darkYellow}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        status = self.rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            column = index.column()
+            if column == 0: return os.path.basename(status.file)
+            if column == 1: return status.status
+            if column == 2: return f"{status.duration:.2f}"
+            return "" if status.returncode is None else str(status.returncode)
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return status.file
+        if role == Qt.ItemDataRole.ForegroundRole and index.column() == 1:
+            return self.COLORS.get(status.status)
+        if role == Qt.ItemDataRole.UserRole:
+            return (os.path.basename(status.file).lower(), status.status, status.duration, status.returncode or 0)[index.column()]
+        return None
+
+    def add(self, statuses):
+        if not statuses: return
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(statuses) - 1)
+        self.rows.extend(statuses)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel(); self.rows = []; self.endResetModel()
+
+
+class FileStatusFilter(QSortFilterProxyModel):
+    """Filtra a tabela de status pelo status escolhido e por parte do nome do arquivo."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.status = None; self.text = ""
+        self.setSortRole(Qt.ItemDataRole.UserRole)
+
+    def set_filter(self, status, text):
+        self.status = status; self.text = text.lower()
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        status = self.sourceModel().rows[source_row]
+        if self.status and status.status != self.status:
+            return False
+        return not self.text or self.text in status.file.lower()
+
 
 class PersonaEditorGUI(QWidget):
     def __init__(self):
         super().__init__()
         self.settings = QSettings(APP_AUTHOR, APP_NAME)
+        self.log_queue = LogQueue(LOG_FILE)
         self.init_ui()
+        self.log_timer = QTimer(self)
+        self.log_timer.timeout.connect(self.drain_log)
+        self.log_timer.start(LOG_DRAIN_MS)
         self.load_settings()
 
     def init_ui(self):
@@ -36,7 +248,16 @@ class PersonaEditorGUI(QWidget):
         self.execute_button = QPushButton("🚀 Executar Comando")
         self.execute_button.setStyleSheet("font-size: 14px; padding: 10px;")
         self.execute_button.clicked.connect(self.run_command)
-        main_layout.addWidget(self.execute_button)
+        self.cancel_button = QPushButton("Cancelar")
+        self.cancel_button.setStyleSheet("font-size: 14px; padding: 10px;")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_command)
+        run_layout = QHBoxLayout()
+        run_layout.addWidget(self.execute_button, 3); run_layout.addWidget(self.cancel_button, 1)
+        main_layout.addLayout(run_layout)
+        self.batch_thread = None
+        self.scan_thread = None
+        self.scan_dedup = ContentDedup()
 
     # ==================================================================
     # Funções de criação dos widgets da UI
@@ -125,14 +346,34 @@ class PersonaEditorGUI(QWidget):
     def create_file_selection_group(self):
         group = QGroupBox("Arquivos de Entrada (Processamento em Lote)")
         layout = QVBoxLayout()
-        self.file_list_widget = QListWidget()
-        self.file_list_widget.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
+        self.file_model = FileListModel(self)
+        self.file_model.rowsInserted.connect(self.update_file_count); self.file_model.rowsRemoved.connect(self.update_file_count)
+        self.file_model.modelReset.connect(self.update_file_count)
+        self.file_list_view = QListView()
+        self.file_list_view.setModel(self.file_model)
+        self.file_list_view.setUniformItemSizes(True)
+        self.file_list_view.setLayoutMode(QListView.LayoutMode.Batched)
+        self.file_list_view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        filter_layout = QHBoxLayout()
+        self.scan_glob_edit = QLineEdit()
+        self.scan_glob_edit.setPlaceholderText("Filtro do nome (ex.: e0*;*.bf)")
+        filter_layout.addWidget(self.scan_glob_edit)
+        self.scan_type_checks = {}
+        for kind in TYPES:
+            check = QCheckBox(kind); self.scan_type_checks[kind] = check; filter_layout.addWidget(check)
+        self.scan_recursive_check = QCheckBox("Subpastas"); self.scan_recursive_check.setChecked(True)
+        self.scan_dedup_check = QCheckBox("Sem duplicados")
+        self.scan_dedup_check.setToolTip("Ignora arquivos com conteúdo igual a um já listado (hash só entre arquivos do mesmo tamanho).")
+        filter_layout.addWidget(self.scan_recursive_check); filter_layout.addWidget(self.scan_dedup_check)
         button_layout = QHBoxLayout()
         select_files_button = QPushButton("Selecionar Arquivos..."); select_files_button.clicked.connect(self.select_files)
         select_folder_button = QPushButton("Selecionar Pasta..."); select_folder_button.clicked.connect(self.select_folder)
-        clear_button = QPushButton("Limpar Seleção"); clear_button.clicked.connect(self.file_list_widget.clear)
-        button_layout.addWidget(select_files_button); button_layout.addWidget(select_folder_button); button_layout.addWidget(clear_button)
-        layout.addWidget(self.file_list_widget); layout.addLayout(button_layout)
+        remove_button = QPushButton("Remover Selecionados"); remove_button.clicked.connect(self.remove_selected_files)
+        clear_button = QPushButton("Limpar Seleção"); clear_button.clicked.connect(self.clear_files)
+        self.file_count_label = QLabel("0 arquivo(s)")
+        button_layout.addWidget(select_files_button); button_layout.addWidget(select_folder_button)
+        button_layout.addWidget(remove_button); button_layout.addWidget(clear_button); button_layout.addWidget(self.file_count_label)
+        layout.addLayout(filter_layout); layout.addWidget(self.file_list_view); layout.addLayout(button_layout)
         group.setLayout(layout)
         return group
 
@@ -194,9 +435,22 @@ class PersonaEditorGUI(QWidget):
         self.ovrw_check = QCheckBox("/ovrw (Sobrescrever arquivo original)")
         self.save_check = QCheckBox("-save (Salvar alterações na importação)")
         self.save_check.setToolTip("Necessário para que os comandos de importação salvem o resultado.")
+        self.incremental_check = QCheckBox("Modo incremental (pular arquivos sem alterações)")
+        self.incremental_check.setToolTip(f"Guarda os hashes das entradas em {CACHE_FILE}, ao lado do executável.")
+        self.resident_check = QCheckBox("Processos residentes (carregar o executável uma vez por processo)")
+        self.resident_check.setToolTip("Cada processo paralelo carrega o PersonaEditorCMD uma vez e recebe vários arquivos.\n"
+                                       "Precisa do pythonnet; sem ele, volta a abrir um processo por arquivo.")
+        workers_layout = QHBoxLayout()
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, 64); self.workers_spin.setValue(default_workers())
+        self.workers_spin.setToolTip("Quantidade de arquivos processados ao mesmo tempo.\nCom /ovrw, arquivos com a mesma saída nunca rodam juntos.")
+        workers_layout.addWidget(QLabel("Processos paralelos:")); workers_layout.addWidget(self.workers_spin); workers_layout.addStretch()
         layout.addWidget(self.sub_check)
         layout.addWidget(self.ovrw_check)
         layout.addWidget(self.save_check)
+        layout.addWidget(self.incremental_check)
+        layout.addWidget(self.resident_check)
+        layout.addLayout(workers_layout)
         group.setLayout(layout)
         return group
 
@@ -228,10 +482,16 @@ class PersonaEditorGUI(QWidget):
         self.auto_width_spin = QSpinBox()
         self.auto_width_spin.setRange(1, 9999); self.auto_width_spin.setEnabled(False)
         self.auto_check.toggled.connect(self.auto_width_spin.setEnabled)
-        auto_layout.addWidget(self.auto_check); auto_layout.addWidget(self.auto_width_spin); auto_layout.addStretch()
+        validate_btn = QPushButton("Validar Larguras")
+        validate_btn.setToolTip("Mede os textos com as larguras da NewFont e lista os que não cabem.\nSem arquivo único, valida a pasta Text/ ao lado da pasta do executável.")
+        validate_btn.clicked.connect(self.validate_text_widths)
+        auto_layout.addWidget(self.auto_check); auto_layout.addWidget(self.auto_width_spin); auto_layout.addStretch(); auto_layout.addWidget(validate_btn)
         layout.addLayout(auto_layout)
         self.skipempty_check = QCheckBox("/skipempty (Pular textos vazios)")
         layout.addWidget(self.skipempty_check)
+        self.import_plan_check = QCheckBox("Só PTPs com strings alteradas")
+        self.import_plan_check.setToolTip("Compara o TSV com o texto atual de cada PTP e só abre os que mudam,\ncom um TSV só das linhas alteradas. Outros arquivos são importados normalmente.")
+        layout.addWidget(self.import_plan_check)
         enc_layout = QHBoxLayout()
         self.enc_combo = QComboBox()
         self.enc_combo.addItems(["UTF-8", "UTF-7", "UTF-16", "UTF-32"])
@@ -255,7 +515,10 @@ class PersonaEditorGUI(QWidget):
         self.exptext_unify_path_edit.setPlaceholderText("Caminho para o arquivo unificado...")
         save_as_btn = QPushButton("Salvar Como...")
         save_as_btn.clicked.connect(self.select_unify_output_file)
-        unify_layout.addWidget(self.exptext_unify_path_edit); unify_layout.addWidget(save_as_btn)
+        split_btn = QPushButton("Separar Alterações")
+        split_btn.setToolTip("Grava de volta nos arquivos de origem apenas as seções editadas no arquivo unificado.")
+        split_btn.clicked.connect(self.split_unified_file)
+        unify_layout.addWidget(self.exptext_unify_path_edit); unify_layout.addWidget(save_as_btn); unify_layout.addWidget(split_btn)
         layout.addWidget(self.exptext_unify_check); layout.addWidget(self.exptext_unify_widget)
         self.exptext_unify_check.toggled.connect(self.exptext_unify_widget.setVisible)
         self.exptext_unify_widget.setVisible(False)
@@ -285,16 +548,82 @@ class PersonaEditorGUI(QWidget):
     def create_output_group(self):
         group = QGroupBox("Saída do Comando")
         layout = QVBoxLayout()
-        self.output_console = QTextEdit()
+        tabs = QTabWidget()
+        self.output_console = QPlainTextEdit()
         self.output_console.setReadOnly(True)
-        self.output_console.setFontFamily("Courier New")
-        layout.addWidget(self.output_console)
+        self.output_console.setMaximumBlockCount(CONSOLE_MAX_LINES)
+        self.output_console.setFont(QFont("Courier New"))
+        tabs.addTab(self.output_console, "Log")
+        status_widget = QWidget()
+        status_layout = QVBoxLayout(status_widget)
+        filter_layout = QHBoxLayout()
+        self.status_filter_combo = QComboBox()
+        self.status_filter_combo.addItem("Todos", None)
+        self.status_filter_combo.addItem("Sucesso", STATUS_OK)
+        self.status_filter_combo.addItem("Falha", STATUS_FAIL)
+        self.status_filter_combo.addItem("Cancelado", STATUS_CANCELLED)
+        self.status_filter_edit = QLineEdit()
+        self.status_filter_edit.setPlaceholderText("Filtrar pelo nome do arquivo...")
+        self.status_summary_label = QLabel("")
+        filter_layout.addWidget(QLabel("Status:")); filter_layout.addWidget(self.status_filter_combo)
+        filter_layout.addWidget(self.status_filter_edit); filter_layout.addWidget(self.status_summary_label)
+        self.status_model = FileStatusModel(self)
+        self.status_proxy = FileStatusFilter(self)
+        self.status_proxy.setSourceModel(self.status_model)
+        self.status_filter_combo.currentIndexChanged.connect(self.update_status_filter)
+        self.status_filter_edit.textChanged.connect(self.update_status_filter)
+        self.status_view = QTableView()
+        self.status_view.setModel(self.status_proxy)
+        self.status_view.setSortingEnabled(True)
+        self.status_view.verticalHeader().setVisible(False)
+        self.status_view.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        status_layout.addLayout(filter_layout); status_layout.addWidget(self.status_view)
+        tabs.addTab(status_widget, "Arquivos")
+        layout.addWidget(tabs)
         group.setLayout(layout)
         return group
-    
+
     def log(self, message):
-        self.output_console.append(message)
-        QApplication.processEvents()
+        """Enfileira a mensagem; o timer do log a mostra no console em lote."""
+        self.log_queue.log(message)
+
+    def drain_log(self):
+        messages, statuses = self.log_queue.drain()
+        if messages:
+            self.output_console.appendPlainText("\n".join(messages))
+        if statuses:
+            self.status_model.add(statuses)
+            self.update_status_summary()
+        self.drain_scan()
+
+    def drain_scan(self):
+        if self.scan_thread is None: return
+        scanner = self.scan_thread.scanner
+        finished = scanner.done.is_set()
+        paths = scanner.drain()
+        if paths:
+            self.file_model.add(paths)
+        if finished:
+            status = "cancelada" if scanner.cancelled else "concluída"
+            self.log(f"Busca {status}: {scanner.count} arquivo(s) encontrado(s), {scanner.duplicates} duplicado(s) ignorado(s).")
+            self.scan_thread = None; self.update_file_count()
+
+    def update_file_count(self):
+        scanning = " (buscando...)" if self.scan_thread is not None else ""
+        self.file_count_label.setText(f"{self.file_model.rowCount()} arquivo(s){scanning}")
+
+    def cancel_scan(self):
+        if self.scan_thread is not None:
+            self.scan_thread.cancel(); self.scan_thread.wait()
+            self.drain_scan()
+
+    def update_status_filter(self):
+        self.status_proxy.set_filter(self.status_filter_combo.currentData(), self.status_filter_edit.text())
+
+    def update_status_summary(self):
+        rows = self.status_model.rows
+        failed = sum(1 for r in rows if r.status == STATUS_FAIL)
+        self.status_summary_label.setText(f"{len(rows)} arquivo(s), {failed} falha(s)")
 
     def select_exe_path(self):
         path, _ = QFileDialog.getOpenFileName(self, "Selecione o PersonaEditorCMD.exe", "", "Executables (*.exe)")
@@ -304,17 +633,26 @@ class PersonaEditorGUI(QWidget):
     def select_files(self):
         files, _ = QFileDialog.getOpenFileNames(self, "Selecione os Arquivos", "", "All Files (*)")
         if files:
-            for file in files:
-                self.file_list_widget.addItem(QListWidgetItem(file))
+            self.file_model.add(files)
 
     def select_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Selecione a Pasta")
-        if folder:
-            self.log(f"Adicionando todos os arquivos da pasta: {folder}")
-            for filename in os.listdir(folder):
-                full_path = os.path.join(folder, filename)
-                if os.path.isfile(full_path):
-                    self.file_list_widget.addItem(QListWidgetItem(full_path))
+        if not folder: return
+        self.cancel_scan()
+        types = [kind for kind, check in self.scan_type_checks.items() if check.isChecked()]
+        dedup = self.scan_dedup if self.scan_dedup_check.isChecked() else None
+        scanner = Scanner([folder], self.scan_glob_edit.text(), types, self.scan_recursive_check.isChecked(), dedup)
+        filters = ", ".join(filter(None, [self.scan_glob_edit.text(), "/".join(types)])) or "todos os arquivos"
+        self.log(f"Buscando arquivos em: {folder} ({filters}{', com subpastas' if scanner.recursive else ''})")
+        self.scan_thread = ScanThread(scanner, self)
+        self.scan_thread.start(); self.update_file_count()
+
+    def remove_selected_files(self):
+        self.file_model.remove([index.row() for index in self.file_list_view.selectionModel().selectedRows()])
+
+    def clear_files(self):
+        self.cancel_scan()
+        self.file_model.clear(); self.scan_dedup = ContentDedup()
 
     def update_argument_visibility(self):
         selected_command_text = self.command_combo.currentText()
@@ -332,7 +670,9 @@ class PersonaEditorGUI(QWidget):
         exe_path = self.exe_path_edit.text()
         if not exe_path or not os.path.exists(exe_path):
             self.log("ERRO: O caminho para o PersonaEditorCMD.exe não é válido ou não foi definido."); return
-        if self.file_list_widget.count() == 0:
+        if self.scan_thread is not None:
+            self.log("ERRO: Aguarde a busca de arquivos terminar."); return
+        if self.file_model.rowCount() == 0:
             self.log("ERRO: Nenhum arquivo de entrada selecionado."); return
         selected_command_text = self.command_combo.currentText()
         main_command = self.command_map.get(selected_command_text, "")
@@ -342,66 +682,100 @@ class PersonaEditorGUI(QWidget):
         if main_command == "-exptext" and self.exptext_unify_check.isChecked():
             if not self.exptext_unify_path_edit.text():
                 self.log("ERRO: A opção de unificar arquivos está habilitada, mas nenhum arquivo de saída foi definido."); return
-        self.output_console.clear()
-        self.execute_button.setEnabled(False)
+        self.drain_log(); self.output_console.clear(); self.status_model.clear(); self.update_status_summary()
+        self.execute_button.setEnabled(False); self.cancel_button.setEnabled(True)
         self.log("--- INICIANDO PROCESSO ---")
         base_command_args = self.build_argument_list()
-        processed_files = []
-        for i in range(self.file_list_widget.count()):
-            file_item = self.file_list_widget.item(i)
-            full_file_path = file_item.text()
-            processed_files.append(full_file_path)
-            file_dir = os.path.dirname(full_file_path)
-            file_name_only = os.path.basename(full_file_path)
-            final_command = [exe_path, file_name_only]
-            command_and_args = list(base_command_args)
-            main_cmd = command_and_args.pop(0)
-            final_command.append(main_cmd)
-            if main_cmd == "-imptext" and self.imptext_single_file_check.isChecked():
-                single_import_file = self.imptext_single_file_edit.text()
-                final_command.append(single_import_file)
-            final_command.extend(command_and_args)
-            self.log(f"\n> Processando: {file_name_only}")
-            self.log(f"  Diretório de Trabalho: {file_dir}")
-            self.log(f"  Comando: {' '.join(f'\"{c}\"' if ' ' in c else c for c in final_command)}")
+        processed_files = list(self.file_model.rows)
+        import_file = self.imptext_single_file_edit.text() if self.imptext_single_file_check.isChecked() else None
+        jobs = make_jobs(exe_path, processed_files, base_command_args, import_file)
+        cache_path = os.path.join(os.path.dirname(exe_path), CACHE_FILE) if self.incremental_check.isChecked() else None
+        resident_exe = exe_path if self.resident_check.isChecked() else None
+        import_plan = main_command == "-imptext" and self.import_plan_check.isChecked()
+        self.batch_thread = BatchThread(jobs, self.workers_spin.value(), self.log_queue, cache_path, resident_exe, import_plan, self)
+        self.batch_thread.finished.connect(lambda: self.finish_command(main_command, processed_files))
+        self.batch_thread.start()
+
+    def cancel_command(self):
+        if self.batch_thread is not None and self.batch_thread.isRunning():
+            self.log("\n--- CANCELANDO: aguardando os processos em andamento... ---")
+            self.cancel_button.setEnabled(False)
+            self.batch_thread.cancel()
+
+    def finish_command(self, main_command, processed_files):
+        results = self.batch_thread.results
+        failed = sum(1 for r in results if not r.ok and not r.cancelled)
+        cancelled = sum(1 for r in results if r.cancelled)
+        self.log(f"\nResumo: {len(results) - failed - cancelled} sucesso(s), {failed} falha(s), {cancelled} cancelado(s).")
+        profiler = self.batch_thread.profiler
+        if profiler.invocations:
+            self.log("\n" + "\n".join(profiler.summary_lines()))
             try:
-                startupinfo = None
-                if os.name == 'nt':
-                    startupinfo = subprocess.STARTUPINFO(); startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                result = subprocess.run(final_command, cwd=file_dir, capture_output=True, text=True, encoding='utf-8', errors='replace', startupinfo=startupinfo)
-                if result.stdout: self.log(f"  Saída:\n{result.stdout.strip()}")
-                if result.stderr: self.log(f"  ERROS:\n{result.stderr.strip()}")
-                if result.returncode == 0: self.log("  Status: Sucesso!")
-                else: self.log(f"  Status: Falha com código de saída {result.returncode}")
-            except Exception as e:
-                self.log(f"ERRO CRÍTICO ao executar o processo: {e}"); break
-        if main_command == "-exptext" and self.exptext_unify_check.isChecked():
+                profiler.save(TRACE_FILE); self.log(f"Trace do lote (chrome://tracing): {TRACE_FILE}")
+            except OSError as e:
+                self.log(f"AVISO: Não foi possível gravar o trace: {e}")
+        if main_command == "-exptext" and self.exptext_unify_check.isChecked() and not self.batch_thread.runner.cancelled:
             self.unify_exported_files(processed_files)
         self.log("\n--- PROCESSO CONCLUÍDO ---")
-        self.execute_button.setEnabled(True)
+        self.batch_thread = None
+        self.execute_button.setEnabled(True); self.cancel_button.setEnabled(False)
 
     def unify_exported_files(self, processed_files):
         self.log("\n--- INICIANDO UNIFICAÇÃO DE ARQUIVOS DE TEXTO ---")
         target_file = self.exptext_unify_path_edit.text()
-        source_extension = ".txt" 
-        found_files = 0
+        sources = []
+        for file_path in processed_files:
+            predicted_output_path = output_path(file_path, ["-exptext"])
+            if os.path.exists(predicted_output_path):
+                if predicted_output_path not in sources: sources.append(predicted_output_path)
+            else:
+                self.log(f"  AVISO: Arquivo exportado não encontrado: {os.path.basename(predicted_output_path)}")
         try:
-            with open(target_file, 'w', encoding='utf-8') as outfile:
-                for file_path in processed_files:
-                    predicted_output_path = file_path + source_extension
-                    if os.path.exists(predicted_output_path):
-                        found_files += 1
-                        self.log(f"  Adicionando: {os.path.basename(predicted_output_path)}")
-                        outfile.write(f"--- START: {os.path.basename(predicted_output_path)} ---\n\n")
-                        with open(predicted_output_path, 'r', encoding='utf-8', errors='replace') as infile:
-                            outfile.write(infile.read())
-                        outfile.write("\n\n")
-                    else:
-                        self.log(f"  AVISO: Arquivo exportado não encontrado: {os.path.basename(predicted_output_path)}")
-            self.log(f"\nUnificação concluída. {found_files} arquivos foram juntados em '{os.path.basename(target_file)}'.")
+            unify_files(sources, target_file, log=self.log)
+            self.log(f"\nUnificação concluída. {len(sources)} arquivos foram juntados em '{os.path.basename(target_file)}'.")
         except Exception as e:
             self.log(f"\nERRO CRÍTICO durante a unificação: {e}")
 
+    def split_unified_file(self):
+        target_file = self.exptext_unify_path_edit.text()
+        if not target_file or not os.path.isfile(target_file):
+            self.log("ERRO: Defina um arquivo unificado existente para separar."); return
+        self.log("\n--- SEPARANDO ARQUIVO UNIFICADO ---")
+        try:
+            changed = split_unified(target_file, log=self.log)
+            self.log(f"Separação concluída. {len(changed)} arquivo(s) atualizado(s).")
+        except FileNotFoundError:
+            self.log("ERRO: Índice do arquivo unificado (.idx.json) não encontrado.")
+        except Exception as e:
+            self.log(f"ERRO CRÍTICO durante a separação: {e}")
+
+    def validate_text_widths(self):
+        exe_path = self.exe_path_edit.text()
+        if not exe_path or not os.path.isfile(exe_path):
+            self.log("ERRO: Caminho do executável inválido."); return
+        exe_dir = os.path.dirname(exe_path)
+        if self.imptext_single_file_check.isChecked() and self.imptext_single_file_edit.text():
+            paths = [self.imptext_single_file_edit.text()]
+        else:
+            paths = [os.path.normpath(os.path.join(exe_dir, os.pardir, "Text"))]
+        if not all(os.path.exists(p) for p in paths):
+            self.log(f"ERRO: Textos não encontrados: {', '.join(paths)}"); return
+        width = self.auto_width_spin.value() if self.auto_check.isChecked() else 600
+        self.log(f"\n--- VALIDANDO LARGURAS (largura {width}) ---")
+        try:
+            font = load_new_font(exe_dir)
+            missing = {}
+            overflows = list(check_paths(paths, font, width, self.auto_check.isChecked(), encoding=self.enc_combo.currentText().lower(), missing=missing))
+        except Exception as e:
+            self.log(f"ERRO CRÍTICO durante a validação: {e}"); return
+        for item in overflows[:200]:
+            self.log(format_overflow(item))
+        if len(overflows) > 200:
+            self.log(f"... e mais {len(overflows) - 200} texto(s).")
+        if missing:
+            self.log("AVISO: Caracteres sem glifo na NewFont: " + " ".join(sorted(missing)))
+        self.log(f"Validação concluída. {len(overflows)} texto(s) estourando a largura.")
+
     def select_single_import_file(self):
         path, _ = QFileDialog.getOpenFileName(self, "Selecione o arquivo de texto para importação", "", "Text Files (*.txt *.tsv);;All Files (*)")
         if path:
@@ -418,24 +792,20 @@ class PersonaEditorGUI(QWidget):
         if not exe_path or not os.path.isdir(os.path.dirname(exe_path)):
             font_group.setEnabled(False); self.font_status_label.setText("Caminho do executável inválido."); self.font_status_label.setStyleSheet("color: red;"); return
         exe_dir = os.path.dirname(exe_path); font_dir = os.path.join(exe_dir, "font"); xml_path = os.path.join(exe_dir, "PersonaEditor.xml")
-        self.old_font_combo.clear(); self.new_font_combo.clear()
-        available_fonts = []
-        if os.path.isdir(font_dir):
-            for filename in os.listdir(font_dir):
-                if filename.upper().endswith(".FNTMAP"):
-                    available_fonts.append(os.path.splitext(filename)[0])
-            if available_fonts:
-                self.old_font_combo.addItems(available_fonts); self.new_font_combo.addItems(available_fonts)
-            else:
-                self.font_status_label.setText("Pasta 'font' encontrada, mas sem arquivos .FNTMAP."); self.font_status_label.setStyleSheet("color: orange;")
-        else:
+        registry = font_registry(exe_dir)
+        available_fonts = registry.fonts()
+        if [self.old_font_combo.itemText(i) for i in range(self.old_font_combo.count())] != available_fonts:
+            self.old_font_combo.clear(); self.new_font_combo.clear()
+            self.old_font_combo.addItems(available_fonts); self.new_font_combo.addItems(available_fonts)
+        if not os.path.isdir(font_dir):
             self.font_status_label.setText("ERRO: Pasta 'font' não encontrada no diretório do executável."); self.font_status_label.setStyleSheet("color: red;"); font_group.setEnabled(False); return
+        if not available_fonts:
+            self.font_status_label.setText("Pasta 'font' encontrada, mas sem arquivos .FNTMAP."); self.font_status_label.setStyleSheet("color: orange;")
         if os.path.isfile(xml_path):
             try:
-                tree = ET.parse(xml_path); root = tree.getroot()
-                old_font_node = root.find("OldFont"); new_font_node = root.find("NewFont")
-                if old_font_node is not None and new_font_node is not None:
-                    self.old_font_combo.setCurrentText(old_font_node.text); self.new_font_combo.setCurrentText(new_font_node.text)
+                old_font, new_font = registry.selected()
+                if old_font is not None and new_font is not None:
+                    self.old_font_combo.setCurrentText(old_font); self.new_font_combo.setCurrentText(new_font)
                     self.font_status_label.setText("Configurações do XML carregadas com sucesso."); self.font_status_label.setStyleSheet("color: green;"); font_group.setEnabled(True)
                 else:
                     self.font_status_label.setText("ERRO: Tags <OldFont>/<NewFont> não encontradas no XML."); self.font_status_label.setStyleSheet("color: red;"); font_group.setEnabled(False)
@@ -470,6 +840,9 @@ class PersonaEditorGUI(QWidget):
             self.load_font_settings()
 
     def closeEvent(self, event):
+        if self.batch_thread is not None and self.batch_thread.isRunning():
+            self.batch_thread.cancel(); self.batch_thread.wait()
+        self.cancel_scan()
         self.save_settings()
         super().closeEvent(event)
 
@@ -0,0 +1,253 @@
+"""Cache incremental: só executa o PersonaEditorCMD nos arquivos cujas entradas mudaram.
+
+Para cada arquivo alvo o manifesto guarda o hash das entradas (argumentos, linhas do
+TSV com o %FN do arquivo ou, no -imptext sem arquivo, o <nome>.TXT ao lado, PTPs irmãos,
+fontes do PersonaEditor.xml) e o hash do próprio alvo depois da última execução
+bem-sucedida. O PADRÃO é procurado nas subpastas sem diferenciar maiúsculas.
+
+Uso: python PEditorCache.py [--cache ARQ] [--workers N] [--full] EXE PADRÃO ARGS...
+Exemplo: python PEditorCache.py PersonaEditorCMD.exe *.PTP -imptext /sub /auto 600 -save /ovrw
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+from PEditorBatch import BatchRunner, make_jobs
+
+CACHE_FILE = ".peditor_cache.json"
+CACHE_VERSION = 1
+SWITCHES = {"/sub", "/map", "/lbl", "/auto", "/co2n", "/rmvspl", "/skipempty", "/enc", "/size", "/ovrw"}
+
+
+def hash_file(path, chunk_size=1 << 20):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _stem(name):
+    return os.path.splitext(os.path.basename(name.replace('\\', '/')))[0].lower()
+
+
+def _entry_key(job):
+    """Um registro por arquivo e comando principal (-imptext, -impptp...)."""
+    main_cmd = job.command[2] if len(job.command) > 2 else ""
+    return os.path.normcase(os.path.realpath(job.file_path)) + "|" + main_cmd
+
+
+def _is_value(arg):
+    return not arg.startswith('-') and arg.lower() not in SWITCHES
+
+
+def find_sibling(directory, name, names=None):
+    """Caminho de `name` em `directory` sem diferenciar maiúsculas (como no Windows), ou None.
+
+    `names` (dict) guarda a listagem de cada pasta entre chamadas.
+    """
+    names = {} if names is None else names
+    if directory not in names:
+        try:
+            names[directory] = {entry.lower(): entry for entry in os.listdir(directory)}
+        except OSError:
+            names[directory] = {}
+    found = names[directory].get(name.lower())
+    return os.path.join(directory, found) if found else None
+
+
+def command_option(command, option):
+    """Valor que segue `option` na linha de comando (ex.: /map, -imptext)."""
+    if option in command:
+        i = command.index(option)
+        if i + 1 < len(command) and _is_value(command[i + 1]):
+            return command[i + 1]
+    return None
+
+
+def split_import_file(tool_args):
+    """(argumentos base, arquivo do -imptext ou None) para o make_jobs.
+
+    O PEditorBatch recoloca o arquivo logo depois do comando principal, então o -imptext
+    tem de ser o primeiro argumento; o /map precisa do padrão de colunas em seguida.
+    """
+    lowered = [a.lower() for a in tool_args]
+    if "/map" in lowered:
+        i = lowered.index("/map")
+        if i + 1 >= len(tool_args) or not _is_value(tool_args[i + 1]):
+            raise ValueError("/map sem o padrão de colunas em seguida (ex.: /map \"%FN %MSGIND %STRIND %NEWSTR\")")
+    if "-imptext" not in tool_args:
+        return list(tool_args), None
+    i = tool_args.index("-imptext")
+    if i != 0:
+        raise ValueError(f"o -imptext deve ser o primeiro argumento do PersonaEditorCMD (veio depois de {tool_args[i - 1]})")
+    if len(tool_args) > 1 and _is_value(tool_args[1]):
+        return tool_args[:1] + tool_args[2:], tool_args[1]
+    return list(tool_args), None
+
+
+class BuildCache:
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._stat_hashes = {}
+        self._tsv_rows = {}
+        self._font_digests = {}
+        self._dir_names = {}
+        if os.path.isfile(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == CACHE_VERSION:
+                    self.entries = data.get("entries", {})
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": CACHE_VERSION, "entries": self.entries}, f, indent=0, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def _hash(self, path):
+        """Hash de arquivo, reaproveitado enquanto mtime e tamanho não mudarem."""
+        st = os.stat(path)
+        key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+        if key not in self._stat_hashes:
+            self._stat_hashes[key] = hash_file(path)
+        return self._stat_hashes[key]
+
+    def _tsv_digests(self, tsv_path, map_pattern):
+        """Hash das linhas do TSV agrupadas pelo nome do arquivo (%FN)."""
+        key = (self._hash(tsv_path), map_pattern)
+        if key not in self._tsv_rows:
+            fields = (map_pattern or "%FN").split()
+            fn_col = fields.index("%FN") if "%FN" in fields else None
+            groups = {}
+            with open(tsv_path, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    cols = line.split('\t')
+                    stem = _stem(cols[fn_col]) if fn_col is not None and fn_col < len(cols) else ""
+                    groups.setdefault(stem, hashlib.blake2b(digest_size=16)).update(line.encode('utf-8'))
+            self._tsv_rows[key] = (fn_col, {stem: h.hexdigest() for stem, h in groups.items()})
+        return self._tsv_rows[key]
+
+    def _font_digest(self, exe_dir):
+        if exe_dir not in self._font_digests:
+            h = hashlib.blake2b(digest_size=16)
+            xml_path = os.path.join(exe_dir, "PersonaEditor.xml")
+            if os.path.isfile(xml_path):
+                h.update(self._hash(xml_path).encode())
+                try:
+                    root = ET.parse(xml_path).getroot()
+                    font_dir = os.path.join(exe_dir, "font")
+                    for tag in ("OldFont", "NewFont"):
+                        node = root.find(tag)
+                        if node is None or not node.text: continue
+                        for filename in sorted(os.listdir(font_dir)) if os.path.isdir(font_dir) else []:
+                            if os.path.splitext(filename)[0] == node.text:
+                                h.update(self._hash(os.path.join(font_dir, filename)).encode())
+                except ET.ParseError:
+                    pass
+            self._font_digests[exe_dir] = h.hexdigest()
+        return self._font_digests[exe_dir]
+
+    def inputs_digest(self, job):
+        """Hash de tudo que influencia o resultado do job, exceto o próprio alvo."""
+        command = job.command
+        h = hashlib.blake2b(digest_size=16)
+        h.update(json.dumps(command[1:]).encode('utf-8'))
+        exe_path = command[0]
+        if os.path.isfile(exe_path):
+            h.update(self._hash(exe_path).encode())
+            h.update(self._font_digest(os.path.dirname(os.path.abspath(exe_path))).encode())
+        stem = _stem(job.file_path)
+        import_file = command_option(command, "-imptext")
+        if import_file:
+            tsv_path = os.path.join(job.cwd, import_file)
+            if os.path.isfile(tsv_path):
+                fn_col, groups = self._tsv_digests(tsv_path, command_option(command, "/map"))
+                if fn_col is None:
+                    h.update(self._hash(tsv_path).encode())
+                else:
+                    for row_stem in sorted(groups):
+                        if row_stem.startswith(stem):
+                            h.update(row_stem.encode('utf-8')); h.update(groups[row_stem].encode())
+        elif "-imptext" in command:
+            # Sem arquivo depois do -imptext o PersonaEditorCMD lê o <nome>.TXT ao lado do alvo.
+            sibling = find_sibling(job.cwd, os.path.splitext(os.path.basename(job.file_path))[0] + ".TXT", self._dir_names)
+            if sibling is not None and os.path.isfile(sibling):
+                h.update(b"txt:"); h.update(self._hash(sibling).encode())
+        if "-impptp" in command and os.path.isdir(job.cwd):
+            for filename in sorted(os.listdir(job.cwd)):
+                if filename.upper().endswith(".PTP") and _stem(filename).startswith(stem):
+                    h.update(filename.encode('utf-8')); h.update(self._hash(os.path.join(job.cwd, filename)).encode())
+        return h.hexdigest()
+
+    def split(self, jobs):
+        """Separa os jobs em (sujos, limpos) e guarda o hash de entrada de cada um."""
+        dirty, clean = [], []
+        for job in jobs:
+            if getattr(job, "planned", False):
+                # Job do PEditorImport: o planejador já viu que o PTP muda, e o TSV de mudanças
+                # é temporário; sem inputs_digest ele também não é registrado.
+                dirty.append(job); continue
+            job.inputs_digest = self.inputs_digest(job)
+            entry = self.entries.get(_entry_key(job))
+            if (entry and entry.get("inputs") == job.inputs_digest and os.path.isfile(job.file_path)
+                    and entry.get("output") == self._hash(job.file_path)):
+                clean.append(job)
+            else:
+                dirty.append(job)
+        return dirty, clean
+
+    def record(self, results):
+        """Registra os jobs concluídos com sucesso."""
+        for result in results:
+            job = result.job
+            if not result.ok or not getattr(job, "inputs_digest", None) or not os.path.isfile(job.file_path):
+                continue
+            self.entries[_entry_key(job)] = {"inputs": job.inputs_digest, "output": self._hash(job.file_path)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Executa o PersonaEditorCMD apenas nos arquivos alterados.")
+    parser.add_argument("--cache", default=CACHE_FILE, help="Arquivo do manifesto (padrão: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None, help="Processos simultâneos (padrão: nº de CPUs)")
+    parser.add_argument("--full", action="store_true", help="Ignora o cache e reprocessa tudo")
+    parser.add_argument("exe")
+    parser.add_argument("pattern", help="Padrão recursivo dos arquivos, ex.: *.PTP")
+    parser.add_argument("tool_args", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    if not args.tool_args:
+        parser.error("informe o comando do PersonaEditorCMD (ex.: -imptext)")
+
+    exe_path = os.path.abspath(args.exe)
+    from PEditorScan import matcher, walk  # o PEditorScan importa o hash_file daqui
+    files = sorted(os.path.abspath(entry.path) for entry in walk(".", matcher(args.pattern)))
+    try:
+        base_args, import_file = split_import_file(args.tool_args)
+    except ValueError as e:
+        parser.error(str(e))
+    if import_file:
+        import_file = os.path.abspath(import_file)
+    jobs = make_jobs(exe_path, files, base_args, import_file)
+
+    cache = BuildCache(args.cache)
+    dirty, clean = cache.split(jobs)
+    if args.full:
+        dirty, clean = jobs, []
+    print(f"{len(dirty)} arquivo(s) para processar, {len(clean)} sem alterações.")
+    results = BatchRunner(dirty, args.workers, on_result=lambda r: print("\n".join(r.log_lines()))).run()
+    cache.record(results)
+    cache.save()
+    failed = sum(1 for r in results if not r.ok)
+    print(f"\nConcluído: {len(results) - failed} sucesso(s), {failed} falha(s).")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""Leitura das fontes configuradas no PersonaEditor.xml (pasta font/).
+
+FontRegistry guarda a listagem da pasta, a seleção do XML e os dados já lidos de cada
+fonte junto com o mtime/tamanho dos arquivos, e só relê o que mudou.
+"""
+import mmap
+import os
+import struct
+import xml.etree.ElementTree as ET
+from array import array
+
+GLYPH_BASE = 0x20  # índice do FNTMAP do primeiro glifo da fonte
+SPACE_CUT = (10, 20)  # o PersonaEditor grava o espaço assim no FNTCACHE, ignorando o .fnt
+
+
+def read_xml_fonts(xml_path):
+    """Devolve (OldFont, NewFont) do PersonaEditor.xml."""
+    root = ET.parse(xml_path).getroot()
+    old_node = root.find("OldFont"); new_node = root.find("NewFont")
+    return (old_node.text if old_node is not None else None, new_node.text if new_node is not None else None)
+
+
+def read_fntmap(path):
+    """Tabela índice do glifo -> caractere (0 = sem caractere) de um .FNTMAP."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return struct.unpack(f'<{len(data) // 2}H', data[:len(data) // 2 * 2])
+
+
+def _read_mapped(path, reader):
+    """Chama reader(mmap) com o arquivo mapeado e fecha o mapeamento em seguida.
+
+    O mapeamento não fica aberto entre leituras para não travar o arquivo no Windows
+    (o PersonaEditor regrava o FNTCACHE).
+    """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        return reader(m)
+
+
+def _fnt_cuts(m, name=""):
+    header_size, = struct.unpack_from('<I', m, 0)
+    width, height, glyph_size = struct.unpack_from('<HHH', m, 0x10)
+    bpp = glyph_size * 8 // (width * height) if width and height else 0
+    if bpp not in (4, 8):
+        raise ValueError(f"Fonte não suportada: {name}")
+    offset = header_size + (1 << bpp) * 4
+    size, = struct.unpack_from('<I', m, offset)
+    return m[offset + 4:offset + 4 + size]
+
+
+def read_fnt_cuts(path):
+    """Tabela (esquerda, direita) de cada glifo de um .fnt, lendo só o cabeçalho."""
+    return _read_mapped(path, lambda m: _fnt_cuts(m, os.path.basename(path)))
+
+
+def _fntcache_layout(m):
+    """(largura do glifo, bytes por glifo, offset do 1º glifo, nº de glifos) de um FNTCACHE."""
+    glyph_width, colors, count = struct.unpack_from('<III', m, 0x04)
+    glyph_bytes = glyph_width * glyph_width * (4 if colors <= 16 else 8) // 8
+    return glyph_width, glyph_bytes, 0x20 + colors * 4, count
+
+
+def read_fntcache_cuts(path):
+    """Tabela (esquerda, direita) de um .FNTCACHE: fica no fim do arquivo, depois dos glifos."""
+    return _read_mapped(path, lambda m: m[len(m) - _fntcache_layout(m)[3] * 2:])
+
+
+def read_fntcache_glyph(path, glyph):
+    """Pixels (índices da paleta, 4 ou 8 bpp) do glifo `glyph` de um .FNTCACHE, ou None."""
+    def reader(m):
+        _, glyph_bytes, offset, count = _fntcache_layout(m)
+        if not 0 <= glyph < count:
+            return None
+        start = offset + glyph * glyph_bytes
+        return m[start:start + glyph_bytes]
+    return _read_mapped(path, reader)
+
+
+class _CharWidths(dict):
+    def __missing__(self, key):
+        return 0
+
+
+class GlyphWidths:
+    """Largura (direita - esquerda) de cada caractere de uma fonte.
+
+    `widths` é um array('B') indexado pelo índice do FNTMAP; `by_char` é o mesmo dado
+    por caractere, para medir textos sem passar pelo índice.
+    """
+
+    def __init__(self, charmap, cuts):
+        self.widths = array('B', bytes(len(charmap)))
+        self.by_char = _CharWidths()
+        self.word_cache = {}
+        for index, char in enumerate(charmap):
+            glyph = index - GLYPH_BASE
+            if char == 0 or glyph < 0 or glyph * 2 + 1 >= len(cuts):
+                continue
+            left, right = SPACE_CUT if char == 0x20 else (cuts[glyph * 2], cuts[glyph * 2 + 1])
+            width = max(right - left, 0)
+            self.widths[index] = width
+            self.by_char.setdefault(chr(char), width)
+        self.chars = frozenset(self.by_char)
+
+    def measure(self, text):
+        return sum(map(self.by_char.__getitem__, text))
+
+    def measure_word(self, word):
+        """Como measure(), guardando o resultado: as mesmas palavras se repetem muito."""
+        width = self.word_cache.get(word)
+        if width is None:
+            width = self.word_cache[word] = self.measure(word)
+        return width
+
+    def missing(self, text):
+        """Caracteres de `text` que não existem na fonte."""
+        return set(text) - self.chars
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+class FontRegistry:
+    """Fontes da pasta font/ e seleção do PersonaEditor.xml de um diretório do executável.
+
+    Nada é lido antes de ser pedido. A listagem é refeita quando o mtime da pasta muda
+    (arquivo criado, apagado ou renomeado) e cada dado lido fica guardado com o
+    mtime/tamanho dos arquivos de origem.
+    """
+
+    def __init__(self, exe_dir):
+        self.exe_dir = exe_dir
+        self.font_dir = os.path.join(exe_dir, "font")
+        self.xml_path = os.path.join(exe_dir, "PersonaEditor.xml")
+        self._dir_stamp = None
+        self._files = {}
+        self._cache = {}
+
+    def _scan(self):
+        try:
+            stamp = os.stat(self.font_dir).st_mtime_ns
+        except OSError:
+            self._dir_stamp = None; self._files = {}
+            return
+        if stamp == self._dir_stamp:
+            return
+        files = {}
+        with os.scandir(self.font_dir) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    stem, ext = os.path.splitext(entry.name)
+                    files.setdefault(stem, {}).setdefault(ext[1:].upper(), entry.path)
+        self._files = files; self._dir_stamp = stamp
+
+    def _cached(self, key, paths, loader):
+        stamps = tuple(_stamp(path) for path in paths)
+        hit = self._cache.get(key)
+        if hit is not None and hit[0] == stamps:
+            return hit[1]
+        value = loader()
+        self._cache[key] = (stamps, value)
+        return value
+
+    def fonts(self):
+        """Nomes das fontes com .FNTMAP, em ordem alfabética."""
+        self._scan()
+        return sorted(name for name, files in self._files.items() if "FNTMAP" in files)
+
+    def font_file(self, name, extension):
+        self._scan()
+        return self._files.get(name, {}).get(extension.upper())
+
+    def selected(self):
+        """(OldFont, NewFont) do PersonaEditor.xml; ET.ParseError se estiver malformado."""
+        return self._cached("xml", [self.xml_path], lambda: read_xml_fonts(self.xml_path))
+
+    def charmap(self, name):
+        path = self.font_file(name, "FNTMAP")
+        if path is None:
+            raise FileNotFoundError(f"FNTMAP da fonte {name} não encontrado em {self.font_dir}")
+        return self._cached(("map", name), [path], lambda: read_fntmap(path))
+
+    def _cuts_file(self, name):
+        path = self.font_file(name, "FNTCACHE") or self.font_file(name, "FNT")
+        if path is None:
+            raise FileNotFoundError(f"FNTCACHE/FNT da fonte {name} não encontrado em {self.font_dir}")
+        return path
+
+    def widths(self, name):
+        """GlyphWidths da fonte: FNTMAP + tabela do FNTCACHE (preferida) ou do .fnt."""
+        charmap = self.charmap(name)
+        map_path = self.font_file(name, "FNTMAP"); cuts_path = self._cuts_file(name)
+        def load():
+            reader = read_fntcache_cuts if cuts_path.upper().endswith(".FNTCACHE") else read_fnt_cuts
+            return GlyphWidths(charmap, reader(cuts_path))
+        return self._cached(("widths", name), [map_path, cuts_path], load)
+
+    def glyph(self, name, index):
+        """Pixels do glifo do índice `index` do FNTMAP (só do FNTCACHE; o .fnt é comprimido)."""
+        path = self.font_file(name, "FNTCACHE")
+        return read_fntcache_glyph(path, index - GLYPH_BASE) if path else None
+
+
+_registries = {}
+
+
+def font_registry(exe_dir):
+    """FontRegistry compartilhado do diretório do executável."""
+    key = os.path.normcase(os.path.abspath(exe_dir))
+    if key not in _registries:
+        _registries[key] = FontRegistry(exe_dir)
+    return _registries[key]
+
+
+def load_charmaps(exe_dir):
+    """Carrega (mapa antigo, mapa novo) das fontes selecionadas no PersonaEditor.xml."""
+    registry = font_registry(exe_dir)
+    maps = []
+    for name in registry.selected():
+        maps.append(registry.charmap(name) if name and registry.font_file(name, "FNTMAP") else ())
+    return tuple(maps)
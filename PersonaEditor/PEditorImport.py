@@ -0,0 +1,315 @@
+"""Importação TSV -> PTP que só abre e grava os PTPs com strings alteradas.
+
+O planejador lê cada TSV uma única vez (com o mesmo /map do -imptext), agrupa as linhas
+por %FN e (%MSGIND, %STRIND) e compara com o texto novo atual de cada PTP. O resultado é
+o conjunto mínimo de mudanças: um FilePlan por PTP afetado, com as strings e os nomes que
+mudam. PTPs sem nenhuma linha no TSV nem chegam a ser abertos.
+
+Os PTPs vindos do BMD/BF guardam as quebras de linha como "\\n", e o TSV como {0A}; na
+comparação os dois são iguais. Com /auto o PersonaEditorCMD quebra as linhas inserindo
+"\\n" (no lugar de um espaço ou em qualquer ponto, até colado a um código); a
+comparação aceita essas quebras misturadas com os {0A} do próprio texto. Depois de
+mudar a largura do /auto ou a fonte, rode com --full.
+
+Sem --auto as mudanças são gravadas aqui mesmo (PEditorPTP). Com --auto o PersonaEditorCMD
+roda só nos PTPs afetados, lendo um TSV só com as linhas alteradas. Sem --tsv, cada PTP
+usa o <nome>.TXT ao lado, como o TSV-PTP.bat.
+
+Uso: python PEditorImport.py [--tsv TSV ...] [--map PADRÃO] [--auto 600 --exe EXE] [--dry-run] [--full] PTPs/PASTAS...
+"""
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+from collections import namedtuple
+
+from PEditorBatch import BatchRunner, make_jobs
+from PEditorCache import command_option, find_sibling, split_import_file
+from PEditorFont import load_charmaps
+from PEditorPTP import PTP, TextMap, find_ptps, name_targets, text_targets
+
+DEFAULT_MAP = "%FN %MSGIND %STRIND %I %I %NEWSTR"
+NEWLINE_CODE = "{0A}"
+NEWLINE_CODES = re.compile(re.escape(NEWLINE_CODE), re.IGNORECASE)
+CHANGES_NAME = "changes.tsv"
+SUMMARY_LIMIT = 8  # posições (MSG/string) listadas por arquivo no resumo
+
+Change = namedtuple("Change", "msg_index str_index old new")
+NameChange = namedtuple("NameChange", "index old new")
+# files: FilePlans dos PTPs que mudam; opened: PTPs lidos; total: PTPs considerados; errors: {caminho: erro}
+ImportPlan = namedtuple("ImportPlan", "files opened total errors")
+
+
+class FilePlan:
+    __slots__ = ("path", "strings", "names")
+
+    def __init__(self, path, strings=None, names=None):
+        self.path = path
+        self.strings = strings if strings is not None else []
+        self.names = names if names is not None else []
+
+    def summary(self):
+        """Linha do resumo: arquivo, quantas strings e nomes mudam e onde (MSG/string)."""
+        where = ", ".join(f"{c.msg_index}/{c.str_index}" for c in self.strings[:SUMMARY_LIMIT])
+        if len(self.strings) > SUMMARY_LIMIT:
+            where += ", ..."
+        line = f"{os.path.basename(self.path)}: {len(self.strings)} string(s)"
+        if self.names:
+            line += f", {len(self.names)} nome(s)"
+        return line + (f" [{where}]" if where else "")
+
+
+def wrapped_from(current, new):
+    """`current` sai de `new` só com as quebras do /auto? ({0A} conta como "\\n" dos dois lados)
+
+    O /auto só acrescenta "\\n" (em qualquer ponto, inclusive colado a um código) ou troca um
+    espaço por "\\n"; o resto do texto tem de ser idêntico.
+    """
+    current = NEWLINE_CODES.sub("\n", current); new = NEWLINE_CODES.sub("\n", new)
+    i = j = 0
+    while i < len(current):
+        char = current[i]
+        if j < len(new) and char == new[j]:
+            i += 1; j += 1
+        elif char != "\n":
+            return False
+        elif j < len(new) and new[j] == " " and current[i:].lstrip("\n")[:1] != " ":
+            i += 1; j += 1  # espaço trocado pela quebra
+        else:
+            i += 1  # quebra acrescentada
+    return j == len(new)
+
+
+def same_text(current, new, auto=False):
+    """O texto novo do PTP já é `new`? "\\n" vale como {0A} e, com /auto, as quebras dele são ignoradas.
+
+    >>> same_text("Hello there\\nmy friend\\nsecond", "Hello there my friend{0A}second", auto=True)
+    True
+    >>> same_text("with {F2 01}\\nCourage{F2 02} you \\nto{0A}give", "with {F2 01}Courage{F2 02} you to{0A}give", auto=True)
+    True
+    >>> same_text("Hello there\\nmy friend\\nsecond", "Hello there my friend{0A}second")
+    False
+    >>> same_text("Hello\\nthere", "Hello{0A}there")
+    True
+    >>> same_text("Hello\\nthere", "Hellothere!", auto=True)
+    False
+    """
+    if current == new:
+        return True
+    if auto:
+        return wrapped_from(current, new)
+    return "\n" in current and current.replace("\n", NEWLINE_CODE) == new
+
+
+def read_tsvs(paths, pattern=DEFAULT_MAP, encoding="utf-8"):
+    """Lê os TSVs uma vez e junta as linhas; numa repetição vale a do último TSV."""
+    text_map = TextMap(pattern); strings = {}; names = {}
+    for path in paths:
+        file_strings, file_names = text_map.parse(path, encoding)
+        for file_name, rows in file_strings.items():
+            strings.setdefault(file_name, {}).update(rows)
+        names.update(file_names)
+    return strings, names
+
+
+def plan_file(path, strings, names, charmap=None, auto=False, full=False):
+    """FilePlan de um PTP, ou None se nada muda. Com `full`, toda linha do TSV conta como mudança."""
+    if names and charmap is None:
+        raise ValueError("Comparar nomes (%OLDNM %NEWNM) precisa da fonte antiga (charmap).")
+    file_name = os.path.basename(path)
+    ptp = PTP.load(path)
+    plan = FilePlan(path)
+    for msg_index, str_index, string, new_str in text_targets(ptp, file_name, strings):
+        if full or not same_text(string.new, new_str, auto):
+            plan.strings.append(Change(msg_index, str_index, string.new, new_str))
+    if names:
+        for index, name, new_name in name_targets(ptp, names, charmap):
+            if full or name.new != new_name:
+                plan.names.append(NameChange(index, name.new, new_name))
+    return plan if plan.strings or plan.names else None
+
+
+def plan_import(ptp_paths, tsv_paths=None, pattern=DEFAULT_MAP, encoding="utf-8", charmap=None, auto=False, full=False):
+    """ImportPlan dos PTPs. Sem `tsv_paths`, cada PTP é comparado com o <nome>.TXT ao lado."""
+    shared = read_tsvs(tsv_paths, pattern, encoding) if tsv_paths else None
+    plans = []; opened = 0; total = 0; errors = {}; dir_names = {}
+    for path in ptp_paths:
+        total += 1
+        try:
+            if shared is not None:
+                strings, names = shared
+            else:
+                stem = os.path.splitext(os.path.basename(path))[0]
+                sibling = find_sibling(os.path.dirname(os.path.abspath(path)), stem + ".TXT", dir_names)
+                if sibling is None:
+                    continue
+                strings, names = read_tsvs([sibling], pattern, encoding)
+            if os.path.basename(path).lower() not in strings and not names:
+                continue
+            opened += 1
+            plan = plan_file(path, strings, names, charmap, auto, full)
+        except (OSError, ValueError) as e:
+            errors[path] = str(e); continue
+        if plan is not None:
+            plans.append(plan)
+    return ImportPlan(plans, opened, total, errors)
+
+
+def apply_plan(plan, strings=True, names=True):
+    """Grava as mudanças de um FilePlan direto no PTP (sem a quebra do /auto)."""
+    ptp = PTP.load(plan.path)
+    for change in plan.strings if strings else ():
+        ptp.messages[change.msg_index].strings[change.str_index].new = change.new
+    for change in plan.names if names else ():
+        ptp.names[change.index].new = change.new
+    ptp.save(plan.path)
+
+
+def write_changes(plans, path):
+    """TSV (no /map padrão) só com as strings que mudam, para o -imptext do PersonaEditorCMD."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        for plan in plans:
+            file_name = os.path.basename(plan.path)
+            f.writelines(f"{file_name}\t{c.msg_index}\t{c.str_index}\t\t\t{c.new}\n" for c in plan.strings)
+    os.replace(tmp_path, path)
+
+
+def import_path(path, cwd):
+    """Caminho do TSV relativo à pasta do job: no Linux/Wine um caminho começando com "/" vira opção."""
+    try:
+        return os.path.relpath(path, cwd)
+    except ValueError:  # outra unidade no Windows
+        return os.path.abspath(path)
+
+
+def tool_jobs(exe_path, files, base_args, change_path):
+    """Jobs do -imptext com o TSV de mudanças, um por PTP (marcados com `planned`, fora do BuildCache)."""
+    jobs = []
+    for path in map(os.path.abspath, files):
+        jobs.extend(make_jobs(exe_path, [path], base_args, import_path(change_path, os.path.dirname(path))))
+    for job in jobs:
+        job.planned = True
+    return jobs
+
+
+def tool_args(command):
+    """Argumentos do -imptext sem o arquivo de importação, /map, /enc e /skipempty (o TSV de mudanças não precisa)."""
+    args = split_import_file(command[2:])[0]
+    out = []; skip = False
+    for arg in args:
+        if skip:
+            skip = False
+        elif arg in ("/map", "/enc"):
+            skip = True
+        elif arg != "/skipempty":
+            out.append(arg)
+    return out
+
+
+def plan_jobs(jobs, change_path, full=False):
+    """Reduz os jobs de -imptext em PTPs aos PTPs que mudam, lendo `change_path` (só as linhas alteradas).
+
+    Devolve (jobs, ImportPlan). Jobs de outros arquivos (BF, BMD, contêineres) e com /lbl
+    passam sem mudança, assim como os dos PTPs com nomes alterados: o TSV de mudanças só
+    tem strings, e o job original grava os nomes do jeito que o comando pede (-save /ovrw).
+    Nada é gravado nos PTPs durante o planejamento.
+    """
+    groups = {}; grouped = set()
+    for job in jobs:
+        command = job.command
+        if len(command) > 2 and command[2] == "-imptext" and job.file_path.upper().endswith(".PTP") and "/lbl" not in command:
+            import_file = command_option(command, "-imptext")
+            if import_file:
+                import_file = os.path.join(job.cwd, import_file)
+            key = (import_file, command_option(command, "/map") or DEFAULT_MAP, command_option(command, "/enc") or "utf-8",
+                   "/auto" in command, os.path.dirname(os.path.abspath(command[0])))
+            groups.setdefault(key, []).append(job); grouped.add(id(job))
+    plans = {}; opened = total = 0; errors = {}
+    for (import_file, pattern, encoding, auto, exe_dir), group in groups.items():
+        charmap = load_charmaps(exe_dir)[0] if "%NEWNM" in pattern else None
+        plan = plan_import([job.file_path for job in group], [import_file] if import_file else None,
+                           pattern, encoding, charmap, auto, full)
+        plans.update((p.path, p) for p in plan.files)
+        opened += plan.opened; total += plan.total; errors.update(plan.errors)
+    planned = []
+    for job in jobs:
+        if id(job) not in grouped or job.file_path in errors:
+            planned.append(job); continue
+        plan = plans.get(job.file_path)
+        if plan is None:
+            continue
+        if plan.names:
+            planned.append(job)
+        elif plan.strings:
+            planned.extend(tool_jobs(job.command[0], [job.file_path], tool_args(job.command), change_path))
+    write_changes([p for p in plans.values() if p.strings and not p.names], change_path)
+    return planned, ImportPlan(list(plans.values()), opened, total, errors)
+
+
+def summary_lines(plan):
+    """Resumo por arquivo e totais de um ImportPlan."""
+    lines = [f"  {file_plan.summary()}" for file_plan in plan.files]
+    lines += [f"  ERRO: {path}: {error}" for path, error in plan.errors.items()]
+    strings = sum(len(p.strings) for p in plan.files); names = sum(len(p.names) for p in plan.files)
+    lines.append(f"{len(plan.files)} PTP(s) com mudanças ({strings} string(s), {names} nome(s)); "
+                 f"{plan.opened} de {plan.total} PTP(s) tinham linhas no TSV.")
+    return lines
+
+
+def main(argv=None):
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Importa TSV para PTP abrindo e gravando só os PTPs que mudam.")
+    parser.add_argument("paths", nargs="+", help="PTPs ou pastas (recursivas)")
+    parser.add_argument("--tsv", action="append", default=[], help="TSV de tradução; pode repetir (padrão: <nome>.TXT ao lado de cada PTP)")
+    parser.add_argument("--map", default=DEFAULT_MAP, help='Padrão das colunas, como o /map (padrão: "%(default)s")')
+    parser.add_argument("--enc", default="utf-8")
+    parser.add_argument("--auto", type=int, default=None, help="Largura do /auto; a importação passa a ser feita pelo --exe")
+    parser.add_argument("--exe", default=None, help="PersonaEditorCMD.exe (obrigatório com --auto)")
+    parser.add_argument("--exe-dir", default=here, help="Pasta com PersonaEditor.xml e font/, para comparar nomes (padrão: pasta deste script)")
+    parser.add_argument("--workers", type=int, default=None, help="Processos simultâneos com --exe (padrão: nº de CPUs)")
+    parser.add_argument("--changes", default=None, help="Grava também o TSV só com as linhas alteradas neste arquivo")
+    parser.add_argument("--dry-run", action="store_true", help="Só mostra o que mudaria")
+    parser.add_argument("--full", action="store_true", help="Reimporta todas as linhas do TSV, mesmo as iguais ao PTP")
+    args = parser.parse_args(argv)
+    if args.auto is not None and not args.exe:
+        parser.error("--auto precisa do --exe (a quebra de linha é feita pelo PersonaEditorCMD)")
+
+    charmap = load_charmaps(args.exe_dir)[0] if "%NEWNM" in args.map else None
+    plan = plan_import(list(find_ptps(args.paths)), args.tsv or None, args.map, args.enc, charmap,
+                       args.auto is not None, args.full)
+    print("\n".join(summary_lines(plan)))
+    if args.changes:
+        write_changes(plan.files, args.changes)
+    if args.dry_run or not plan.files:
+        return 1 if plan.errors else 0
+
+    failed = 0
+    if args.auto is None:
+        for file_plan in plan.files:
+            try:
+                apply_plan(file_plan)
+            except (OSError, ValueError) as e:
+                print(f"ERRO: {file_plan.path}: {e}"); failed += 1
+    else:
+        work_dir = tempfile.mkdtemp(prefix="peditor_import_")
+        try:
+            change_path = os.path.join(work_dir, CHANGES_NAME)
+            write_changes(plan.files, change_path)
+            for file_plan in plan.files:
+                if file_plan.names:
+                    apply_plan(file_plan, strings=False)
+            files = [p.path for p in plan.files if p.strings]
+            jobs = tool_jobs(os.path.abspath(args.exe), files, ["-imptext", "/auto", str(args.auto), "-save", "/ovrw"], change_path)
+            results = BatchRunner(jobs, args.workers, on_result=lambda r: None if r.ok else print("\n".join(r.log_lines()))).run()
+            failed = sum(1 for r in results if not r.ok)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    print(f"{len(plan.files) - failed} PTP(s) gravado(s), {failed} falha(s).")
+    return 1 if failed or plan.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,409 @@
+"""Execução de pipelines descritos num arquivo de job (TOML, JSON ou YAML), sem interface.
+
+Cada passo roda o PersonaEditorCMD.exe (ou uma ação interna) sobre um conjunto de
+arquivos. Os passos formam um grafo pelo campo `after`; os que não dependem uns dos
+outros rodam juntos, dividindo os processos simultâneos. No fim é gravado um relatório
+JSON com o resultado de cada passo e de cada arquivo. Não importa o PyQt6.
+
+Exemplo (compilar.toml):
+
+    exe = "PersonaEditor/PersonaEditorCMD.exe"
+    workers = 8
+    report = "relatorio.json"
+
+    [steps.copiar]
+    action = "copy"
+    from = "IN"
+    to = "OUT"
+
+    [steps.nomes]
+    after = ["copiar"]
+    files = ["OUT/**/*"]
+    args = ["-imptext", "/sub", "/map", "%OLDNM %NEWNM", "-save", "/ovrw"]
+    import_file = "Text/Names.txt"
+
+    [steps.ptp]
+    action = "bf-ptp"
+    dir = "OUT"
+
+Caminhos são relativos à pasta do arquivo de job. Ações prontas (ACTIONS) equivalem
+aos .bat da pasta PersonaEditor; `files`, `dir`, `pattern` e `args` as sobrescrevem.
+As ações *-ptp usam o PEditorMSG.py (sem abrir o PersonaEditorCMD); com `args` voltam
+a chamar o executável.
+A ação "run" executa `command` uma vez na pasta do job ("python" vira o Python atual).
+O Compilar.toml na raiz do projeto faz o mesmo que o Compilar.ps1.
+
+No fim aparece a tabela de tempos por comando e por tipo de arquivo (PEditorProfile);
+--trace grava o trace do lote (chrome://tracing) e --cprofile um .prof por passo em Python.
+Com `resident = true` no job (ou --resident), cada processo paralelo carrega o executável uma
+vez e recebe vários arquivos (PEditorWorker); sem o pythonnet, volta a um processo por arquivo.
+Nos passos de -imptext, os PTPs só são abertos se alguma string mudou (PEditorImport), e o
+executável lê um TSV só com as linhas alteradas; --full reimporta tudo.
+
+Uso: python PEditorJobs.py JOB [--workers N] [--report ARQ] [--cache ARQ] [--full] [--only PASSO ...] [-v]
+                           [--trace ARQ] [--cprofile PASTA] [--resident]
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PEditorBatch import BatchRunner, default_workers, make_jobs
+from PEditorCache import BuildCache
+from PEditorProfile import Profiler
+from PEditorScan import matcher, walk
+from PEditorWorker import WorkerPool
+
+# ação -> (padrão dos arquivos, argumentos do PersonaEditorCMD)
+ACTIONS = {
+    "arc-bf": ("*.ARC", ["-expbf", "/sub"]),
+    "bf-arc": ("*.BF", ["-impall", "/sub", "-save", "/ovrw"]),
+    "bf-ptp": ("*.BF", None),
+    "bmd-ptp": ("*.BMD", None),
+    "pm1-ptp": ("*.PM1", None),
+    "ptp-tsv": ("*.PTP", None),
+    "tsv-ptp": ("*.PTP", ["-imptext", "/sub", "/auto", "600", "-save", "/ovrw"]),
+    "ptp-bf": ("*.BF", ["-impptp", "/sub", "-save", "/ovrw"]),
+    "ptp-bmd": ("*.BMD", ["-impptp", "/sub", "-save", "/ovrw"]),
+    "copy": (None, None),
+    "run": (None, None),
+}
+# Ações feitas em Python, sem o PersonaEditorCMD (a não ser que o passo informe `args`).
+NATIVE_ACTIONS = {"copy", "run", "ptp-tsv", "bf-ptp", "bmd-ptp", "pm1-ptp"}
+
+
+def load_spec(path):
+    """Lê o arquivo de job conforme a extensão (.toml, .json, .yaml/.yml)."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".json":
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    if ext in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("Arquivos YAML precisam do PyYAML (pip install pyyaml).")
+        with open(path, 'r', encoding='utf-8') as f:
+            return yaml.safe_load(f) or {}
+    try:
+        import tomllib
+    except ImportError:
+        import tomli as tomllib
+    with open(path, 'rb') as f:
+        return tomllib.load(f)
+
+
+def find_files(root, pattern):
+    """Arquivos de `root` (recursivo) cujo nome casa com `pattern`, sem diferenciar maiúsculas."""
+    return sorted(entry.path for entry in walk(root, matcher(pattern)))
+
+
+class Step:
+    def __init__(self, name, spec, base_dir):
+        action = spec.get("action")
+        if action is not None and action not in ACTIONS:
+            raise ValueError(f"Passo '{name}': ação desconhecida '{action}'.")
+        pattern, args = ACTIONS.get(action, (None, None))
+        self.name = name
+        self.action = action
+        self.after = list(spec.get("after", []))
+        self.base_dir = base_dir
+        self.pattern = spec.get("pattern", pattern)
+        self.dir = spec.get("dir", ".")
+        self.files = spec.get("files")
+        self.args = list(spec.get("args", args or []))
+        self.import_file = spec.get("import_file")
+        self.source = spec.get("from"); self.target = spec.get("to")
+        self.rmvspl = bool(spec.get("rmvspl", False))
+        self.command = list(spec.get("command", []))
+        if action == "copy" and not (self.source and self.target):
+            raise ValueError(f"Passo '{name}': a ação copy precisa de 'from' e 'to'.")
+        if action == "run" and not self.command:
+            raise ValueError(f"Passo '{name}': a ação run precisa de 'command'.")
+        if action not in NATIVE_ACTIONS and not self.args:
+            raise ValueError(f"Passo '{name}': informe 'action' ou 'args'.")
+
+    def path(self, relative):
+        return os.path.normpath(os.path.join(self.base_dir, relative))
+
+    def resolve_files(self):
+        """Lista de arquivos do passo, resolvida só na hora de rodar (passos anteriores criam arquivos)."""
+        if self.files is not None:
+            files = set()
+            for entry in ([self.files] if isinstance(self.files, str) else self.files):
+                files.update(p for p in glob.glob(self.path(entry), recursive=True) if os.path.isfile(p))
+            return sorted(files)
+        return find_files(self.path(self.dir), self.pattern or "*")
+
+
+def stages(steps):
+    """Agrupa os passos em estágios: cada estágio só depende dos anteriores."""
+    pending = {name: set(step.after) for name, step in steps.items()}
+    for name, deps in pending.items():
+        unknown = deps - steps.keys()
+        if unknown:
+            raise ValueError(f"Passo '{name}' depende de passo inexistente: {', '.join(sorted(unknown))}")
+    done = set(); order = []
+    while pending:
+        ready = sorted(name for name, deps in pending.items() if deps <= done)
+        if not ready:
+            raise ValueError(f"Dependência circular entre os passos: {', '.join(sorted(pending))}")
+        order.append(ready); done.update(ready)
+        for name in ready:
+            del pending[name]
+    return order
+
+
+class JobRunner:
+    """Executa os passos de um arquivo de job e monta o relatório."""
+
+    def __init__(self, spec, base_dir, workers=None, cache_path=None, full=False, only=None, log=print, verbose=False,
+                 profiler=None, resident=None):
+        self.base_dir = base_dir
+        self.exe_path = os.path.normpath(os.path.join(base_dir, spec.get("exe", "PersonaEditorCMD.exe")))
+        self.workers = max(1, workers or spec.get("workers") or default_workers())
+        self.steps = {name: Step(name, step_spec, base_dir) for name, step_spec in spec.get("steps", {}).items()}
+        if only:
+            missing = set(only) - self.steps.keys()
+            if missing:
+                raise ValueError(f"Passo(s) inexistente(s): {', '.join(sorted(missing))}")
+            self.steps = {name: step for name, step in self.steps.items() if name in only}
+            for step in self.steps.values():
+                step.after = [dep for dep in step.after if dep in self.steps]
+        cache_path = cache_path or spec.get("cache")
+        self.cache = BuildCache(os.path.join(base_dir, cache_path)) if cache_path else None
+        self.full = full
+        self.log = log
+        self.verbose = verbose
+        self.profiler = profiler or Profiler()
+        self.resident = bool(spec.get("resident", False) if resident is None else resident)
+        self._lock = threading.Lock()
+        self._runners = []
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+        with self._lock:
+            runners = list(self._runners)
+        for runner in runners:
+            runner.cancel()
+
+    def run(self):
+        started = time.time()
+        report = {"exe": self.exe_path, "workers": self.workers, "started": started, "steps": {}}
+        failed = set()
+        for stage in stages(self.steps):
+            runnable = []
+            for name in stage:
+                blocked = [dep for dep in self.steps[name].after if dep in failed]
+                if blocked or self._cancel.is_set():
+                    status = "cancelado" if self._cancel.is_set() else "pulado"
+                    report["steps"][name] = {"status": status, "blocked_by": blocked}
+                    failed.add(name); self.log(f"[{name}] {status}")
+                else:
+                    runnable.append(name)
+            if not runnable:
+                continue
+            share = max(1, self.workers // len(runnable))
+            with ThreadPoolExecutor(max_workers=len(runnable)) as pool:
+                for name, step_report in zip(runnable, pool.map(lambda n: self._run_step(self.steps[n], share), runnable)):
+                    report["steps"][name] = step_report
+                    if step_report["status"] != "ok":
+                        failed.add(name)
+        if self.cache is not None:
+            self.cache.save()
+        report["finished"] = time.time()
+        report["duration"] = round(report["finished"] - started, 3)
+        report["ok"] = not failed
+        return report
+
+    def _run_step(self, step, workers):
+        self.log(f"[{step.name}] iniciando")
+        start = time.perf_counter()
+        try:
+            if step.action == "copy":
+                with self.profiler.span(step.name, step.action):
+                    data = self._copy(step)
+            elif step.action == "run":
+                with self.profiler.span(step.name, step.action):
+                    data = self._run_command(step)
+            elif step.action == "ptp-tsv":
+                with self.profiler.span(step.name, step.action):
+                    data = self._export_text(step)
+            elif step.action in ("bf-ptp", "bmd-ptp", "pm1-ptp") and not step.args:
+                with self.profiler.span(step.name, step.action):
+                    data = self._export_ptp(step, workers)
+            else:
+                data = self._run_tool(step, workers)
+        except Exception as e:
+            data = {"status": "erro", "error": str(e)}
+        data["duration"] = round(time.perf_counter() - start, 3)
+        self.log(f"[{step.name}] {data['status']} ({data['duration']:.1f}s)")
+        return data
+
+    def _copy(self, step):
+        shutil.copytree(step.path(step.source), step.path(step.target), dirs_exist_ok=True)
+        return {"status": "ok"}
+
+    def _run_command(self, step):
+        command = [sys.executable if i == 0 and arg == "python" else arg for i, arg in enumerate(step.command)]
+        proc = subprocess.run(command, cwd=self.base_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              text=True, encoding='utf-8', errors='replace')
+        if proc.stdout.strip() and (self.verbose or proc.returncode != 0):
+            self.log(proc.stdout.strip())
+        data = {"status": "ok" if proc.returncode == 0 else "falha", "returncode": proc.returncode}
+        if proc.returncode != 0:
+            data["output"] = proc.stdout.strip()[-2000:]
+        return data
+
+    def _export_text(self, step):
+        from PEditorFont import load_charmaps
+        from PEditorPTP import bulk_export_text
+        files = step.resolve_files()
+        old_charmap, _ = load_charmaps(os.path.dirname(self.exe_path))
+        bulk_export_text(files, old_charmap, rmvspl=step.rmvspl)
+        return {"status": "ok", "files": len(files)}
+
+    def _export_ptp(self, step, workers):
+        from PEditorMSG import collisions, export_ptp, run
+        files = step.resolve_files()
+        results = run(files, export_ptp, workers) if files else []
+        for path, message in collisions(results):
+            self.log(f"[{step.name}] AVISO: {path}: {message}")
+        failed = {path: error for path, _, error in results if error}
+        for path, error in failed.items():
+            self.log(f"[{step.name}] ERRO: {path}: {error}")
+        return {"status": "falha" if failed else "ok", "files": len(files),
+                "ptps": sum(len(written) for _, written, _ in results), "errors": failed}
+
+    def _run_tool(self, step, workers):
+        files = step.resolve_files()
+        import_file = step.path(step.import_file) if step.import_file else None
+        jobs = make_jobs(self.exe_path, files, step.args, import_file)
+        planned = work_dir = None
+        if step.args[0] == "-imptext" and not self.full:
+            from PEditorImport import CHANGES_NAME, plan_jobs, summary_lines
+            work_dir = tempfile.mkdtemp(prefix="peditor_import_")
+            jobs, planned = plan_jobs(jobs, os.path.join(work_dir, CHANGES_NAME))
+            for line in summary_lines(planned):
+                self.log(f"[{step.name}] {line.strip()}")
+        clean = []
+        if self.cache is not None:
+            dirty, clean = self.cache.split(jobs)
+            if not self.full:
+                jobs = dirty
+            else:
+                clean = []
+        pool = WorkerPool(self.exe_path) if self.resident and jobs else None
+        runner = BatchRunner(jobs, workers, on_result=lambda r: self._report_result(step, r), profiler=self.profiler, pool=pool)
+        with self._lock:
+            self._runners.append(runner)
+        if self._cancel.is_set():
+            runner.cancel()
+        try:
+            results = runner.run()
+        finally:
+            with self._lock:
+                self._runners.remove(runner)
+            if pool is not None:
+                pool.close()
+            if work_dir is not None:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        if pool is not None and pool.disabled:
+            self.log(f"[{step.name}] AVISO: modo residente indisponível ({pool.disabled}); um processo por arquivo.")
+        if self.cache is not None:
+            self.cache.record(results)
+        failures = [r for r in results if not r.ok]
+        status = "cancelado" if runner.cancelled and self._cancel.is_set() else ("falha" if failures else "ok")
+        data = {"status": status, "files": len(files), "processed": len(results), "unchanged": len(clean),
+                "failed": len(failures), "results": [_result_entry(r) for r in results]}
+        if planned is not None:
+            data["import_plan"] = {file_plan.path: {"strings": [[c.msg_index, c.str_index] for c in file_plan.strings],
+                                                    "names": len(file_plan.names)} for file_plan in planned.files}
+        return data
+
+    def _report_result(self, step, result):
+        if self.verbose or not result.ok:
+            lines = result.log_lines()
+            lines[0] = f"\n[{step.name}] " + lines[0].lstrip("\n")
+            self.log("\n".join(lines))
+
+
+def _result_entry(result):
+    entry = {"file": result.job.file_path, "returncode": result.returncode, "ok": result.ok,
+             "duration": round(result.duration, 3)}
+    if result.timing is not None:
+        timing = result.timing
+        entry.update(spawn=round(timing.spawn, 4), user=timing.user, system=timing.system,
+                     read_bytes=timing.read_bytes, write_bytes=timing.write_bytes)
+    if result.cancelled: entry["cancelled"] = True
+    if result.error is not None: entry["error"] = str(result.error)
+    if not result.ok and result.stderr: entry["stderr"] = result.stderr.strip()[-2000:]
+    return entry
+
+
+def write_report(report, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Executa um pipeline do PersonaEditorCMD descrito num arquivo de job.")
+    parser.add_argument("job")
+    parser.add_argument("--workers", type=int, default=None, help="Processos simultâneos (padrão: do job ou nº de CPUs)")
+    parser.add_argument("--report", default=None, help="Relatório JSON (padrão: o 'report' do job)")
+    parser.add_argument("--cache", default=None, help="Manifesto do cache incremental (padrão: o 'cache' do job)")
+    parser.add_argument("--full", action="store_true", help="Ignora o cache e reprocessa tudo")
+    parser.add_argument("--only", nargs="+", default=None, help="Roda apenas estes passos")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Mostra o log de todos os arquivos, não só das falhas")
+    parser.add_argument("--trace", default=None, help="Grava o trace do lote (chrome://tracing / Perfetto) neste arquivo")
+    parser.add_argument("--cprofile", default=None, help="Pasta para os .prof do cProfile dos passos em Python")
+    parser.add_argument("--resident", action="store_true", default=None,
+                        help="Workers residentes: carrega o executável uma vez por processo (precisa do pythonnet)")
+    args = parser.parse_args(argv)
+
+    job_path = os.path.abspath(args.job); base_dir = os.path.dirname(job_path)
+    try:
+        spec = load_spec(job_path)
+        runner = JobRunner(spec, base_dir, args.workers, args.cache, args.full, args.only, verbose=args.verbose,
+                           profiler=Profiler(args.cprofile), resident=args.resident)
+        stages(runner.steps)
+    except (OSError, ValueError) as e:
+        print(f"ERRO: {e}"); return 2
+    outcome = {}
+    worker = threading.Thread(target=lambda: outcome.update(report=runner.run()), daemon=True)
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(0.2)
+    except KeyboardInterrupt:
+        print("Cancelando..."); runner.cancel(); worker.join()
+    if "report" not in outcome:
+        return 1
+    report = outcome["report"]
+    report["job"] = job_path
+    report_path = args.report or spec.get("report")
+    if report_path:
+        write_report(report, os.path.join(base_dir, report_path))
+    summary = runner.profiler.summary_lines()
+    if summary:
+        print("\n" + "\n".join(summary))
+    if args.trace:
+        runner.profiler.save(args.trace)
+        print(f"Trace gravado em {args.trace}.")
+    failed = [name for name, step in report["steps"].items() if step["status"] != "ok"]
+    print(f"\nConcluído em {report['duration']:.1f}s: {len(report['steps']) - len(failed)} passo(s) ok, {len(failed)} com problema.")
+    return 0 if report["ok"] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
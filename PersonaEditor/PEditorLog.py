@@ -0,0 +1,74 @@
+"""Fila de log entre as threads de trabalho e a interface, com cópia em arquivo rotativo.
+
+As threads só colocam mensagens e status na fila; a interface esvazia a fila em lotes
+num timer, sem processEvents por linha. Tudo também vai para o arquivo de log.
+"""
+import logging
+import logging.handlers
+import queue
+from collections import namedtuple
+
+STATUS_OK, STATUS_FAIL, STATUS_CANCELLED = "ok", "falha", "cancelado"
+LOG_FILE_BYTES = 5 << 20
+LOG_FILE_BACKUPS = 3
+
+FileStatus = namedtuple("FileStatus", "file status duration returncode")
+
+
+def file_status(result):
+    """FileStatus de um Result do PEditorBatch."""
+    if result.cancelled:
+        status = STATUS_CANCELLED
+    else:
+        status = STATUS_OK if result.ok else STATUS_FAIL
+    return FileStatus(result.job.file_path, status, result.duration, result.returncode)
+
+
+def file_logger(path, max_bytes=LOG_FILE_BYTES, backups=LOG_FILE_BACKUPS):
+    """Logger que grava em `path`, trocando de arquivo a cada `max_bytes` (path.1, path.2...)."""
+    logger = logging.getLogger(f"PEditorLog:{path}")
+    if not logger.handlers:
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8', delay=True)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger.addHandler(handler); logger.setLevel(logging.INFO); logger.propagate = False
+    return logger
+
+
+class LogQueue:
+    """Mensagens e status por arquivo, aceitos de qualquer thread."""
+
+    def __init__(self, log_file=None):
+        self._messages = queue.SimpleQueue()
+        self._statuses = queue.SimpleQueue()
+        self.logger = None
+        if log_file:
+            try:
+                self.logger = file_logger(log_file)
+            except OSError:
+                self.logger = None
+
+    def log(self, message):
+        self._messages.put(message)
+        if self.logger is not None:
+            self.logger.info(message)
+
+    def report(self, result):
+        """Callback on_result do BatchRunner: log do arquivo + status estruturado."""
+        self.log("\n".join(result.log_lines()))
+        self._statuses.put(file_status(result))
+
+    def drain(self, limit=2000):
+        """Retira até `limit` mensagens e todos os status pendentes: (mensagens, status)."""
+        messages = []
+        while len(messages) < limit:
+            try:
+                messages.append(self._messages.get_nowait())
+            except queue.Empty:
+                break
+        statuses = []
+        while True:
+            try:
+                statuses.append(self._statuses.get_nowait())
+            except queue.Empty:
+                break
+        return messages, statuses
@@ -0,0 +1,248 @@
+"""Leitura nativa das mensagens (MSG1/BMD) dos .BF (FLW0), .PM1 (PMD1) e .BMD.
+
+Gera os mesmos PTPs do `-expptp /sub` e as mesmas linhas do `-exptext /sub` do
+PersonaEditorCMD, sem abrir um processo por arquivo; os arquivos são divididos entre
+vários processos.
+
+Estrutura (little-endian):
+    FLW0/PMD1  cabeçalho 0x20 (u32 nº de seções em 0x10) e tabela de seções de 16 bytes
+               (u32 tipo, u32 tamanho do elemento, u32 quantidade, u32 offset);
+               a mensagem é a seção 3 do BF e a 6 do PM1.
+    MSG1       cabeçalho 0x20 (u32 nº de diálogos em 0x18), diálogos (u32 tipo, u32 offset),
+               tabela de falantes (u32 offset, u32 quantidade); offsets relativos a 0x20.
+    diálogo    char[24] nome; mensagem: u16 nº de páginas, u16 falante (0xFFFF = nenhum);
+               seleção: u16, u16 nº de opções, u32; depois os offsets das strings e
+               u32 tamanho do texto.
+
+Com --out os PTPs vão para a pasta indicada, mantendo as subpastas de cada PASTA dada. Um
+PTP gravado duas vezes na mesma execução (x.BF e x.BMD na mesma pasta, PM1s com o mesmo
+nome de mensagem) é avisado: o último sobrescreve os anteriores, como no PersonaEditorCMD.
+
+Uso: python PEditorMSG.py ptp [--type BF|PM1|BMD ...] [--out PASTA] ARQUIVOS/PASTAS...
+     python PEditorMSG.py tsv --out ARQ [--type BF|PM1|BMD ...] [--rmvspl] ARQUIVOS/PASTAS...
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PEditorBatch import default_workers
+from PEditorFont import load_charmaps
+from PEditorPTP import PTP, PTPMessage, PTPName, PTPString, export_rows
+from PEditorRepack import pm1_message_name
+
+MSG_MAGIC, BF_MAGIC, PM1_MAGIC = b"MSG1", b"FLW0", b"PMD1"
+MESSAGE_SECTION = {BF_MAGIC: 3, PM1_MAGIC: 6}
+MSG_BASE = 0x20
+NO_SPEAKER = 0xFFFF
+EXTENSIONS = (".BF", ".PM1", ".BMD")
+
+_charmap = None  # mapa da fonte antiga de cada processo (modo tsv)
+
+
+def sections(buf):
+    """[(posição na tabela, tipo, tamanho do elemento, quantidade, offset)] de um FLW0/PMD1."""
+    count, = struct.unpack_from('<I', buf, 0x10)
+    return [(0x20 + i * 16,) + struct.unpack_from('<4I', buf, 0x20 + i * 16) for i in range(count)]
+
+
+def _code_length(byte):
+    if byte >= 0xF0:
+        return max(2, 2 + ((byte & 0x0F) - 1) * 2)
+    return 2 if byte >= 0x80 else 1
+
+
+def split_string(raw):
+    """(prefixo, texto, sufixo) de uma página: funções no início; funções, quebras e o 0 final no fim."""
+    tokens = []; i = 0
+    while i < len(raw):
+        length = _code_length(raw[i])
+        tokens.append(raw[i:i + length]); i += length
+    start = 0
+    while start < len(tokens) and tokens[start][0] >= 0xF0:
+        start += 1
+    end = len(tokens)
+    while end > start and (tokens[end - 1][0] >= 0xF0 or tokens[end - 1] in (b"\n", b"\0")):
+        end -= 1
+    return b"".join(tokens[:start]), b"".join(tokens[start:end]), b"".join(tokens[end:])
+
+
+def read_bmd(buf):
+    """PTP (texto novo vazio) de uma mensagem MSG1, igual ao do -expptp."""
+    if bytes(buf[8:12]) != MSG_MAGIC:
+        raise ValueError("Mensagem não é um BMD (assinatura MSG1 ausente).")
+    dialog_count, = struct.unpack_from('<I', buf, 0x18)
+    speakers_offset, speaker_count = struct.unpack_from('<2I', buf, MSG_BASE + dialog_count * 8)
+    ptp = PTP()
+    for i in range(speaker_count):
+        start = MSG_BASE + struct.unpack_from('<I', buf, MSG_BASE + speakers_offset + i * 4)[0]
+        ptp.names.append(PTPName(bytes(buf[start:buf.index(b"\0", start)])))
+    for i in range(dialog_count):
+        kind, offset = struct.unpack_from('<2I', buf, MSG_BASE + i * 8)
+        pos = MSG_BASE + offset
+        name = bytes(buf[pos:pos + 24]).split(b"\0", 1)[0].decode('ascii', 'replace')
+        if kind == 0:
+            count, speaker = struct.unpack_from('<2H', buf, pos + 24); pos += 28
+        else:
+            count, = struct.unpack_from('<H', buf, pos + 26); speaker = NO_SPEAKER; pos += 32
+        pointers = struct.unpack_from(f'<{count}I', buf, pos)
+        text_size, = struct.unpack_from('<I', buf, pos + count * 4)
+        ends = pointers[1:] + (pos + count * 4 + 4 - MSG_BASE + text_size,)
+        strings = [PTPString(*split_string(bytes(buf[MSG_BASE + a:MSG_BASE + b]))) for a, b in zip(pointers, ends)]
+        ptp.messages.append(PTPMessage(kind, name, -1 if speaker == NO_SPEAKER else speaker, strings))
+    return ptp
+
+
+def embedded_messages(path, buf):
+    """[(nome do BMD no -exptext, nome do PTP sem extensão, mensagem)] de um BF, PM1 ou BMD."""
+    magic = bytes(buf[8:12])
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if magic == MSG_MAGIC:
+        return [(os.path.basename(path), stem, buf)]
+    section = MESSAGE_SECTION.get(magic)
+    if section is None:
+        return []
+    table = sections(buf)
+    found = [buf[offset:offset + size * count] for _, kind, size, count, offset in table if kind == section and size * count]
+    if magic == PM1_MAGIC:
+        name = pm1_message_name(buf, table)
+        return [(name, os.path.splitext(name)[0], msg) for msg in found]
+    return [(stem + ".BMD", stem, msg) for msg in found]
+
+
+def _init_worker(charmap):
+    global _charmap
+    _charmap = charmap
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def export_ptp(path, out_dir=None, rmvspl=False):
+    """Grava os PTPs de um arquivo (na pasta dele ou em out_dir); devolve (caminho, PTPs, erro)."""
+    try:
+        written = []
+        for _, ptp_stem, msg in embedded_messages(path, _read(path)):
+            ptp_path = os.path.join(out_dir or os.path.dirname(path), ptp_stem + ".PTP")
+            read_bmd(msg).save(ptp_path)
+            written.append(ptp_path)
+        return path, written, None
+    except (OSError, ValueError, struct.error) as e:
+        return path, [], str(e)
+
+
+def export_tsv(path, out_dir=None, rmvspl=False):
+    """Linhas do -exptext /sub de um arquivo; devolve (caminho, linhas, erro)."""
+    try:
+        rows = []
+        for fn, _, msg in embedded_messages(path, _read(path)):
+            rows.extend(export_rows(read_bmd(msg), fn, _charmap, rmvspl))
+        return path, rows, None
+    except (OSError, ValueError, struct.error) as e:
+        return path, [], str(e)
+
+
+def find_sources(paths, extensions=EXTENSIONS):
+    """(arquivo, subpasta relativa à PASTA dada) dos arquivos com uma das `extensions`, em ordem.
+
+    Pastas são expandidas recursivamente; arquivos passados diretamente entram sem filtro.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for filename in sorted(files):
+                    if filename.upper().endswith(extensions):
+                        yield os.path.join(root, filename), os.path.relpath(root, path)
+        else:
+            yield path, os.curdir
+
+
+def run(paths, worker, workers=None, charmap=None, out_dir=None, rmvspl=False):
+    """Aplica worker (export_ptp/export_tsv) em paralelo; resultados na ordem de `paths`.
+
+    `out_dir` é uma pasta para todos ou uma lista com a pasta de cada arquivo.
+    """
+    out_dirs = out_dir if isinstance(out_dir, list) else [out_dir] * len(paths)
+    workers = max(1, min(workers or default_workers(), len(paths)))
+    if workers == 1:
+        _init_worker(charmap)
+        return [worker(path, directory, rmvspl) for path, directory in zip(paths, out_dirs)]
+    chunk = max(1, len(paths) // (workers * 8))
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(charmap,)) as pool:
+        return list(pool.map(worker, paths, out_dirs, [rmvspl] * len(paths), chunksize=chunk))
+
+
+def collisions(results):
+    """[(arquivo, aviso)] dos PTPs gravados por mais de um arquivo na mesma execução."""
+    seen = {}; found = []
+    for path, written, _ in results:
+        for ptp_path in written:
+            key = os.path.normcase(os.path.abspath(ptp_path))
+            if key in seen:
+                found.append((path, f"{ptp_path} também foi gravado por {seen[key]} (sobrescrito)"))
+            else:
+                seen[key] = path
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta as mensagens de BF/PM1/BMD para PTP ou TSV sem o PersonaEditorCMD.exe.")
+    parser.add_argument("--exe-dir", default=os.path.dirname(os.path.abspath(__file__)),
+                        help="Pasta com PersonaEditor.xml e font/ (padrão: pasta deste script)")
+    parser.add_argument("--workers", type=int, default=None, help="Processos simultâneos (padrão: nº de CPUs)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ptp = commands.add_parser("ptp", help="Equivale a -expptp /sub")
+    ptp.add_argument("--out", help="Pasta dos PTPs, com as mesmas subpastas (padrão: a pasta de cada arquivo)")
+    tsv = commands.add_parser("tsv", help="Equivale a -exptext /sub, juntando tudo num TSV no formato da pasta Text")
+    tsv.add_argument("--out", required=True, help="Arquivo TSV de saída")
+    tsv.add_argument("--rmvspl", action="store_true", help='Substitui "\\n" por espaço')
+    for sub_parser in (ptp, tsv):
+        sub_parser.add_argument("--type", action="append", type=str.upper, choices=[e[1:] for e in EXTENSIONS],
+                                help="Só arquivos deste tipo nas pastas; pode repetir (padrão: todos)")
+        sub_parser.add_argument("paths", nargs="+")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    extensions = tuple("." + kind for kind in args.type) if args.type else EXTENSIONS
+    sources = list(find_sources(args.paths, extensions))
+    paths = [path for path, _ in sources]
+    if not paths:
+        print(f"Nenhum arquivo {'/'.join(extensions)} encontrado.")
+        return 1
+    collided = []
+    if args.command == "ptp":
+        out_dirs = None
+        if args.out:
+            out_dirs = [os.path.normpath(os.path.join(args.out, relative)) for _, relative in sources]
+            for directory in set(out_dirs):
+                os.makedirs(directory, exist_ok=True)
+        results = run(paths, export_ptp, args.workers, out_dir=out_dirs)
+        collided = collisions(results)
+        done = len({os.path.normcase(os.path.abspath(p)) for _, items, _ in results for p in items})
+        summary = f"{done} PTP(s) gravado(s)"
+    else:
+        old_charmap, _ = load_charmaps(args.exe_dir)
+        results = run(paths, export_tsv, args.workers, old_charmap, rmvspl=args.rmvspl)
+        tmp_path = args.out + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            for _, rows, _ in results:
+                f.writelines(rows)
+        os.replace(tmp_path, args.out)
+        done = sum(len(rows) for _, rows, _ in results)
+        summary = f"{done} linha(s) gravada(s) em {args.out}"
+    for path, message in collided:
+        print(f"AVISO: {path}: {message}")
+    failed = [(path, error) for path, _, error in results if error]
+    for path, error in failed:
+        print(f"ERRO: {path}: {error}")
+    print(f"{len(paths)} arquivo(s) lido(s), {summary}, {len(failed)} erro(s) em {time.perf_counter() - start:.1f}s.")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,313 @@
+"""Leitura e escrita nativa de arquivos PTP (PTP0), sem chamar o PersonaEditorCMD.exe.
+
+Estrutura (little-endian, campos alinhados em 4 bytes, cada string em 16):
+    cabeçalho  "PTP0", u32 0x20, u32 nº de MSG, u32 offset dos nomes, u32 nº de nomes
+    MSG        u32 tipo, char[24] nome, u16 nº de strings, i16 índice do nome (-1 = sem nome)
+    string     prefixo (bytes), texto antigo (bytes do jogo), sufixo (bytes), texto novo (UTF-8)
+    nome       nome antigo (bytes do jogo), nome novo (UTF-8)
+Cada campo variável é um u32 com o tamanho seguido dos dados.
+
+Também implementa o -exptext/-imptext sobre PTPs (`export_text`, `import_text`) e as
+versões em lote (`bulk_export_text`, `bulk_import_text`).
+
+Uso: python PEditorPTP.py exptext [--rmvspl] [--out ARQ] PTPs/PASTAS...
+     python PEditorPTP.py imptext TSV [--map PADRÃO] PTPs/PASTAS...
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+
+from PEditorFont import load_charmaps
+
+MAGIC = b"PTP0"
+HEADER_SIZE = 0x20
+MSG_HEADER = struct.Struct('<I24sHh')
+EMPTY_NAME = "<EMPTY>"
+SELECT_NAME = "<SELECT>"
+MSG_DIALOG, MSG_SELECTION = 0, 1
+
+
+def _align(value, alignment):
+    return (value + alignment - 1) // alignment * alignment
+
+
+class PTPString:
+    __slots__ = ("prefix", "old", "suffix", "new")
+
+    def __init__(self, prefix=b"", old=b"", suffix=b"", new=""):
+        self.prefix = prefix
+        self.old = old
+        self.suffix = suffix
+        self.new = new
+
+
+class PTPMessage:
+    __slots__ = ("type", "name", "name_index", "strings")
+
+    def __init__(self, type=0, name="", name_index=-1, strings=None):
+        self.type = type
+        self.name = name
+        self.name_index = name_index
+        self.strings = strings if strings is not None else []
+
+
+class PTPName:
+    __slots__ = ("old", "new")
+
+    def __init__(self, old=b"", new=""):
+        self.old = old
+        self.new = new
+
+
+class PTP:
+    def __init__(self, messages=None, names=None):
+        self.messages = messages if messages is not None else []
+        self.names = names if names is not None else []
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Lê um PTP a partir de bytes, bytearray, mmap ou memoryview."""
+        view = memoryview(data)
+        if bytes(view[:4]) != MAGIC:
+            raise ValueError("Arquivo não é um PTP (assinatura PTP0 ausente).")
+        header_size, msg_count, names_offset, name_count = struct.unpack_from('<4I', view, 4)
+
+        def read_field(pos):
+            size, = struct.unpack_from('<I', view, pos)
+            return bytes(view[pos + 4:pos + 4 + size]), _align(pos + 4 + size, 4)
+
+        ptp = cls()
+        pos = header_size
+        for _ in range(msg_count):
+            msg_type, raw_name, string_count, name_index = MSG_HEADER.unpack_from(view, pos)
+            msg = PTPMessage(msg_type, raw_name.split(b'\0', 1)[0].decode('ascii', 'replace'), name_index)
+            pos += MSG_HEADER.size
+            for _ in range(string_count):
+                prefix, pos = read_field(pos)
+                old, pos = read_field(pos)
+                suffix, pos = read_field(pos)
+                new, pos = read_field(pos)
+                msg.strings.append(PTPString(prefix, old, suffix, new.decode('utf-8', 'replace')))
+                pos = _align(pos, 16)
+            ptp.messages.append(msg)
+        pos = names_offset
+        for _ in range(name_count):
+            old, pos = read_field(pos)
+            new, pos = read_field(pos)
+            ptp.names.append(PTPName(old, new.decode('utf-8', 'replace')))
+        return ptp
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError("Arquivo PTP vazio.")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return cls.from_bytes(mm)
+
+    def to_bytes(self):
+        out = bytearray(HEADER_SIZE)
+
+        def write_field(data):
+            out.extend(struct.pack('<I', len(data))); out.extend(data)
+            out.extend(bytes(_align(len(out), 4) - len(out)))
+
+        for msg in self.messages:
+            out.extend(MSG_HEADER.pack(msg.type, msg.name.encode('ascii', 'replace'), len(msg.strings), msg.name_index))
+            for string in msg.strings:
+                write_field(string.prefix); write_field(string.old)
+                write_field(string.suffix); write_field(string.new.encode('utf-8'))
+                out.extend(bytes(_align(len(out), 16) - len(out)))
+        names_offset = len(out)
+        for name in self.names:
+            write_field(name.old); write_field(name.new.encode('utf-8'))
+        struct.pack_into('<4s4I', out, 0, MAGIC, HEADER_SIZE, len(self.messages), names_offset, len(self.names))
+        return bytes(out)
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.to_bytes())
+        os.replace(tmp_path, path)
+
+
+def decode_game_text(data, charmap, newline="{0A}"):
+    """Converte bytes do jogo em texto, como o PersonaEditor exporta (%OLDSTR/%OLDNM).
+
+    Funções (0xF0-0xFF) viram {F5 61 ...}; glifos de dois bytes são traduzidos pelo
+    .FNTMAP da fonte antiga; bytes sem caractere viram {XX}.
+    """
+    out = []; i = 0; n = len(data); map_size = len(charmap)
+    while i < n:
+        b = data[i]
+        if b >= 0xF0:
+            length = max(2, 2 + ((b & 0x0F) - 1) * 2)
+            out.append("{" + " ".join(f"{x:02X}" for x in data[i:i + length]) + "}"); i += length
+        elif b >= 0x80:
+            if i + 1 >= n:
+                out.append(f"{{{b:02X}}}"); i += 1; continue
+            index = (b - 0x81) * 0x80 + data[i + 1] + 0x20
+            ch = charmap[index] if 0 <= index < map_size else 0
+            out.append(chr(ch) if ch else f"{{{b:02X} {data[i + 1]:02X}}}"); i += 2
+        elif b == 0x0A:
+            out.append(newline); i += 1
+        elif b < 0x20:
+            out.append(f"{{{b:02X}}}"); i += 1
+        else:
+            ch = charmap[b] if b < map_size and charmap[b] else b
+            out.append(chr(ch)); i += 1
+    return "".join(out)
+
+
+def export_rows(ptp, file_name, charmap, rmvspl=False):
+    """Linhas do -exptext: %FN %MSGIND %STRIND %OLDNM %OLDSTR e a coluna nova vazia."""
+    newline = " " if rmvspl else "{0A}"
+    names = [decode_game_text(name.old, charmap) for name in ptp.names]
+    for msg_index, msg in enumerate(ptp.messages):
+        if msg.type == MSG_SELECTION:
+            old_name = SELECT_NAME
+        else:
+            old_name = names[msg.name_index] if 0 <= msg.name_index < len(names) else EMPTY_NAME
+        for str_index, string in enumerate(msg.strings):
+            yield f"{file_name}\t{msg_index}\t{str_index}\t{old_name}\t{decode_game_text(string.old, charmap, newline)}\t\n"
+
+
+def export_text(ptp_path, charmap, out_path=None, rmvspl=False, append=False):
+    """Equivalente a `PTP -exptext [/rmvspl]`: grava as linhas em <nome>.TXT (ou acrescenta, com `append`)."""
+    if out_path is None:
+        out_path = os.path.splitext(ptp_path)[0] + ".TXT"
+    ptp = PTP.load(ptp_path)
+    with open(out_path, 'a' if append else 'w', encoding='utf-8', newline='') as f:
+        f.writelines(export_rows(ptp, os.path.basename(ptp_path), charmap, rmvspl))
+    return out_path
+
+
+def bulk_export_text(ptp_paths, charmap, out_path=None, rmvspl=False):
+    """Exporta vários PTPs num único processo; com `out_path` junta tudo num arquivo só (recriado a cada execução)."""
+    written = []
+    for i, path in enumerate(ptp_paths):
+        written.append(export_text(path, charmap, out_path, rmvspl, append=out_path is not None and i > 0))
+    return written
+
+
+class TextMap:
+    """Linhas de um TSV de tradução interpretadas segundo o padrão do /map."""
+
+    def __init__(self, pattern="%FN %MSGIND %STRIND %I %I %NEWSTR"):
+        self.fields = pattern.split()
+
+    def parse(self, path, encoding="utf-8"):
+        """Lê o TSV. Células vazias são ignoradas, como no PersonaEditorCMD (com ou sem /skipempty)."""
+        strings = {}; names = {}
+        fields = self.fields
+        with open(path, 'r', encoding=encoding, errors='replace', newline='') as f:
+            for line in f:
+                cols = line.rstrip('\r\n').split('\t')
+                row = {field: cols[i] for i, field in enumerate(fields) if i < len(cols) and field != "%I"}
+                new_str = row.get("%NEWSTR")
+                if "%FN" in row and "%STRIND" in row and new_str is not None and ("%MSGIND" in row or "%MSGNM" in row):
+                    if new_str == "": continue
+                    msg_key = int(row["%MSGIND"]) if "%MSGIND" in row and row["%MSGIND"].isdigit() else row.get("%MSGNM")
+                    if not row["%STRIND"].isdigit(): continue
+                    strings.setdefault(row["%FN"].lower(), {})[(msg_key, int(row["%STRIND"]))] = new_str
+                elif "%OLDNM" in row and "%NEWNM" in row:
+                    if row["%NEWNM"] == "": continue
+                    names[row["%OLDNM"]] = row["%NEWNM"]
+        return strings, names
+
+
+def text_targets(ptp, file_name, strings):
+    """(nº da MSG, nº da string, PTPString, texto novo) das linhas do TextMap que existem no PTP."""
+    for (msg_key, str_index), new_str in strings.get(file_name.lower(), {}).items():
+        if isinstance(msg_key, int):
+            msg_index = msg_key if 0 <= msg_key < len(ptp.messages) else None
+        else:
+            msg_index = next((i for i, m in enumerate(ptp.messages) if m.name == msg_key), None)
+        if msg_index is None or not 0 <= str_index < len(ptp.messages[msg_index].strings):
+            continue
+        yield msg_index, str_index, ptp.messages[msg_index].strings[str_index], new_str
+
+
+def name_targets(ptp, names, charmap):
+    """(índice, PTPName, nome novo) dos nomes do PTP que aparecem no TextMap."""
+    for index, name in enumerate(ptp.names):
+        new_name = names.get(decode_game_text(name.old, charmap))
+        if new_name is not None:
+            yield index, name, new_name
+
+
+def apply_text(ptp, file_name, strings, names, charmap):
+    """Aplica as traduções de um TextMap já lido a um PTP. Devolve quantas strings mudaram."""
+    changed = 0
+    for _, _, string, new_str in text_targets(ptp, file_name, strings):
+        if string.new != new_str:
+            string.new = new_str; changed += 1
+    if names:
+        for _, name, new_name in name_targets(ptp, names, charmap):
+            if name.new != new_name:
+                name.new = new_name; changed += 1
+    return changed
+
+
+def import_text(ptp_path, tsv_path, charmap, pattern="%FN %MSGIND %STRIND %I %I %NEWSTR", encoding="utf-8"):
+    """Equivalente a `PTP -imptext TSV /map ... -save /ovrw` (sem /auto e /lbl)."""
+    return bulk_import_text([ptp_path], tsv_path, charmap, pattern, encoding)[ptp_path]
+
+
+def bulk_import_text(ptp_paths, tsv_path, charmap, pattern="%FN %MSGIND %STRIND %I %I %NEWSTR", encoding="utf-8"):
+    """Lê o TSV uma única vez e importa em todos os PTPs; só regrava os que mudaram."""
+    strings, names = TextMap(pattern).parse(tsv_path, encoding)
+    changes = {}
+    for path in ptp_paths:
+        ptp = PTP.load(path)
+        changes[path] = apply_text(ptp, os.path.basename(path), strings, names, charmap)
+        if changes[path]:
+            ptp.save(path)
+    return changes
+
+
+def find_ptps(paths):
+    """Expande pastas (recursivamente) em arquivos .PTP."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for filename in sorted(files):
+                    if filename.upper().endswith(".PTP"):
+                        yield os.path.join(root, filename)
+        else:
+            yield path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta/importa texto de PTPs sem abrir o PersonaEditorCMD.exe.")
+    parser.add_argument("--exe-dir", default=os.path.dirname(os.path.abspath(__file__)),
+                        help="Pasta com PersonaEditor.xml e font/ (padrão: pasta deste script)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    exp = commands.add_parser("exptext", help="Equivale a -exptext")
+    exp.add_argument("--rmvspl", action="store_true", help='Substitui "\\n" por espaço')
+    exp.add_argument("--out", help="Junta tudo neste arquivo em vez de <nome>.TXT")
+    exp.add_argument("paths", nargs="+")
+    imp = commands.add_parser("imptext", help="Equivale a -imptext TSV -save /ovrw")
+    imp.add_argument("tsv")
+    imp.add_argument("--map", default="%FN %MSGIND %STRIND %I %I %NEWSTR")
+    imp.add_argument("--enc", default="utf-8")
+    imp.add_argument("paths", nargs="+")
+    args = parser.parse_args(argv)
+
+    old_charmap, _ = load_charmaps(args.exe_dir)
+    ptp_paths = list(find_ptps(args.paths))
+    if args.command == "exptext":
+        bulk_export_text(ptp_paths, old_charmap, args.out, args.rmvspl)
+        print(f"{len(ptp_paths)} PTP(s) exportado(s).")
+    else:
+        changes = bulk_import_text(ptp_paths, args.tsv, old_charmap, args.map, args.enc)
+        for path, count in changes.items():
+            if count: print(f"  {os.path.basename(path)}: {count} string(s) alterada(s)")
+        print(f"{sum(1 for c in changes.values() if c)} de {len(changes)} PTP(s) alterado(s).")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
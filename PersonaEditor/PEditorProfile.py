@@ -0,0 +1,249 @@
+"""Medição de cada execução do PersonaEditorCMD e das etapas em Python de um lote.
+
+Para cada processo: tempo até o processo existir (spawn), tempo total, CPU de usuário e
+de sistema (somando os filhos, como os do Wine/.NET), bytes lidos e gravados e o código
+de saída. O Profiler junta tudo por comando e por tipo de arquivo, monta a tabela do fim
+do lote e exporta um trace JSON que abre no chrome://tracing ou no Perfetto.
+
+As etapas em Python entram no mesmo trace com `profiler.span(nome)`. Com `cprofile_dir`,
+cada span também grava um <nome>.prof do cProfile, que o pstats ou o snakeviz leem. O
+py-spy não precisa de nada daqui: basta `py-spy record --pid <pid>`.
+
+Uso: python PEditorProfile.py TRACE.json                    (tabela de um trace salvo)
+     python PEditorProfile.py --startup "CMD" [-n 5]         (custo de abrir o executável sem trabalho)
+"""
+import argparse
+import cProfile
+import json
+import os
+import re
+import shlex
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+# start = perf_counter do início; as outras medidas em segundos ou bytes (None se o sistema não informa).
+Timing = namedtuple("Timing", "start spawn wall user system read_bytes write_bytes")
+NO_USAGE = (None, None, None, None)
+GROUPS = (("command", "Comando"), ("ext", "Tipo"))
+
+
+def _proc_io(pid):
+    """(rchar, wchar) de /proc/<pid>/io (Linux), ou (None, None)."""
+    try:
+        with open(f"/proc/{pid}/io", 'r') as f:
+            fields = dict(line.split(": ", 1) for line in f.read().splitlines() if ": " in line)
+        return int(fields["rchar"]), int(fields["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def _windows_usage(proc):
+    import ctypes
+    from ctypes import wintypes
+    kernel32 = ctypes.windll.kernel32
+    handle = wintypes.HANDLE(int(proc._handle))
+    times = [wintypes.FILETIME() for _ in range(4)]  # criação, saída, sistema, usuário
+    if not kernel32.GetProcessTimes(handle, *(ctypes.byref(t) for t in times)):
+        return NO_USAGE
+    seconds = lambda t: ((t.dwHighDateTime << 32) | t.dwLowDateTime) / 1e7
+    counters = (ctypes.c_ulonglong * 6)()  # IO_COUNTERS
+    if kernel32.GetProcessIoCounters(handle, ctypes.byref(counters)):
+        return seconds(times[3]), seconds(times[2]), counters[3], counters[4]
+    return seconds(times[3]), seconds(times[2]), None, None
+
+
+def communicate(proc):
+    """proc.communicate() que também devolve o uso do processo: (stdout, stderr, (usuário, sistema, lidos, gravados))."""
+    if os.name == 'nt':
+        stdout, stderr = proc.communicate()
+        try:
+            return stdout, stderr, _windows_usage(proc)
+        except (OSError, AttributeError, ValueError):
+            return stdout, stderr, NO_USAGE
+    if not hasattr(os, "wait4"):
+        stdout, stderr = proc.communicate()
+        return stdout, stderr, NO_USAGE
+    errors = []
+    reader = threading.Thread(target=lambda: errors.append(proc.stderr.read()), daemon=True)
+    reader.start()
+    stdout = proc.stdout.read(); reader.join()
+    proc.stdout.close(); proc.stderr.close()
+    read_bytes = write_bytes = None
+    if hasattr(os, "waitid"):
+        # Espera sem recolher: o zumbi ainda tem /proc/<pid>/io com o total do processo.
+        os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+        read_bytes, write_bytes = _proc_io(proc.pid)
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if read_bytes is None:
+        read_bytes, write_bytes = usage.ru_inblock * 512, usage.ru_oublock * 512
+    return stdout, errors[0], (usage.ru_utime, usage.ru_stime, read_bytes, write_bytes)
+
+
+def _extension(path):
+    return os.path.splitext(path)[1][1:].upper() or "(sem)"
+
+
+def _sum(values):
+    values = [v for v in values if v is not None]
+    return sum(values) if values else None
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+class Profiler:
+    """Junta as medições de um lote (de qualquer thread) e gera a tabela e o trace."""
+
+    def __init__(self, cprofile_dir=None):
+        self.origin = time.perf_counter()
+        self.cprofile_dir = cprofile_dir
+        self.invocations = []
+        self._lock = threading.Lock()
+        self._threads = {}
+
+    def _add(self, entry):
+        with self._lock:
+            entry["tid"] = self._threads.setdefault(threading.get_ident(), len(self._threads) + 1)
+            self.invocations.append(entry)
+
+    def record(self, result):
+        """Registra um Result do PEditorBatch (os cancelados antes de abrir o processo não têm Timing)."""
+        timing = result.timing
+        if timing is None:
+            return
+        job = result.job
+        self._add({"name": os.path.basename(job.file_path), "kind": "process",
+                   "command": job.args[1] if len(job.args) > 1 else "", "ext": _extension(job.file_path),
+                   "start": timing.start - self.origin, "spawn": timing.spawn, "wall": timing.wall,
+                   "user": timing.user, "system": timing.system,
+                   "read_bytes": timing.read_bytes, "write_bytes": timing.write_bytes,
+                   "returncode": result.returncode, "ok": result.ok})
+
+    @contextmanager
+    def span(self, name, category="python"):
+        """with profiler.span("bf-ptp"): ... — etapa em Python no trace (e no cProfile, se ligado)."""
+        profile = cProfile.Profile() if self.cprofile_dir else None
+        start = time.perf_counter(); cpu = time.thread_time(); ok = False
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+            ok = True
+        finally:
+            if profile is not None:
+                profile.disable()
+                os.makedirs(self.cprofile_dir, exist_ok=True)
+                profile.dump_stats(os.path.join(self.cprofile_dir, re.sub(r'[^\w.-]', '_', name) + ".prof"))
+            self._add({"name": name, "kind": "python", "command": category, "ext": "(python)",
+                       "start": start - self.origin, "spawn": 0.0, "wall": time.perf_counter() - start,
+                       "user": time.thread_time() - cpu, "system": None, "read_bytes": None, "write_bytes": None,
+                       "returncode": 0 if ok else None, "ok": ok})
+
+    def summary(self, key):
+        """{valor de `key` ("command" ou "ext"): totais} das execuções."""
+        groups = {}
+        for entry in self.invocations:
+            groups.setdefault(entry[key], []).append(entry)
+        rows = {}
+        for name, entries in sorted(groups.items()):
+            walls = [e["wall"] for e in entries]
+            cpu = _sum([_sum([e["user"], e["system"]]) for e in entries])
+            rows[name] = {"count": len(entries), "failed": sum(1 for e in entries if not e["ok"]),
+                          "wall": sum(walls), "p50": statistics.median(walls), "p95": _percentile(walls, 0.95),
+                          "spawn": _sum([e["spawn"] for e in entries]), "cpu": cpu,
+                          "read_bytes": _sum([e["read_bytes"] for e in entries]),
+                          "write_bytes": _sum([e["write_bytes"] for e in entries])}
+        return rows
+
+    def summary_lines(self):
+        """Tabela do fim do lote, agrupada por comando e por tipo de arquivo."""
+        if not self.invocations:
+            return []
+        mb = lambda value: "-" if value is None else f"{value / (1 << 20):.1f}"
+        lines = []
+        for key, title in GROUPS:
+            lines.append(f"{title:<12} {'qtd':>5} {'falhas':>6} {'total s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+                         f"{'spawn ms':>9} {'CPU s':>8} {'CPU %':>6} {'lido MB':>8} {'gravado MB':>10}")
+            for name, row in self.summary(key).items():
+                cpu_share = "-" if row["cpu"] is None or not row["wall"] else f"{100 * row['cpu'] / row['wall']:.0f}"
+                cpu = "-" if row["cpu"] is None else f"{row['cpu']:.2f}"
+                lines.append(f"{name[:12]:<12} {row['count']:>5} {row['failed']:>6} {row['wall']:>9.2f} "
+                             f"{row['p50'] * 1000:>8.1f} {row['p95'] * 1000:>8.1f} {row['spawn'] * 1000 / row['count']:>9.1f} "
+                             f"{cpu:>8} {cpu_share:>6} {mb(row['read_bytes']):>8} {mb(row['write_bytes']):>10}")
+            lines.append("")
+        lines.append("CPU % baixo com tempo total alto = espera (disco ou inicialização do Wine/.NET), não trabalho da ferramenta.")
+        return lines
+
+    def trace(self):
+        """Trace no formato do Chrome (traceEvents), com os dados brutos e os totais junto."""
+        events = []
+        for entry in self.invocations:
+            ts = entry["start"] * 1e6
+            args = {k: entry[k] for k in ("command", "returncode", "user", "system", "read_bytes", "write_bytes")}
+            events.append({"name": entry["name"], "cat": entry["command"], "ph": "X", "ts": ts, "dur": entry["wall"] * 1e6,
+                           "pid": 1, "tid": entry["tid"], "args": args})
+            if entry["spawn"]:
+                events.append({"name": "spawn", "cat": "spawn", "ph": "X", "ts": ts, "dur": entry["spawn"] * 1e6,
+                               "pid": 1, "tid": entry["tid"]})
+        return {"traceEvents": events, "displayTimeUnit": "ms", "invocations": self.invocations,
+                "summary": {key: self.summary(key) for key, _ in GROUPS}}
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.trace(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        profiler = cls()
+        profiler.invocations = data.get("invocations", [])
+        return profiler
+
+
+def startup_cost(command, runs=5):
+    """Mediana do tempo de abrir `command` sem arquivo (só inicialização do executável)."""
+    walls = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        communicate(proc)
+        walls.append(time.perf_counter() - start)
+    return statistics.median(walls)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mostra a tabela de um trace salvo ou mede a inicialização do executável.")
+    parser.add_argument("trace", nargs="?", help="Trace JSON gravado por --trace (PEditorJobs) ou pela interface")
+    parser.add_argument("--startup", default=None, help='Comando do executável (ex.: "wine PersonaEditorCMD.exe")')
+    parser.add_argument("-n", type=int, default=5, help="Execuções para a mediana do --startup (padrão: %(default)s)")
+    args = parser.parse_args(argv)
+    if not args.trace and not args.startup:
+        parser.error("informe um trace ou --startup")
+    if args.startup:
+        try:
+            cost = startup_cost(shlex.split(args.startup, posix=os.name != 'nt'), args.n)
+        except OSError as e:
+            print(f"ERRO: {e}"); return 1
+        print(f"Inicialização: {cost * 1000:.0f} ms por execução (mediana de {args.n}).")
+    if args.trace:
+        try:
+            profiler = Profiler.load(args.trace)
+        except (OSError, ValueError) as e:
+            print(f"ERRO: {e}"); return 1
+        print("\n".join(profiler.summary_lines()) or "Trace sem execuções.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
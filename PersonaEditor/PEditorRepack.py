@@ -0,0 +1,341 @@
+"""Troca subarquivos dentro dos contêineres BIN/ARC/PAC e dos PM1 sem regravar o arquivo inteiro.
+
+Para cada subarquivo alterado:
+  - se o novo conteúdo cabe no espaço original (tamanho + preenchimento), ele é gravado
+    no lugar e o resto do espaço é zerado;
+  - se não cabe, só o que vem depois dele é regravado (o começo do arquivo é copiado
+    como está); num PM1 os blocos seguintes são deslocados e os offsets absolutos dos
+    blocos 3 e 7 corrigidos, como o PersonaEditor faz.
+Subarquivos iguais aos atuais são ignorados. O contêiner é lido por mmap: só a tabela de
+entradas e os trechos comparados ou deslocados saem do disco.
+
+A gravação é atômica: as alterações vão para uma cópia (ARQUIVO.tmp, copiada pelo sistema)
+que depois substitui o original com os.replace, então quem ler o arquivo (o
+PersonaEditorCMD, o build, o git) vê a versão antiga ou a nova, nunca uma pela metade.
+Com --in-place o arquivo é alterado no lugar e a gravação fica proporcional ao que
+mudou; antes, os trechos que serão sobrescritos (e o tamanho original) vão para
+ARQUIVO.undo, e uma gravação interrompida só é desfeita na próxima execução deste script.
+
+Uso:
+  python PEditorRepack.py ARQUIVO... [--dir PASTA] [--put CAMINHO=ARQ ...] [--in-place]
+Sem --put, usa os arquivos de PASTA (padrão: a pasta do contêiner) com o mesmo nome das
+entradas, como os que o -expall /sub grava.
+"""
+import argparse
+import mmap
+import os
+import shutil
+import struct
+import sys
+from collections import namedtuple
+from contextlib import contextmanager
+
+from PEditorArchive import detect_container
+
+PM1_MAGIC = b"PMD1"
+PM1_NAMES, PM1_MESSAGE = 1, 6  # tipos de bloco da tabela do PM1
+PM1_ALIGN = 16
+# Blocos com offsets absolutos para os dados: tipo -> (tamanho do elemento, posição do offset).
+PM1_POINTERS = {3: (32, 16), 7: (16, 4)}
+UNDO_MAGIC = b"PEUNDO1\0"
+
+Plan = namedtuple("Plan", "patches tail_start tail")  # patches = [(offset, bytes)]
+
+
+def _align(value, alignment):
+    return (value + alignment - 1) & -alignment
+
+
+def _is_zero(buf, start, end):
+    return start >= end or not bytes(buf[start:end]).strip(b'\0')
+
+
+def _same(buf, offset, length, data):
+    """O conteúdo atual (sem os zeros do fim) é igual a `data`?"""
+    return len(data) <= length and buf[offset:offset + len(data)] == data and _is_zero(buf, offset + len(data), offset + length)
+
+
+def _header_size(kind):
+    return 36 if kind == "CNT32" else 256
+
+
+def _capacity(kind, size):
+    return size if kind == "CNT32" else _align(256 + size, 64) - 256
+
+
+def _pack_entry(kind, name, data):
+    raw = name.encode('ascii')
+    if kind == "CNT32":
+        return raw.ljust(32, b'\0') + struct.pack('<I', len(data)) + bytes(data)
+    entry = raw.ljust(252, b'\0') + struct.pack('<I', len(data)) + bytes(data)
+    return entry.ljust(_align(len(entry), 64), b'\0')
+
+
+def _match(entries, replacements, label):
+    """{índice da entrada: {resto do caminho: dados}}; os nomes podem conter '/'."""
+    by_entry = {}
+    for key, data in replacements.items():
+        lowered = key.replace('\\', '/').lower()
+        for i, (name, _, _) in enumerate(entries):
+            name = name.lower()
+            if lowered == name or lowered.startswith(name + '/'):
+                by_entry.setdefault(i, {})[key[len(name) + 1:]] = data
+                break
+        else:
+            raise ValueError(f"{key} não existe em {label}")
+    return by_entry
+
+
+def _plan_container(buf, kind, entries, replacements, label):
+    changed = {}
+    for i, subs in _match(entries, replacements, label).items():
+        name, offset, size = entries[i]
+        if "" in subs:
+            data = subs[""]
+        else:
+            data = repack_bytes(buf[offset:offset + size], subs, name)
+        if not _same(buf, offset, size, data):
+            changed[i] = data
+    patches = []
+    for i in sorted(changed):
+        name, offset, size = entries[i]
+        data = changed[i]; capacity = _capacity(kind, size)
+        # O PAK252 acha a entrada seguinte pelo tamanho: o espaço alinhado tem de continuar o mesmo.
+        if len(data) > capacity or (kind == "PAK252" and _capacity(kind, len(data)) != capacity):
+            break
+        if kind == "PAK252":
+            patches.append((offset - 4, struct.pack('<I', len(data))))
+        patches.append((offset, bytes(data) + bytes(capacity - len(data))))
+    else:
+        return Plan(patches, None, b"")
+    # Não coube (ou mudou de espaço): remonta a partir desta entrada, mantendo o que vem depois da última.
+    _, last_offset, last_size = entries[-1]
+    entries_end = last_offset + _capacity(kind, last_size)
+    tail = [_pack_entry(kind, name, changed[j] if j in changed else buf[offset:offset + size])
+            for j, (name, offset, size) in enumerate(entries) if j >= i]
+    tail.append(bytes(buf[entries_end:]))
+    return Plan(patches, entries[i][1] - _header_size(kind), b"".join(tail))
+
+
+def pm1_blocks(buf):
+    """[(posição na tabela, tipo, tamanho do elemento, quantidade, offset)] de um PM1, ou None."""
+    if len(buf) < 0x20 or bytes(buf[8:12]) != PM1_MAGIC:
+        return None
+    count, = struct.unpack_from('<I', buf, 0x10)
+    return [(0x20 + i * 16,) + struct.unpack_from('<IIII', buf, 0x20 + i * 16) for i in range(count)]
+
+
+def pm1_message_name(buf, blocks):
+    """Nome do bloco de mensagens (o .msg/.bmd da tabela de nomes), como o -expall grava."""
+    for _, kind, size, count, offset in blocks:
+        if kind == PM1_NAMES and size == 32:
+            for i in range(count):
+                name = bytes(buf[offset + i * 32:offset + i * 32 + 32]).split(b'\0', 1)[0].decode('ascii', 'replace')
+                if name.lower().endswith((".msg", ".bmd")):
+                    return name
+    return "message.msg"
+
+
+def _plan_pm1(buf, blocks, replacements, label):
+    message = [b for b in blocks if b[1] == PM1_MESSAGE and b[2] * b[3]]
+    if len(message) != 1:
+        raise ValueError(f"{label}: PM1 sem um bloco de mensagens único")
+    table_pos, _, size, _, offset = message[0]
+    name = pm1_message_name(buf, blocks)
+    data = None
+    for key, value in replacements.items():
+        if key.replace('\\', '/').lower() != name.lower():
+            raise ValueError(f"{key} não existe em {label} (só o bloco {name} pode ser trocado)")
+        data = value
+    if data is None or _same(buf, offset, size, data):
+        return Plan([], None, b"")
+    if len(data) <= size:
+        # Os blocos precisam ficar contíguos: o tamanho do bloco fica, o resto é zerado.
+        return Plan([(offset, bytes(data) + bytes(size - len(data)))], None, b"")
+    padded = bytes(data).ljust(_align(len(data), PM1_ALIGN), b'\0')
+    end = offset + size; delta = len(padded) - size
+    tail = bytearray(buf[end:])
+    patches = [(4, struct.pack('<I', len(buf) + delta)), (table_pos + 4, struct.pack('<I', len(padded)))]
+    for pos, kind, elem_size, count, block_offset in blocks:
+        if block_offset >= end:
+            patches.append((pos + 12, struct.pack('<I', block_offset + delta)))
+        field = PM1_POINTERS.get(kind)
+        if field is None or elem_size != field[0]:
+            continue
+        for i in range(count):
+            at = block_offset + i * elem_size + field[1]
+            pointer, = struct.unpack_from('<I', buf, at)
+            if pointer < end:
+                continue
+            if at >= end:
+                struct.pack_into('<I', tail, at - end, pointer + delta)
+            else:
+                patches.append((at, struct.pack('<I', pointer + delta)))
+    return Plan(patches, offset, padded + bytes(tail))
+
+
+def plan(buf, replacements, label=""):
+    """Plan com as alterações para trocar `replacements` ({caminho interno: dados}) em buf."""
+    blocks = pm1_blocks(buf)
+    if blocks is not None:
+        return _plan_pm1(buf, blocks, replacements, label)
+    kind, entries = detect_container(buf)
+    if kind is None:
+        raise ValueError(f"{label or 'arquivo'} não é um contêiner BIN nem PM1")
+    return _plan_container(buf, kind, entries, replacements, label)
+
+
+def repack_bytes(buf, replacements, label=""):
+    """Conteúdo novo de um contêiner em memória (usado para os contêineres internos)."""
+    result = plan(buf, replacements, label)
+    if not result.patches and result.tail_start is None:
+        return buf
+    out = bytearray(buf[:result.tail_start] if result.tail_start is not None else buf)
+    for offset, data in result.patches:
+        out[offset:offset + len(data)] = data
+    return bytes(out + result.tail)
+
+
+def _write_undo(undo_path, buf, regions):
+    """Grava em undo_path o tamanho de buf e os trechos [(offset, tamanho)] que serão sobrescritos."""
+    with open(undo_path + ".tmp", 'wb') as f:
+        f.write(UNDO_MAGIC + struct.pack('<Q', len(buf)))
+        for offset, length in regions:
+            data = bytes(buf[offset:offset + length])
+            f.write(struct.pack('<QQ', offset, len(data)) + data)
+        f.flush(); os.fsync(f.fileno())
+    os.replace(undo_path + ".tmp", undo_path)
+
+
+def recover(path):
+    """Desfaz uma gravação de repack_file interrompida (se houver ARQUIVO.undo). Devolve True se desfez."""
+    undo_path = path + ".undo"
+    if not os.path.exists(undo_path):
+        return False
+    with open(undo_path, 'rb') as f:
+        journal = f.read()
+    if journal[:8] != UNDO_MAGIC:
+        raise ValueError(f"{undo_path} não é um arquivo de desfazer válido")
+    size, = struct.unpack_from('<Q', journal, 8); pos = 16
+    with open(path, 'r+b') as f:
+        while pos < len(journal):
+            offset, length = struct.unpack_from('<QQ', journal, pos); pos += 16
+            f.seek(offset); f.write(journal[pos:pos + length]); pos += length
+        f.truncate(size); f.flush(); os.fsync(f.fileno())
+    os.remove(undo_path)
+    return True
+
+
+@contextmanager
+def _mapped(path):
+    """Conteúdo de `path` por mmap (só leitura), válido dentro do with."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""; return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            yield m
+
+
+def _apply(path, result):
+    """Grava as alterações de um Plan em `path` (no lugar) e força a ida para o disco."""
+    with open(path, 'r+b') as f:
+        for offset, data in result.patches:
+            f.seek(offset); f.write(data)
+        if result.tail_start is not None:
+            f.seek(result.tail_start); f.write(result.tail); f.truncate()
+        f.flush(); os.fsync(f.fileno())
+
+
+def repack_file(path, replacements, in_place=False):
+    """Troca os subarquivos de `path` no disco. Devolve (bytes gravados no lugar, bytes remontados).
+
+    Sem `in_place`, as alterações vão para uma cópia que substitui `path` com os.replace;
+    com `in_place`, `path` é alterado direto, protegido por ARQUIVO.undo.
+    """
+    recover(path)
+    undo_path = path + ".undo"
+    with _mapped(path) as buf:
+        result = plan(buf, replacements, os.path.basename(path))
+        if not result.patches and result.tail_start is None:
+            return 0, 0
+        if in_place:
+            regions = [(offset, len(data)) for offset, data in result.patches]
+            if result.tail_start is not None:
+                regions.append((result.tail_start, len(buf) - result.tail_start))
+            _write_undo(undo_path, buf, regions)
+    # O mmap já foi fechado: no Windows um arquivo mapeado não pode ser truncado nem substituído.
+    if in_place:
+        try:
+            _apply(path, result)
+        except BaseException:
+            recover(path)
+            raise
+        os.remove(undo_path)
+    else:
+        tmp_path = path + ".tmp"
+        try:
+            shutil.copyfile(path, tmp_path); shutil.copymode(path, tmp_path)
+            _apply(tmp_path, result)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    return sum(len(data) for _, data in result.patches), len(result.tail)
+
+
+def entry_names(path):
+    """Nomes das entradas diretas de um contêiner BIN ou do bloco de mensagens de um PM1."""
+    with _mapped(path) as buf:
+        blocks = pm1_blocks(buf)
+        if blocks is not None:
+            return [pm1_message_name(buf, blocks)]
+        kind, entries = detect_container(buf)
+        return [name for name, _, _ in entries or ()]
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Troca subarquivos de contêineres BIN/ARC/PAC e PM1 sem regravar o arquivo inteiro.")
+    parser.add_argument("files", nargs="+", help="Contêineres a alterar")
+    parser.add_argument("--dir", default=None, help="Pasta com os subarquivos novos (padrão: a pasta de cada contêiner)")
+    parser.add_argument("--put", action="append", default=[], metavar="CAMINHO=ARQ",
+                        help="Troca a entrada CAMINHO (ex.: event/cmm.bin/cmmFormat.dat) pelo arquivo ARQ")
+    parser.add_argument("--in-place", action="store_true",
+                        help="Altera o arquivo no lugar (com ARQUIVO.undo) em vez de gravar uma cópia e substituir")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for path in args.files:
+        replacements = {}
+        try:
+            if recover(path):
+                print(f"{path}: gravação interrompida desfeita")
+            for item in args.put:
+                key, _, source = item.partition("=")
+                if not source:
+                    parser.error(f"--put espera CAMINHO=ARQ: {item}")
+                replacements[key] = _read(source)
+            if not args.put:
+                directory = args.dir or os.path.dirname(os.path.abspath(path))
+                for name in entry_names(path):
+                    source = os.path.join(directory, os.path.basename(name))
+                    if os.path.isfile(source):
+                        replacements[name] = _read(source)
+            patched, rebuilt = repack_file(path, replacements, args.in_place)
+        except (OSError, ValueError) as e:
+            print(f"ERRO: {path}: {e}"); failed += 1
+            continue
+        if patched or rebuilt:
+            print(f"{path}: {patched} byte(s) no lugar, {rebuilt} byte(s) remontados")
+        else:
+            print(f"{path}: sem alterações")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
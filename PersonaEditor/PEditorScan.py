@@ -0,0 +1,184 @@
+"""Busca dos arquivos de um lote: recursiva (os.scandir), filtrada por padrão e por tipo e,
+se pedido, sem arquivos de conteúdo repetido.
+
+A busca roda fora da thread da interface. O Scanner junta os caminhos em lotes numa fila
+que a interface esvazia no timer, como o log. Não importa o PyQt6.
+
+Uso: python PEditorScan.py PASTA... [--type BF --type PTP] [--glob "e0*;*.bf"] [--no-recursive] [--dedup]
+"""
+import argparse
+import fnmatch
+import os
+import queue
+import sys
+import threading
+import time
+
+from PEditorCache import hash_file
+
+# tipo -> extensões (minúsculas)
+TYPES = {"BF": (".bf",), "BMD": (".bmd",), "PM1": (".pm1",), "ARC": (".arc",), "PTP": (".ptp",), "TMX": (".tmx",), "DDS": (".dds",)}
+BATCH_SIZE = 1000
+_MISSING = object()
+
+
+def matcher(patterns=None, types=None):
+    """Função nome -> bool para os padrões glob (separados por ';') e os tipos de TYPES."""
+    extensions = ()
+    for kind in types or ():
+        if kind.upper() not in TYPES:
+            raise ValueError(f"Tipo desconhecido: {kind} (opções: {', '.join(TYPES)})")
+        extensions += TYPES[kind.upper()]
+    globs = [p.strip().lower() for p in (patterns or "").split(";") if p.strip()]
+
+    def accept(name):
+        lowered = name.lower()
+        if extensions and not lowered.endswith(extensions):
+            return False
+        return not globs or any(fnmatch.fnmatchcase(lowered, g) for g in globs)
+    return accept
+
+
+def walk(root, accept=None, recursive=True, cancel=None):
+    """DirEntry dos arquivos aceitos em `root`, pasta por pasta, em ordem alfabética."""
+    stack = [root]
+    while stack:
+        if cancel is not None and cancel.is_set():
+            return
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name.lower())
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        subdirs.append(entry.path)
+                elif entry.is_file() and (accept is None or accept(entry.name)):
+                    yield entry
+            except OSError:
+                continue
+        stack.extend(reversed(subdirs))
+
+
+class ContentDedup:
+    """Descarta arquivos com o mesmo conteúdo de um já aceito.
+
+    O hash só é calculado quando aparece um segundo arquivo do mesmo tamanho.
+    """
+
+    def __init__(self):
+        self._by_size = {}  # tamanho -> primeiro caminho, ainda sem hash (None depois de calculado)
+        self._hashes = set()
+
+    def _add_hash(self, path, size):
+        try:
+            key = (size, hash_file(path))
+        except OSError:
+            return True
+        if key in self._hashes:
+            return False
+        self._hashes.add(key)
+        return True
+
+    def is_new(self, path, size):
+        pending = self._by_size.get(size, _MISSING)
+        if pending is _MISSING:
+            self._by_size[size] = path
+            return True
+        if pending is not None:
+            self._add_hash(pending, size); self._by_size[size] = None
+        return self._add_hash(path, size)
+
+
+class Scanner:
+    """Busca em `roots` (pastas ou arquivos) que entrega os caminhos em lotes por `drain()`."""
+
+    def __init__(self, roots, patterns=None, types=None, recursive=True, dedup=None, batch_size=BATCH_SIZE):
+        self.roots = list(roots)
+        self.accept = matcher(patterns, types)
+        self.recursive = recursive
+        self.dedup = dedup  # ContentDedup (pode ser compartilhado entre buscas) ou None
+        self.batch_size = batch_size
+        self.count = 0
+        self.duplicates = 0
+        self.done = threading.Event()
+        self._cancel = threading.Event()
+        self._found = queue.SimpleQueue()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def _entries(self):
+        for root in self.roots:
+            if os.path.isdir(root):
+                yield from walk(root, self.accept, self.recursive, self._cancel)
+            elif os.path.isfile(root):
+                yield _FileEntry(root)
+
+    def run(self):
+        batch = []
+        try:
+            for entry in self._entries():
+                if self._cancel.is_set():
+                    break
+                if self.dedup is not None and not self.dedup.is_new(entry.path, entry.stat().st_size):
+                    self.duplicates += 1
+                    continue
+                batch.append(entry.path)
+                if len(batch) >= self.batch_size:
+                    self._found.put(batch); self.count += len(batch); batch = []
+        finally:
+            if batch:
+                self._found.put(batch); self.count += len(batch)
+            self.done.set()
+
+    def drain(self):
+        """Caminhos encontrados desde a última chamada."""
+        paths = []
+        while True:
+            try:
+                paths.extend(self._found.get_nowait())
+            except queue.Empty:
+                return paths
+
+
+class _FileEntry:
+    """Arquivo passado diretamente (sem filtro), com a mesma interface do DirEntry."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def stat(self):
+        return os.stat(self.path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lista os arquivos de um lote (recursivo, com filtros e sem duplicados).")
+    parser.add_argument("roots", nargs="+", help="Pastas ou arquivos")
+    parser.add_argument("--type", action="append", default=[], help=f"Tipo de arquivo ({', '.join(TYPES)}); pode repetir")
+    parser.add_argument("--glob", default=None, help='Padrões do nome separados por ";" (ex.: "e0*;*.bf")')
+    parser.add_argument("--no-recursive", action="store_true", help="Só a pasta indicada, sem subpastas")
+    parser.add_argument("--dedup", action="store_true", help="Ignora arquivos com conteúdo igual a um já listado")
+    args = parser.parse_args(argv)
+    try:
+        scanner = Scanner(args.roots, args.glob, args.type, not args.no_recursive, ContentDedup() if args.dedup else None)
+    except ValueError as e:
+        parser.error(str(e))
+    start = time.perf_counter()
+    scanner.run()
+    for path in scanner.drain():
+        print(path)
+    print(f"{scanner.count} arquivo(s), {scanner.duplicates} duplicado(s) em {time.perf_counter() - start:.2f}s.", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
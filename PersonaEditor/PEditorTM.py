@@ -0,0 +1,273 @@
+"""Memória de tradução sobre os TSVs da pasta Text/.
+
+Cada TSV vira um "shard" com as linhas, o índice por (%FN, %MSGIND, %STRIND) e o
+índice pelo texto original normalizado. Os textos originais distintos de todos os
+shards formam o índice de trigramas das sugestões aproximadas, ordenado pelo nº de
+trigramas de cada texto. A similaridade é o coeficiente de Dice dos trigramas
+(2·comuns / (trigramas da consulta + trigramas do candidato)); com o corte c, só
+candidatos com entre n·c/(2-c) e n·(2-c)/c trigramas podem passar, e cada lista do
+índice é cortada nesse intervalo por busca binária antes da contagem. Mesmo assim a
+busca aproximada leva alguns milissegundos por consulta (na pasta Text/, ~1,5 ms para
+frases curtas e ~4 ms para textos longos), não menos de 1 ms: com o corte 0.6 o
+intervalo ainda cobre boa parte dos textos. lookup e exact são buscas diretas em dict.
+
+Os shards ficam num cache em disco (padrão: PersonaEditor/.tm_cache.pickle, fora da pasta
+Text/) e o índice de trigramas num arquivo ao lado (.tm_cache.pickle.grams). Só os shards
+dos TSVs que mudaram (mtime/tamanho) são refeitos, e o índice só é refeito e regravado
+quando o conjunto de textos originais muda (editar o %NEWSTR não mexe nele).
+
+Uso: python PEditorTM.py [--text-dir PASTA] [--cache ARQ] lookup FN MSGIND STRIND
+     python PEditorTM.py [--text-dir PASTA] [--cache ARQ] exact "texto original"
+     python PEditorTM.py [--text-dir PASTA] [--cache ARQ] fuzzy "texto original" [-n 5]
+     python PEditorTM.py [--text-dir PASTA] [--cache ARQ] dups
+"""
+import argparse
+import heapq
+import math
+import os
+import pickle
+import re
+import sys
+from bisect import bisect_left
+from collections import Counter
+
+from PEditorText import read_rows, text_files
+from PEditorTokens import plain_text
+
+CACHE_NAME = ".tm_cache.pickle"
+CACHE_VERSION = 3
+LONG_POSTING = 800  # listas de trigramas acima disto só são contadas para os candidatos que sobram
+GRAMS_SUFFIX = ".grams"  # o índice de trigramas fica em <cache>.grams
+DEFAULT_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), CACHE_NAME)
+SPACES = re.compile(r"\s+")
+
+
+def normalize(text):
+    """Texto para comparação: sem códigos de controle, minúsculo e com espaços simples."""
+    return SPACES.sub(" ", plain_text(text, " ")).strip().lower()
+
+
+def trigrams(norm):
+    padded = f"  {norm} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def is_translated(row):
+    return row.new_str != "" and row.new_str != row.old_str
+
+
+class Shard:
+    """Índices de um único TSV."""
+
+    def __init__(self, path):
+        st = os.stat(path)
+        self.path = path
+        self.stamp = (st.st_mtime_ns, st.st_size)
+        self.rows = list(read_rows(path))
+        self.by_key = {}
+        self.by_norm = {}
+        for i, row in enumerate(self.rows):
+            self.by_key.setdefault((row.fn.lower(), row.msg_index, row.str_index), []).append(i)
+            norm = normalize(row.old_str)
+            if norm:
+                self.by_norm.setdefault(norm, []).append(i)
+
+    @classmethod
+    def from_state(cls, state):
+        shard = cls.__new__(cls); shard.__dict__.update(state)
+        return shard
+
+
+class GramIndex:
+    """Trigramas dos textos normalizados distintos, com os ids ordenados pelo nº de trigramas."""
+
+    def __init__(self, norms):
+        items = sorted((len(grams), norm, grams) for norm in norms for grams in [trigrams(norm)])
+        self.norms = [norm for _, norm, _ in items]
+        self.sizes = [size for size, _, _ in items]
+        self.grams = [frozenset(grams) for _, _, grams in items]
+        self.postings = {}
+        for i, (_, _, grams) in enumerate(items):
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(i)
+
+    def search(self, norm, limit, cutoff):
+        """[(Dice, texto normalizado)] dos `limit` mais parecidos com Dice >= cutoff."""
+        grams = trigrams(norm); n = len(grams)
+        # Dice >= c exige um candidato com entre n·c/(2-c) e n·(2-c)/c trigramas e ao menos
+        # n·c/(2-c) trigramas em comum: cada lista é cortada nesse intervalo de ids e os votos
+        # das listas mais longas (trigramas comuns, como " th") só entram como limite superior.
+        least = math.ceil(n * cutoff / (2 - cutoff))
+        lo = bisect_left(self.sizes, least)
+        hi = bisect_left(self.sizes, math.floor(n * (2 - cutoff) / cutoff) + 1)
+        slices = []
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting:
+                start = bisect_left(posting, lo); stop = bisect_left(posting, hi)
+                if stop > start:
+                    slices.append(posting[start:stop])
+        slices.sort(key=len)
+        counted = max(0, len(slices) - least + 1)
+        while counted < len(slices) and len(slices[counted]) <= LONG_POSTING:
+            counted += 1
+        votes = Counter()
+        for posting in slices[:counted]:
+            votes.update(posting)
+        rest = len(slices) - counted; sizes = self.sizes; scored = []
+        for i, common in votes.items():
+            size = sizes[i]
+            if 2 * (common + rest) >= cutoff * (n + size):
+                if rest:
+                    common = len(grams & self.grams[i])
+                if 2 * common >= cutoff * (n + size):
+                    scored.append((2 * common / (n + size), i))
+        return [(score, self.norms[i]) for score, i in heapq.nlargest(limit, scored)]
+
+    @classmethod
+    def from_state(cls, state):
+        index = cls.__new__(cls); index.__dict__.update(state)
+        return index
+
+
+def _load(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _dump(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+class TranslationMemory:
+    def __init__(self, text_dir, cache_path=None):
+        self.text_dir = text_dir
+        self.cache_path = cache_path or DEFAULT_CACHE
+        self.shards = {}
+        self.grams = None; self._grams_token = None
+        self._load_cache()
+        self.refresh()
+
+    @property
+    def grams_path(self):
+        return self.cache_path + GRAMS_SUFFIX
+
+    def _load_cache(self):
+        try:
+            data = _load(self.cache_path)
+            if data.get("version") == CACHE_VERSION and data.get("text_dir") == os.path.abspath(self.text_dir):
+                self.shards = {name: Shard.from_state(state) for name, state in data["shards"].items()}
+                grams = _load(self.grams_path)
+                if grams.get("version") == CACHE_VERSION and grams.get("token") == data.get("grams_token"):
+                    self.grams = GramIndex.from_state(grams["index"]); self._grams_token = grams["token"]
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, KeyError, TypeError):
+            if not self.shards:
+                self.grams = None
+
+    def refresh(self):
+        """Refaz apenas os shards dos TSVs alterados. Devolve os nomes refeitos."""
+        rebuilt = []
+        paths = {os.path.basename(p): p for p in text_files(self.text_dir)}
+        for name in list(self.shards):
+            if name not in paths:
+                del self.shards[name]; rebuilt.append(name)
+        for name, path in paths.items():
+            st = os.stat(path)
+            shard = self.shards.get(name)
+            if shard is None or shard.stamp != (st.st_mtime_ns, st.st_size):
+                self.shards[name] = Shard(path); rebuilt.append(name)
+        if rebuilt or self.grams is None:
+            # Só o conjunto de textos originais entra no índice de trigramas: mudar só o %NEWSTR não o refaz.
+            norms = {norm for shard in self.shards.values() for norm in shard.by_norm}
+            grams_changed = self.grams is None or norms != set(self.grams.norms)
+            if grams_changed:
+                self.grams = GramIndex(norms)
+            self._save_cache(grams_changed)
+        return rebuilt
+
+    def _save_cache(self, grams_changed):
+        """Grava os shards e, se `grams_changed`, o índice de trigramas (arquivo à parte, ligado pelo token)."""
+        try:
+            if grams_changed:
+                self._grams_token = os.urandom(8).hex()
+                _dump(self.grams_path, {"version": CACHE_VERSION, "token": self._grams_token, "index": self.grams.__dict__})
+            shards = {name: shard.__dict__ for name, shard in self.shards.items()}
+            _dump(self.cache_path, {"version": CACHE_VERSION, "text_dir": os.path.abspath(self.text_dir), "shards": shards,
+                                    "grams_token": self._grams_token})
+        except OSError:
+            pass
+
+    def lookup(self, fn, msg_index, str_index):
+        """Linhas com a chave (%FN, %MSGIND, %STRIND), em todos os TSVs: [(tsv, TextRow)]."""
+        key = (fn.lower(), int(msg_index), int(str_index))
+        return [(name, shard.rows[i]) for name, shard in self.shards.items() for i in shard.by_key.get(key, ())]
+
+    def exact(self, source):
+        """Todas as linhas cujo texto original normalizado é igual ao de `source`."""
+        return self._rows_for_norm(normalize(source))
+
+    def translations(self, source):
+        """Traduções já feitas para o mesmo texto original: {tradução: nº de ocorrências}."""
+        return Counter(row.new_str for _, row in self.exact(source) if is_translated(row))
+
+    def fuzzy(self, source, limit=5, cutoff=0.6):
+        """Sugestões aproximadas: [(similaridade, texto normalizado, [(tsv, TextRow)])]."""
+        norm = normalize(source)
+        if not norm:
+            return []
+        return [(score, candidate, self._rows_for_norm(candidate)) for score, candidate in self.grams.search(norm, limit, cutoff)]
+
+    def _rows_for_norm(self, norm):
+        return [(name, shard.rows[i]) for name, shard in self.shards.items() for i in shard.by_norm.get(norm, ())]
+
+    def duplicates(self):
+        """Textos originais iguais com traduções diferentes: {texto normalizado: Counter}."""
+        groups = {}
+        for shard in self.shards.values():
+            for norm, ids in shard.by_norm.items():
+                for i in ids:
+                    row = shard.rows[i]
+                    if is_translated(row):
+                        groups.setdefault(norm, Counter())[row.new_str] += 1
+        return {norm: counts for norm, counts in groups.items() if len(counts) > 1}
+
+
+def _print_rows(rows):
+    for name, row in rows:
+        print(f"  [{name}:{row.line}] {row.fn}\t{row.msg_index}\t{row.str_index}\t{row.old_str}\t-> {row.new_str}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consulta a memória de tradução da pasta Text/.")
+    parser.add_argument("--text-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "Text"))
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="Arquivo do cache (padrão: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    p = commands.add_parser("lookup"); p.add_argument("fn"); p.add_argument("msg_index", type=int); p.add_argument("str_index", type=int)
+    p = commands.add_parser("exact"); p.add_argument("text")
+    p = commands.add_parser("fuzzy", help="Sugestões aproximadas (alguns ms por consulta)"); p.add_argument("text"); p.add_argument("-n", type=int, default=5)
+    commands.add_parser("dups")
+    args = parser.parse_args(argv)
+
+    tm = TranslationMemory(args.text_dir, args.cache)
+    if args.command == "lookup":
+        _print_rows(tm.lookup(args.fn, args.msg_index, args.str_index))
+    elif args.command == "exact":
+        _print_rows(tm.exact(args.text))
+        for translation, count in tm.translations(args.text).most_common():
+            print(f"  {count}x {translation}")
+    elif args.command == "fuzzy":
+        for ratio, norm, rows in tm.fuzzy(args.text, args.n):
+            print(f"{ratio:.2f}  {norm}"); _print_rows(rows[:3])
+    else:
+        for norm, counts in sorted(tm.duplicates().items()):
+            print(norm)
+            for translation, count in counts.most_common():
+                print(f"  {count}x {translation}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,32 @@
+"""Leitura dos TSVs de tradução da pasta Text/ (%FN %MSGIND %STRIND %OLDNM %OLDSTR %NEWSTR).
+
+As linhas são separadas por tabulação exatamente como o PersonaEditorCMD faz no
+-imptext (sem tratar aspas). Linhas de duas colunas (Names.txt) são nomes: %OLDNM %NEWNM.
+"""
+import os
+from collections import namedtuple
+
+TextRow = namedtuple("TextRow", "line fn msg_index str_index old_name old_str new_str")
+TEXT_FIELDS = ("%FN", "%MSGIND", "%STRIND", "%OLDNM", "%OLDSTR", "%NEWSTR")
+
+
+def _int(value):
+    return int(value) if value.lstrip('-').isdigit() else -1
+
+
+def read_rows(path, encoding="utf-8"):
+    """Gera as linhas do TSV como TextRow; em linhas de nome, msg_index e str_index são -1."""
+    with open(path, 'r', encoding=encoding, errors='replace', newline='') as f:
+        for line_no, line in enumerate(f, 1):
+            cols = line.rstrip('\r\n').split('\t')
+            if len(cols) >= 6:
+                yield TextRow(line_no, cols[0], _int(cols[1]), _int(cols[2]), cols[3], cols[4], cols[5])
+            elif len(cols) == 5:
+                yield TextRow(line_no, cols[0], _int(cols[1]), _int(cols[2]), cols[3], cols[4], "")
+            elif len(cols) >= 1 and cols[0]:
+                yield TextRow(line_no, "", -1, -1, cols[0], cols[0], cols[1] if len(cols) > 1 else "")
+
+
+def text_files(text_dir):
+    """Arquivos .txt/.tsv da pasta Text/, em ordem alfabética."""
+    return sorted(os.path.join(text_dir, f) for f in os.listdir(text_dir) if f.lower().endswith((".txt", ".tsv")))
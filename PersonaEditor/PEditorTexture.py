@@ -0,0 +1,537 @@
+"""Conversão nativa de texturas TMX (PS2) e DDS para PNG, com cache em disco pelo conteúdo.
+
+TMX   cabeçalho de 0x40 bytes: u16 1/2, u16 id, u32 tamanho, "TMX0", u32; em 0x10 u8 nº de
+      paletas, u8 formato da paleta, u16 largura, u16 altura, u8 formato dos pixels, u8 nº de
+      mipmaps. Depois vêm a paleta e os pixels, sem swizzle. Formatos do GS: PSMCT32/24/16,
+      PSMT8 e PSMT4. A paleta de 256 cores vem embaralhada em blocos de 8 (CSM1) e o alfa
+      vai de 0 a 0x80.
+DDS   DXT1/3/5 (BC1/2/3), BC7 (cabeçalho DX10) e RGB(A) sem compressão; só o primeiro mipmap.
+
+O cache (padrão: ../tex_cache) guarda <hash>.png e <hash>_<N>.png (miniatura com lado N) pelo
+hash do conteúdo. O índice lembra o hash de cada arquivo pelo mtime/tamanho: rever a pasta
+não relê nada, e só as texturas novas ou alteradas são decodificadas, em vários processos.
+Arquivos com o mesmo conteúdo são decodificados uma vez só (o resumo conta à parte as
+decodificadas, as repetidas e as que já estavam no cache).
+
+A decodificação é em Python puro: os blocos 4x4 repetidos numa textura e as paletas de pares
+de pontas de cor/alfa já vistos são reaproveitados, mas um DDS DXT5 de 1024x1024 ainda leva
+~0,7 s e um BC7 ~1,4 s por processo; a primeira passada na IN/tex2 leva ~7 s num núcleo.
+
+Uso: python PEditorTexture.py PASTAS/ARQUIVOS... [--cache PASTA] [--thumb 128] [--out PASTA] [--workers N]
+"""
+import argparse
+import json
+import os
+import shutil
+import struct
+import sys
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from PEditorBatch import default_workers
+from PEditorCache import hash_file
+from PEditorScan import matcher, walk
+
+DECODER_VERSION = 1
+INDEX_NAME = ".index.json"
+THUMB_SIZE = 128
+BYTES = [bytes((i,)) for i in range(256)]
+BLOCK_MEMO = 1 << 16  # blocos DXT/BC7 decodificados guardados por textura (lados iguais = mesmo resultado)
+TEXTURE_TYPES = ("TMX", "DDS")
+
+# --- TMX -------------------------------------------------------------------------------
+
+PSMCT32, PSMCT24, PSMCT16, PSMCT16S, PSMT8, PSMT4 = 0x00, 0x01, 0x02, 0x0A, 0x13, 0x14
+COLOR_SIZES = {PSMCT32: 4, PSMCT24: 3, PSMCT16: 2, PSMCT16S: 2}
+PS2_ALPHA = bytes(min(255, (a * 255 + 64) // 128) for a in range(256))
+
+
+def _ps2_colors(data, fmt, count):
+    """Lista de `count` cores RGBA (bytes de 4) no formato `fmt` do GS."""
+    size = COLOR_SIZES.get(fmt)
+    if size is None:
+        raise ValueError(f"Formato de cor do TMX não suportado: 0x{fmt:02X}")
+    colors = []
+    for i in range(count):
+        if size == 4:
+            r, g, b, a = data[i * 4:i * 4 + 4]; a = PS2_ALPHA[a]
+        elif size == 3:
+            r, g, b = data[i * 3:i * 3 + 3]; a = 255
+        else:
+            v, = struct.unpack_from('<H', data, i * 2)
+            r, g, b = ((v >> s & 31) * 255 // 31 for s in (0, 5, 10)); a = 255 if v & 0x8000 else 0
+        colors.append(bytes((r, g, b, a)))
+    return colors
+
+
+def _csm1(index):
+    """Posição na paleta armazenada da cor `index` (troca os blocos 8-15 e 16-23 de cada 32)."""
+    return (index & 0xE7) | ((index & 0x08) << 1) | ((index & 0x10) >> 1)
+
+
+def decode_tmx(buf):
+    """(largura, altura, RGBA) do primeiro mipmap de um TMX."""
+    if bytes(buf[8:12]) != b"TMX0":
+        raise ValueError("Não é um TMX (assinatura TMX0 ausente).")
+    palettes, palette_fmt, width, height, pixel_fmt = struct.unpack_from('<BBHHB', buf, 0x10)
+    pos = 0x40; count = width * height
+    if pixel_fmt in (PSMT8, PSMT4):
+        colors = 256 if pixel_fmt == PSMT8 else 16
+        stored = _ps2_colors(buf[pos:], palette_fmt, colors)
+        pos += colors * COLOR_SIZES[palette_fmt] * max(1, palettes)
+        palette = [stored[_csm1(i)] for i in range(256)] if colors == 256 else stored
+        if pixel_fmt == PSMT8:
+            rgba = b"".join(palette[i] for i in buf[pos:pos + count])
+        else:
+            pairs = [palette[b & 15] + palette[b >> 4] for b in range(256)]
+            rgba = b"".join(pairs[b] for b in buf[pos:pos + (count + 1) // 2])[:count * 4]
+    elif pixel_fmt == PSMCT32:
+        rgba = bytearray(buf[pos:pos + count * 4])
+        rgba[3::4] = bytes(rgba[3::4]).translate(PS2_ALPHA)
+    else:
+        rgba = b"".join(_ps2_colors(buf[pos:], pixel_fmt, count))
+    if len(rgba) != count * 4:
+        raise ValueError("TMX truncado.")
+    return width, height, bytes(rgba)
+
+
+# --- DDS -------------------------------------------------------------------------------
+
+DXGI_BC1, DXGI_BC2, DXGI_BC3, DXGI_BC7 = (71, 72), (74, 75), (77, 78), (98, 99)
+DXGI_RGBA8, DXGI_BGRA8 = (28, 29), (87, 91)
+
+
+def _rgb565(v):
+    r, g, b = v >> 11 & 31, v >> 5 & 63, v & 31
+    return (r << 3 | r >> 2, g << 2 | g >> 4, b << 3 | b >> 2)
+
+
+@lru_cache(maxsize=BLOCK_MEMO)
+def _bc1_colors(c0, c1, four_colors):
+    """As 4 cores RGBA de um bloco BC1 pelas duas pontas RGB565 (muitos blocos repetem as pontas)."""
+    a, b = _rgb565(c0), _rgb565(c1)
+    if four_colors or c0 > c1:
+        c2 = bytes((2 * x + y + 1) // 3 for x, y in zip(a, b)) + b"\xff"
+        c3 = bytes((x + 2 * y + 1) // 3 for x, y in zip(a, b)) + b"\xff"
+    else:
+        c2 = bytes((x + y) // 2 for x, y in zip(a, b)) + b"\xff"; c3 = b"\0\0\0\0"
+    return (bytes(a) + b"\xff", bytes(b) + b"\xff", c2, c3)
+
+
+@lru_cache(maxsize=BLOCK_MEMO)
+def _bc1_rgb(c0, c1):
+    """As 4 cores RGB (sem alfa) das pontas de um bloco de cor do BC2/BC3."""
+    return tuple(color[:3] for color in _bc1_colors(c0, c1, True))
+
+
+@lru_cache(maxsize=BLOCK_MEMO)
+def _bc3_values(a0, a1):
+    """Os 8 valores de alfa (como bytes de 1 byte) das pontas de um bloco de alfa do BC3."""
+    if a0 > a1:
+        values = [a0, a1] + [((7 - i) * a0 + i * a1 + 3) // 7 for i in range(1, 7)]
+    else:
+        values = [a0, a1] + [((5 - i) * a0 + i * a1 + 2) // 5 for i in range(1, 5)] + [0, 255]
+    return tuple(BYTES[v] for v in values)
+
+
+def _bc1_palette(block, four_colors):
+    c0, c1 = struct.unpack_from('<HH', block)
+    return _bc1_colors(c0, c1, four_colors)
+
+
+def _bc1_pixels(block, four_colors=False):
+    palette = _bc1_palette(block, four_colors)
+    bits, = struct.unpack_from('<I', block, 4)
+    return [palette[bits >> 2 * i & 3] for i in range(16)]
+
+
+def _bc1_block(block):
+    return _bc1_pixels(block)
+
+
+def _bc2_block(block):
+    c0, c1, colors = struct.unpack_from('<HHI', block, 8)
+    rgb = _bc1_rgb(c0, c1); alpha = int.from_bytes(block[:8], 'little')
+    return [rgb[colors >> 2 * i & 3] + BYTES[(alpha >> 4 * i & 15) * 17] for i in range(16)]
+
+
+def _bc3_block(block):
+    c0, c1, colors = struct.unpack_from('<HHI', block, 8)
+    rgb = _bc1_rgb(c0, c1); values = _bc3_values(block[0], block[1])
+    alpha = int.from_bytes(block[2:8], 'little')
+    return [rgb[colors >> 2 * i & 3] + values[alpha >> 3 * i & 7] for i in range(16)]
+
+
+# BC7: (subconjuntos, bits de partição, de rotação, de seleção de índice, de cor, de alfa,
+#       p-bit por ponta, p-bit compartilhado, bits de índice, bits do segundo índice)
+BC7_MODES = (
+    (3, 4, 0, 0, 4, 0, 1, 0, 3, 0),
+    (2, 6, 0, 0, 6, 0, 0, 1, 3, 0),
+    (3, 6, 0, 0, 5, 0, 0, 0, 2, 0),
+    (2, 6, 0, 0, 7, 0, 1, 0, 2, 0),
+    (1, 0, 2, 1, 5, 6, 0, 0, 2, 3),
+    (1, 0, 2, 0, 7, 8, 0, 0, 2, 2),
+    (1, 0, 0, 0, 7, 7, 1, 0, 4, 0),
+    (2, 6, 0, 0, 5, 5, 1, 0, 2, 0),
+)
+BC7_WEIGHTS = {2: (0, 21, 43, 64), 3: (0, 9, 18, 27, 37, 46, 55, 64),
+               4: (0, 4, 9, 13, 17, 21, 26, 30, 34, 38, 43, 47, 51, 55, 60, 64)}
+# Partições: bit i (2 subconjuntos) ou bits 2i..2i+1 (3 subconjuntos) = subconjunto do pixel i.
+BC7_PARTITIONS2 = (
+    0xCCCC, 0x8888, 0xEEEE, 0xECC8, 0xC880, 0xFEEC, 0xFEC8, 0xEC80, 0xC800, 0xFFEC, 0xFE80, 0xE800, 0xFFE8, 0xFF00, 0xFFF0, 0xF000,
+    0xF710, 0x008E, 0x7100, 0x08CE, 0x008C, 0x7310, 0x3100, 0x8CCE, 0x088C, 0x3110, 0x6666, 0x366C, 0x17E8, 0x0FF0, 0x718E, 0x399C,
+    0xAAAA, 0xF0F0, 0x5A5A, 0x33CC, 0x3C3C, 0x55AA, 0x9696, 0xA55A, 0x73CE, 0x13C8, 0x324C, 0x3BDC, 0x6996, 0xC33C, 0x9966, 0x0660,
+    0x0272, 0x04E4, 0x4E40, 0x2720, 0xC936, 0x936C, 0x39C6, 0x639C, 0x9336, 0x9CC6, 0x817E, 0xE718, 0xCCF0, 0x0FCC, 0x7744, 0xEE22,
+)
+BC7_PARTITIONS3 = (
+    0xAA685050, 0x6A5A5040, 0x5A5A4200, 0x5450A0A8, 0xA5A50000, 0xA0A05050, 0x5555A0A0, 0x5A5A5050,
+    0xAA550000, 0xAA555500, 0xAAAA5500, 0x90909090, 0x94949494, 0xA4A4A4A4, 0xA9A59450, 0x2A0A4250,
+    0xA5945040, 0x0A425054, 0xA5A5A500, 0x55A0A0A0, 0xA8A85454, 0x6A6A4040, 0xA4A45000, 0x1A1A0500,
+    0x0050A4A4, 0xAAA59090, 0x14696914, 0x69691400, 0xA08585A0, 0xAA821414, 0x50A4A450, 0x6A5A0200,
+    0xA9A58000, 0x5090A0A8, 0xA8A09050, 0x24242424, 0x00AA5500, 0x24924924, 0x24499224, 0x50A50A50,
+    0x500AA550, 0xAAAA4444, 0x66660000, 0xA5A0A5A0, 0x50A050A0, 0x69286928, 0x44AAAA44, 0x66666600,
+    0xAA444444, 0x54A854A8, 0x95809580, 0x96969600, 0xA85454A8, 0x80959580, 0xAA141414, 0x96960000,
+    0xAAAA1414, 0xA05050A0, 0xA0A5A5A0, 0x96000000, 0x40804080, 0xA9A8A9A8, 0xAAAAAA44, 0x2A4A5254,
+)
+# Pixel âncora (um bit a menos no índice) do 2º subconjunto e, com 3 subconjuntos, do 3º.
+BC7_ANCHORS2 = (
+    15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 2, 8, 2, 2, 8, 8, 15, 2, 8, 2, 2, 8, 8, 2, 2,
+    15, 15, 6, 8, 2, 8, 15, 15, 2, 8, 2, 2, 2, 15, 15, 6, 6, 2, 6, 8, 15, 15, 2, 2, 15, 15, 15, 15, 15, 2, 2, 15,
+)
+BC7_ANCHORS3_2 = (
+    3, 3, 15, 15, 8, 3, 15, 15, 8, 8, 6, 6, 6, 5, 3, 3, 3, 3, 8, 15, 3, 3, 6, 10, 5, 8, 8, 6, 8, 5, 15, 15,
+    8, 15, 3, 5, 6, 10, 8, 15, 15, 3, 15, 5, 15, 15, 15, 15, 3, 15, 5, 5, 5, 8, 5, 10, 5, 10, 8, 13, 15, 12, 3, 3,
+)
+BC7_ANCHORS3_3 = (
+    15, 8, 8, 3, 15, 15, 3, 8, 15, 15, 15, 15, 15, 15, 15, 8, 15, 8, 15, 3, 15, 8, 15, 8, 3, 15, 6, 10, 15, 15, 10, 8,
+    15, 3, 15, 10, 10, 8, 9, 10, 6, 15, 8, 15, 3, 6, 6, 8, 15, 3, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 3, 15, 15, 8,
+)
+_BC7_EMPTY = [b"\0\0\0\0"] * 16
+
+
+def _bc7_block(block):
+    bits = int.from_bytes(block, 'little')
+    if not bits & 0xFF:
+        return _BC7_EMPTY  # modo reservado
+    mode = (bits & -bits).bit_length() - 1
+    subsets, pb, rb, isb, cb, ab, epb, spb, ib, ib2 = BC7_MODES[mode]
+    bits >>= mode + 1
+    partition = bits & ((1 << pb) - 1); bits >>= pb
+    rotation = bits & ((1 << rb) - 1); bits >>= rb
+    index_sel = bits & ((1 << isb) - 1); bits >>= isb
+    count = subsets * 2
+    ends = [[0, 0, 0, 255] for _ in range(count)]
+    for channel, size in ((0, cb), (1, cb), (2, cb), (3, ab)):
+        for end in ends[:count if size else 0]:
+            end[channel] = bits & ((1 << size) - 1); bits >>= size
+    pbits = None
+    if epb:
+        pbits = [bits >> i & 1 for i in range(count)]; bits >>= count
+    elif spb:
+        pbits = [bits >> (i >> 1) & 1 for i in range(count)]; bits >>= subsets
+    for e, end in enumerate(ends):
+        for channel in range(4 if ab else 3):
+            size = cb if channel < 3 else ab
+            value = end[channel]
+            if pbits is not None:
+                value = value << 1 | pbits[e]; size += 1
+            value <<= 8 - size
+            end[channel] = value | value >> size
+    if subsets == 1:
+        owner = [0] * 16; anchors = (0,)
+    elif subsets == 2:
+        mask = BC7_PARTITIONS2[partition]
+        owner = [mask >> i & 1 for i in range(16)]; anchors = (0, BC7_ANCHORS2[partition])
+    else:
+        mask = BC7_PARTITIONS3[partition]
+        owner = [mask >> 2 * i & 3 for i in range(16)]
+        anchors = (0, BC7_ANCHORS3_2[partition], BC7_ANCHORS3_3[partition])
+    indices = []
+    for i in range(16):
+        size = ib - 1 if i in anchors else ib
+        indices.append(bits & ((1 << size) - 1)); bits >>= size
+    if ib2:
+        indices2 = []
+        for i in range(16):
+            size = ib2 - 1 if i == 0 else ib2
+            indices2.append(bits & ((1 << size) - 1)); bits >>= size
+        color_w, alpha_w = BC7_WEIGHTS[ib], BC7_WEIGHTS[ib2]
+        if index_sel:
+            indices, indices2 = indices2, indices; color_w, alpha_w = alpha_w, color_w
+    else:
+        indices2 = indices; color_w = alpha_w = BC7_WEIGHTS[ib]
+    pixels = []
+    for i in range(16):
+        e0, e1 = ends[2 * owner[i]], ends[2 * owner[i] + 1]
+        w = color_w[indices[i]]; wa = alpha_w[indices2[i]]
+        pixel = [((64 - w) * e0[0] + w * e1[0] + 32) >> 6, ((64 - w) * e0[1] + w * e1[1] + 32) >> 6,
+                 ((64 - w) * e0[2] + w * e1[2] + 32) >> 6, ((64 - wa) * e0[3] + wa * e1[3] + 32) >> 6]
+        if rotation:
+            pixel[rotation - 1], pixel[3] = pixel[3], pixel[rotation - 1]
+        pixels.append(bytes(pixel))
+    return pixels
+
+
+def _decode_blocks(data, width, height, block_size, decode_block):
+    """RGBA dos blocos 4x4, montado uma faixa de 4 linhas por vez; blocos repetidos são decodificados uma vez só."""
+    stride = width * 4
+    row_size = (width + 3) // 4 * block_size
+    rows = []; seen = {}
+    for by in range((height + 3) // 4):
+        band = ([], [], [], [])
+        for pos in range(by * row_size, (by + 1) * row_size, block_size):
+            block = data[pos:pos + block_size]
+            lines = seen.get(block)
+            if lines is None:
+                if len(seen) >= BLOCK_MEMO:
+                    seen.clear()
+                pixels = decode_block(block)
+                lines = seen[block] = tuple(b"".join(pixels[i:i + 4]) for i in range(0, 16, 4))
+            for line, part in zip(band, lines):
+                line.append(part)
+        for line in band[:height - by * 4]:
+            rows.append(b"".join(line)[:stride])
+    return b"".join(rows)
+
+
+def _decode_masked(data, width, height, bit_count, masks):
+    """RGB(A) sem compressão com máscaras de byte inteiro (ex.: A8R8G8B8)."""
+    size = bit_count // 8; count = width * height
+    if size not in (3, 4) or len(data) < count * size:
+        raise ValueError(f"DDS sem compressão de {bit_count} bits não suportado.")
+    out = bytearray(b"\xff" * count * 4)
+    for channel, mask in enumerate(masks):
+        if not mask:
+            continue
+        shift = (mask & -mask).bit_length() - 1
+        if mask >> shift != 0xFF or shift % 8:
+            raise ValueError(f"Máscara de cor do DDS não suportada: 0x{mask:08X}")
+        out[channel::4] = data[shift // 8:count * size:size]
+    return bytes(out)
+
+
+def decode_dds(buf):
+    """(largura, altura, RGBA) do primeiro mipmap de um DDS."""
+    if bytes(buf[:4]) != b"DDS ":
+        raise ValueError("Não é um DDS (assinatura ausente).")
+    height, width = struct.unpack_from('<II', buf, 12)
+    pf_flags, fourcc, bit_count = struct.unpack_from('<I4sI', buf, 80)
+    masks = struct.unpack_from('<4I', buf, 92)
+    pos = 128
+    if fourcc == b"DX10":
+        dxgi, = struct.unpack_from('<I', buf, 128); pos = 148
+        block = {**dict.fromkeys(DXGI_BC1, (8, _bc1_block)), **dict.fromkeys(DXGI_BC2, (16, _bc2_block)),
+                 **dict.fromkeys(DXGI_BC3, (16, _bc3_block)), **dict.fromkeys(DXGI_BC7, (16, _bc7_block))}.get(dxgi)
+        if block is None:
+            if dxgi in DXGI_RGBA8:
+                return width, height, _decode_masked(buf[pos:], width, height, 32, (0xFF, 0xFF00, 0xFF0000, 0xFF000000))
+            if dxgi in DXGI_BGRA8:
+                return width, height, _decode_masked(buf[pos:], width, height, 32, (0xFF0000, 0xFF00, 0xFF, 0xFF000000))
+            raise ValueError(f"Formato DXGI {dxgi} não suportado.")
+    elif pf_flags & 0x4:  # DDPF_FOURCC
+        block = {b"DXT1": (8, _bc1_block), b"DXT2": (16, _bc2_block), b"DXT3": (16, _bc2_block),
+                 b"DXT4": (16, _bc3_block), b"DXT5": (16, _bc3_block)}.get(fourcc)
+        if block is None:
+            raise ValueError(f"Compressão {fourcc.decode('ascii', 'replace')} não suportada.")
+    else:
+        alpha_mask = masks[3] if pf_flags & 0x1 else 0  # DDPF_ALPHAPIXELS
+        return width, height, _decode_masked(buf[pos:], width, height, bit_count, masks[:3] + (alpha_mask,))
+    size, decode_block = block
+    needed = ((width + 3) // 4) * ((height + 3) // 4) * size
+    if len(buf) - pos < needed:
+        raise ValueError("DDS truncado.")
+    return width, height, _decode_blocks(bytes(buf[pos:pos + needed]), width, height, size, decode_block)
+
+
+def decode(buf):
+    """(largura, altura, RGBA) de um TMX ou DDS, pela assinatura."""
+    if bytes(buf[:4]) == b"DDS ":
+        return decode_dds(buf)
+    if bytes(buf[8:12]) == b"TMX0":
+        return decode_tmx(buf)
+    raise ValueError("Formato de textura desconhecido (esperado TMX ou DDS).")
+
+
+# --- PNG e miniaturas ------------------------------------------------------------------
+
+def png_bytes(width, height, rgba, level=6):
+    """PNG RGBA de 8 bits, sem filtros."""
+    stride = width * 4
+    raw = b"".join(b"\0" + rgba[y * stride:(y + 1) * stride] for y in range(height))
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, level)) + chunk(b"IEND", b""))
+
+
+def thumbnail(width, height, rgba, size=THUMB_SIZE):
+    """Reduz (vizinho mais próximo) para que o maior lado tenha no máximo `size` pixels."""
+    if max(width, height) <= size:
+        return width, height, rgba
+    scale = max(width, height) / size
+    thumb_w, thumb_h = max(1, round(width / scale)), max(1, round(height / scale))
+    columns = [int(x * width / thumb_w) * 4 for x in range(thumb_w)]
+    rows = []
+    for y in range(thumb_h):
+        start = int(y * height / thumb_h) * width * 4
+        rows.append(b"".join(rgba[start + x:start + x + 4] for x in columns))
+    return thumb_w, thumb_h, b"".join(rows)
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+# --- Cache -----------------------------------------------------------------------------
+
+class TextureCache:
+    """PNGs e miniaturas por hash do conteúdo, com o hash de cada arquivo lembrado pelo mtime/tamanho."""
+
+    def __init__(self, cache_dir):
+        self.root = os.path.join(cache_dir, f"v{DECODER_VERSION}")
+        self.index_path = os.path.join(self.root, INDEX_NAME)
+        self.files = {}  # caminho absoluto -> [mtime_ns, tamanho, hash]
+        self._dirty = False
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.files = json.load(f).get("files", {})
+        except (OSError, ValueError):
+            self.files = {}
+
+    def digest(self, path):
+        st = os.stat(path); key = os.path.abspath(path)
+        cached = self.files.get(key)
+        if cached and cached[:2] == [st.st_mtime_ns, st.st_size]:
+            return cached[2]
+        digest = hash_file(path)
+        self.files[key] = [st.st_mtime_ns, st.st_size, digest]; self._dirty = True
+        return digest
+
+    def path(self, digest, size=None, ext="png"):
+        name = f"{digest}_{size}.{ext}" if size else f"{digest}.{ext}"
+        return os.path.join(self.root, digest[:2], name)
+
+    def save(self):
+        if not self._dirty:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": DECODER_VERSION, "files": self.files}, f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
+
+
+def convert(path, png_path, thumb_path=None, thumb=THUMB_SIZE, error_path=None):
+    """Decodifica `path` e grava o PNG (e a miniatura); devolve (caminho, erro)."""
+    try:
+        with open(path, 'rb') as f:
+            width, height, rgba = decode(f.read())
+        _write(png_path, png_bytes(width, height, rgba))
+        if thumb_path:
+            _write(thumb_path, png_bytes(*thumbnail(width, height, rgba, thumb)))
+        return path, None
+    except (OSError, ValueError, struct.error) as e:
+        if error_path:
+            try:
+                _write(error_path, str(e).encode('utf-8'))
+            except OSError:
+                pass
+        return path, str(e) or type(e).__name__
+
+
+def export(paths, cache, thumb=THUMB_SIZE, workers=None):
+    """[(arquivo, png, miniatura, erro)] dos arquivos, decodificando só o que falta no cache.
+
+    Devolve (itens, contagem). A contagem separa, entre os itens sem erro, os decodificados agora
+    ("decoded"), os de conteúdo igual a outro decodificado agora ("shared") e os que já estavam no
+    cache ("cached").
+    """
+    items = []; todo = {}; sources = []
+    for path in paths:
+        try:
+            digest = cache.digest(path)
+        except OSError as e:
+            items.append((path, None, None, str(e))); sources.append(None); continue
+        png_path = cache.path(digest); thumb_path = cache.path(digest, thumb) if thumb else None
+        error_path = cache.path(digest, ext="err")
+        if os.path.exists(error_path):
+            with open(error_path, 'r', encoding='utf-8', errors='replace') as f:
+                items.append((path, None, None, f.read())); sources.append(None); continue
+        items.append((path, png_path, thumb_path, None))
+        if png_path in todo:
+            sources.append("shared")
+        elif not os.path.exists(png_path) or (thumb_path and not os.path.exists(thumb_path)):
+            todo[png_path] = (path, png_path, thumb_path, thumb, error_path); sources.append("decoded")
+        else:
+            sources.append("cached")
+    cache.save()
+    errors = {}
+    if todo:
+        jobs = list(todo.values())
+        workers = max(1, min(workers or default_workers(), len(jobs)))
+        if workers == 1:
+            results = [convert(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                results = list(pool.map(convert, *zip(*jobs)))
+        errors = {path: error for path, error in results if error}
+        by_png = {job[1]: errors.get(job[0]) for job in jobs}
+        items = [(p, png, small, error or by_png.get(png)) for p, png, small, error in items]
+    items = [(p, None, None, error) if error else (p, png, small, None) for p, png, small, error in items]
+    counts = Counter(source for source, (_, _, _, error) in zip(sources, items) if not error)
+    return items, counts
+
+
+def find_textures(roots):
+    """[(raiz, arquivo)] dos TMX/DDS em `roots` (pastas, recursivamente, ou arquivos)."""
+    accept = matcher(types=TEXTURE_TYPES)
+    found = []
+    for root in roots:
+        if os.path.isdir(root):
+            found.extend((root, entry.path) for entry in walk(root, accept))
+        else:
+            found.append((os.path.dirname(root), root))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Converte texturas TMX/DDS para PNG com cache por conteúdo, sem o PersonaEditorCMD.")
+    parser.add_argument("paths", nargs="+", help="Pastas (recursivas) ou arquivos .TMX/.DDS")
+    parser.add_argument("--cache", default=os.path.join("..", "tex_cache"), help="Pasta do cache (padrão: %(default)s)")
+    parser.add_argument("--thumb", type=int, default=THUMB_SIZE, help="Lado máximo das miniaturas; 0 desliga (padrão: %(default)s)")
+    parser.add_argument("--out", default=None, help="Copia os PNGs para esta pasta, na mesma estrutura das pastas de origem")
+    parser.add_argument("--workers", type=int, default=None, help="Processos simultâneos (padrão: nº de CPUs)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    found = find_textures(args.paths)
+    if not found:
+        print("Nenhum arquivo .TMX/.DDS encontrado.")
+        return 1
+    cache = TextureCache(args.cache)
+    items, counts = export([path for _, path in found], cache, args.thumb, args.workers)
+    failed = 0
+    for (root, path), (_, png_path, _, error) in zip(found, items):
+        if error:
+            print(f"ERRO: {path}: {error}"); failed += 1
+        elif args.out:
+            target = os.path.join(args.out, os.path.splitext(os.path.relpath(path, root))[0] + ".png")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(png_path, target)
+    print(f"{len(items)} textura(s): {counts['decoded']} decodificada(s), {counts['shared']} repetida(s) "
+          f"(mesmo conteúdo de uma decodificada agora), {counts['cached']} do cache, {failed} erro(s) "
+          f"em {time.perf_counter() - start:.1f}s.")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
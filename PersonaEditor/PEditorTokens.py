@@ -0,0 +1,212 @@
+"""Tokenização dos textos dos TSVs: trechos de texto, códigos de controle e quebras de linha.
+
+Os textos trazem os códigos do jogo entre chaves, em hexadecimal: {F5 C1 05 01 ...} é uma
+função (opcode F5 e os argumentos), {0A} é a quebra de linha e {XX}/{XX YY} são bytes
+soltos ou glifos sem caractere. Chaves que não formam um código ({abc}) ficam no texto.
+
+tokenize(texto) compila o texto uma única vez numa tupla compacta: cada token é um str
+(trecho de texto) ou um bytes (código: opcode + argumentos; {0A} é NEWLINE). O resultado
+fica num cache LRU pelo próprio texto, assim como o das funções derivadas (plain_text,
+line_texts, codes, search_text). tokenize_file compila um TSV inteiro de uma vez e guarda o resultado
+enquanto o arquivo não muda.
+
+Uso: python PEditorTokens.py [--text-dir PASTA] stats
+     python PEditorTokens.py [--text-dir PASTA] check                 (códigos diferentes entre original e tradução)
+     python PEditorTokens.py [--text-dir PASTA] search TEXTO [--code F5]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter, namedtuple
+from functools import lru_cache
+
+from PEditorText import read_rows, text_files
+
+CONTROL_CODE = re.compile(r"\{([0-9A-Fa-f]{2}(?: [0-9A-Fa-f]{2})*)\}")
+NEWLINE = b"\n"  # {0A}
+CACHE_SIZE = 1 << 16  # textos distintos memorizados (os TSVs da pasta Text/ têm ~28 mil linhas)
+
+TokenizedRows = namedtuple("TokenizedRows", "rows old new")
+_files = {}  # caminho absoluto -> ((mtime_ns, tamanho, codificação), TokenizedRows)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def tokenize(text):
+    """Tupla de tokens de `text`: str (texto) ou bytes (código de controle; NEWLINE para {0A})."""
+    if "{" not in text:
+        return (text,) if text else ()
+    tokens = []; pos = 0
+    for match in CONTROL_CODE.finditer(text):
+        if match.start() > pos:
+            tokens.append(text[pos:match.start()])
+        tokens.append(bytes.fromhex(match.group(1)))
+        pos = match.end()
+    if pos < len(text):
+        tokens.append(text[pos:])
+    return tuple(tokens)
+
+
+def tokenize_many(texts):
+    """tokenize() de cada texto, na mesma ordem (textos repetidos saem do cache)."""
+    return list(map(tokenize, texts))
+
+
+def format_code(code):
+    return "{" + " ".join(f"{b:02X}" for b in code) + "}"
+
+
+def render(tokens):
+    """Texto de volta a partir dos tokens, com os códigos em maiúsculas."""
+    return "".join(token if isinstance(token, str) else format_code(token) for token in tokens)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def plain_text(text, newline="\n"):
+    """Texto sem os códigos de controle; {0A} vira `newline`."""
+    if "{" not in text:
+        return text
+    return "".join(token if isinstance(token, str) else newline for token in tokenize(text)
+                   if isinstance(token, str) or token == NEWLINE)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def line_texts(text):
+    """Texto de cada linha (separadas por {0A}), sem os códigos de controle."""
+    lines = [[]]
+    for token in tokenize(text):
+        if isinstance(token, str):
+            lines[-1].append(token)
+        elif token == NEWLINE:
+            lines.append([])
+    return tuple("".join(parts) for parts in lines)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def codes(text):
+    """Códigos de controle do texto, sem as quebras de linha, na ordem em que aparecem."""
+    return tuple(token for token in tokenize(text) if isinstance(token, bytes) and token != NEWLINE)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def search_text(text):
+    """Texto para busca: sem códigos, {0A} como espaço e minúsculo."""
+    return plain_text(text, " ").lower()
+
+
+def code_mismatch(old, new):
+    """(códigos do original que faltam na tradução, códigos a mais na tradução), ignorando a ordem."""
+    expected, found = codes(old), codes(new)
+    if expected == found:
+        return [], []
+    expected, found = Counter(expected), Counter(found)
+    return sorted((expected - found).elements()), sorted((found - expected).elements())
+
+
+def tokenize_file(path, encoding="utf-8"):
+    """TokenizedRows de um TSV (linhas, tokens do %OLDSTR, tokens do %NEWSTR), refeito só se o arquivo mudar."""
+    st = os.stat(path); key = os.path.abspath(path)
+    stamp = (st.st_mtime_ns, st.st_size, encoding)
+    cached = _files.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    rows = list(read_rows(path, encoding))
+    result = TokenizedRows(rows, tokenize_many([row.old_str for row in rows]), tokenize_many([row.new_str for row in rows]))
+    _files[key] = (stamp, result)
+    return result
+
+
+def tokenize_paths(paths, encoding="utf-8"):
+    """(caminho, TokenizedRows) de TSVs e pastas (todos os .txt/.tsv de cada pasta)."""
+    for path in paths:
+        for file_path in text_files(path) if os.path.isdir(path) else [path]:
+            yield file_path, tokenize_file(file_path, encoding)
+
+
+def stats(files):
+    """Totais dos TSVs: linhas, traduzidas, linhas de texto e uso de cada opcode."""
+    totals = Counter(); opcodes = Counter()
+    for _, tokenized in files:
+        for row, old, new in zip(*tokenized):
+            if row.msg_index < 0:
+                totals["nomes"] += 1; continue
+            totals["linhas"] += 1
+            if row.new_str and row.new_str != row.old_str:
+                totals["traduzidas"] += 1
+            for token in new or old:
+                if isinstance(token, bytes):
+                    if token == NEWLINE:
+                        totals["quebras"] += 1
+                    else:
+                        opcodes[f"{token[0]:02X}"] += 1
+    return totals, opcodes
+
+
+def check(files):
+    """[(tsv, TextRow, faltando, sobrando)] das traduções cujos códigos não batem com o original."""
+    problems = []
+    for path, tokenized in files:
+        for row, old, new in zip(*tokenized):
+            if row.msg_index < 0 or not row.new_str or row.new_str == row.old_str or old == new:
+                continue
+            missing, extra = code_mismatch(row.old_str, row.new_str)
+            if missing or extra:
+                problems.append((path, row, missing, extra))
+    return problems
+
+
+def search(files, query, opcode=None):
+    """[(tsv, TextRow)] com `query` no texto (original ou tradução, sem códigos e sem diferenciar maiúsculas)."""
+    query = query.lower(); found = []
+    for path, tokenized in files:
+        for row, old, new in zip(*tokenized):
+            if opcode is not None and not any(isinstance(t, bytes) and t[:1] == opcode for t in old + new):
+                continue
+            if not query or query in search_text(row.old_str) or query in search_text(row.new_str):
+                found.append((path, row))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estatísticas, validação dos códigos de controle e busca nos TSVs.")
+    parser.add_argument("--text-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "Text"))
+    parser.add_argument("--enc", default="utf-8")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats")
+    commands.add_parser("check")
+    p = commands.add_parser("search"); p.add_argument("text"); p.add_argument("--code", default=None, help="Só linhas com este opcode (ex.: F5)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        files = list(tokenize_paths([args.text_dir], args.enc))
+        opcode = bytes.fromhex(args.code) if getattr(args, "code", None) else None
+    except (OSError, ValueError) as e:
+        print(f"ERRO: {e}"); return 1
+    loaded = time.perf_counter()
+    if args.command == "stats":
+        totals, opcodes = stats(files)
+        print(f"{totals['linhas']} linha(s), {totals['traduzidas']} traduzida(s), {totals['nomes']} nome(s), "
+              f"{totals['quebras']} quebra(s) de linha.")
+        for code, count in opcodes.most_common():
+            print(f"  {{{code}}} {count}x")
+    elif args.command == "check":
+        problems = check(files)
+        for path, row, missing, extra in problems:
+            detail = "; ".join(part for part in (
+                "faltando " + " ".join(map(format_code, missing)) if missing else "",
+                "sobrando " + " ".join(map(format_code, extra)) if extra else "") if part)
+            print(f"{os.path.basename(path)}:{row.line} {row.fn} {row.msg_index} {row.str_index}: {detail}")
+        print(f"{len(problems)} tradução(ões) com códigos diferentes do original.")
+    else:
+        found = search(files, args.text, opcode)
+        for path, row in found:
+            print(f"  [{os.path.basename(path)}:{row.line}] {row.fn}\t{row.msg_index}\t{row.str_index}\t{row.old_str}\t-> {row.new_str}")
+        print(f"{len(found)} linha(s).")
+    print(f"Leitura {1000 * (loaded - start):.0f} ms, consulta {1000 * (time.perf_counter() - loaded):.0f} ms.", file=sys.stderr)
+    return 1 if args.command == "check" and problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
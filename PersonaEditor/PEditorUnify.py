@@ -0,0 +1,216 @@
+"""Unificação dos textos exportados em um único arquivo, com índice para separar de volta.
+
+O arquivo unificado mantém o formato antigo ("--- START: nome ---", linha em branco,
+conteúdo, duas quebras de linha). Ao lado dele fica <arquivo>.idx.json com, para cada
+seção, o arquivo de origem, o intervalo de bytes e de linhas e o hash do conteúdo.
+A cópia é feita em blocos, com memória constante. O hash ignora o tipo de quebra de
+linha (CRLF conta como LF), e as seções alteradas voltam para a origem com as quebras
+que ela tinha. Seções com o mesmo nome (arquivos de pastas diferentes) são casadas com
+o índice pela ordem em que aparecem.
+
+Uso: python PEditorUnify.py split ARQUIVO_UNIFICADO
+"""
+import hashlib
+import json
+import os
+import sys
+from collections import Counter
+
+CHUNK_SIZE = 1 << 20
+INDEX_SUFFIX = ".idx.json"
+INDEX_VERSION = 2
+
+
+def marker(name):
+    return f"--- START: {name} ---\n\n".encode('utf-8')
+
+
+def index_path_for(target):
+    return target + INDEX_SUFFIX
+
+
+class _TextHash:
+    """blake2b do conteúdo com as quebras de linha normalizadas (CRLF vira LF); `crlf` diz se havia CRLF."""
+    __slots__ = ("hasher", "pending", "crlf")
+
+    def __init__(self):
+        self.hasher = hashlib.blake2b(digest_size=16); self.pending = b""; self.crlf = False
+
+    def update(self, data):
+        data = self.pending + data
+        self.pending = b"\r" if data.endswith(b"\r") else b""
+        data = data[:len(data) - len(self.pending)]
+        if b"\r\n" in data:
+            self.crlf = True; data = data.replace(b"\r\n", b"\n")
+        self.hasher.update(data)
+
+    def hexdigest(self):
+        self.hasher.update(self.pending); self.pending = b""
+        return self.hasher.hexdigest()
+
+
+def _copy_range(src, dst, length, hasher=None):
+    """Copia `length` bytes (ou até o fim, se None) de src para dst em blocos."""
+    lines = 0; copied = 0
+    while length is None or copied < length:
+        chunk = src.read(CHUNK_SIZE if length is None else min(CHUNK_SIZE, length - copied))
+        if not chunk:
+            break
+        dst.write(chunk); copied += len(chunk); lines += chunk.count(b'\n')
+        if hasher is not None:
+            hasher.update(chunk)
+    return copied, lines
+
+
+def _copy_text(src, dst, length, crlf):
+    """Copia `length` bytes de src para dst trocando as quebras de linha por CRLF (crlf) ou LF."""
+    copied = 0; pending = b""
+    while copied < length:
+        chunk = src.read(min(CHUNK_SIZE, length - copied))
+        if not chunk:
+            break
+        copied += len(chunk); data = pending + chunk
+        pending = b"\r" if data.endswith(b"\r") else b""
+        data = data[:len(data) - len(pending)].replace(b"\r\n", b"\n")
+        dst.write(data.replace(b"\n", b"\r\n") if crlf else data)
+    dst.write(pending)
+
+
+def unify_files(sources, target, log=None):
+    """Junta `sources` (lista de caminhos) em `target` e grava o índice ao lado.
+
+    Devolve a lista de seções gravadas no índice.
+    """
+    sections = []
+    line = 1
+    with open(target, 'wb') as outfile:
+        for source in sources:
+            name = os.path.basename(source)
+            if log: log(f"  Adicionando: {name}")
+            header = marker(name)
+            outfile.write(header); line += header.count(b'\n')
+            start = outfile.tell(); hasher = _TextHash()
+            with open(source, 'rb') as infile:
+                size, lines = _copy_range(infile, outfile, None, hasher)
+            sections.append({"name": name, "source": os.path.abspath(source), "start": start, "end": start + size,
+                             "line_start": line, "line_end": line + lines, "hash": hasher.hexdigest(), "crlf": hasher.crlf})
+            outfile.write(b"\n\n"); line += lines + 2
+    write_index(target, sections)
+    return sections
+
+
+def write_index(target, sections):
+    st = os.stat(target)
+    data = {"version": INDEX_VERSION, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sections": sections}
+    tmp_path = index_path_for(target) + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, index_path_for(target))
+
+
+def read_index(target):
+    with open(index_path_for(target), 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get("version") != INDEX_VERSION:
+        raise ValueError("Versão do índice não suportada.")
+    return data
+
+
+def read_section(target, section):
+    """Lê uma seção diretamente pelo intervalo de bytes do índice."""
+    with open(target, 'rb') as f:
+        f.seek(section["start"])
+        return f.read(section["end"] - section["start"])
+
+
+def scan_sections(target):
+    """Percorre o arquivo unificado (linha a linha) e devolve as seções atuais.
+
+    Funciona mesmo depois de o arquivo ter sido editado e os offsets do índice mudarem,
+    e também se ele tiver sido salvo com CRLF.
+    """
+    sections = []; current = None
+    with open(target, 'rb') as f:
+        pos = 0; line_no = 0; skip_blank = False; tail = b""; tail_raw = (0, 0)
+        for line in f:
+            line_no += 1; raw_len = len(line)
+            if line.startswith(b"--- START: ") and line.rstrip(b"\r\n").endswith(b" ---"):
+                if current is not None:
+                    _close_section(current, pos, line_no, tail, tail_raw)
+                name = line.rstrip(b"\r\n")[len(b"--- START: "):-len(b" ---")].decode('utf-8', 'replace')
+                current = {"name": name, "hasher": _TextHash(), "start": pos + raw_len, "line_start": line_no + 1}
+                sections.append(current); skip_blank = True; tail = b""; tail_raw = (0, 0)
+            elif current is not None:
+                if skip_blank and line in (b"\n", b"\r\n"):
+                    current["start"] += raw_len; current["line_start"] += 1
+                else:
+                    # Segura as duas últimas quebras de linha, que pertencem ao separador;
+                    # tail_raw é quantos bytes cada um desses caracteres ocupa no arquivo (LF ou CRLF).
+                    eol = 2 if line.endswith(b"\r\n") else 1
+                    if eol == 2:
+                        line = line[:-2] + b"\n"
+                    tail_raw = (1, eol) if len(line) > 1 else (tail_raw[1], eol)
+                    data = tail + line
+                    current["hasher"].update(data[:-2]); tail = data[-2:]
+                skip_blank = False
+            pos += raw_len
+        if current is not None:
+            _close_section(current, pos, line_no + 1, tail, tail_raw)
+    return sections
+
+
+def _close_section(section, end, next_line, tail, tail_raw):
+    if tail != b"\n\n":
+        section["hasher"].update(tail); section["end"] = end
+    else:
+        section["end"] = end - sum(tail_raw)
+    section["line_end"] = next_line - (2 if tail == b"\n\n" else 0)
+    section["hash"] = section.pop("hasher").hexdigest()
+
+
+def split_unified(target, log=None):
+    """Grava de volta nos arquivos de origem só as seções que mudaram desde a unificação."""
+    index = read_index(target)
+    st = os.stat(target)
+    if st.st_size == index["size"] and st.st_mtime_ns == index["mtime_ns"]:
+        if log: log("Nenhuma alteração no arquivo unificado.")
+        return []
+    # Nomes repetidos (mesmo nome em pastas diferentes) são casados pela ordem no arquivo.
+    known = {}
+    for section in index["sections"]:
+        known.setdefault(section["name"], []).append(section)
+    seen = Counter(); changed = []
+    current = scan_sections(target)
+    with open(target, 'rb') as f:
+        for section in current:
+            name = section["name"]; candidates = known.get(name, ())
+            old = candidates[seen[name]] if seen[name] < len(candidates) else None
+            seen[name] += 1
+            if old is None:
+                if log: log(f"  AVISO: Seção sem arquivo de origem no índice: {name}")
+                continue
+            section["source"] = old["source"]; section["crlf"] = old["crlf"]
+            if section["hash"] == old["hash"]:
+                continue
+            f.seek(section["start"])
+            tmp_path = old["source"] + ".tmp"
+            with open(tmp_path, 'wb') as out:
+                _copy_text(f, out, section["end"] - section["start"], old["crlf"])
+            os.replace(tmp_path, old["source"])
+            changed.append(old["source"])
+            if log: log(f"  Atualizado: {old['source']}")
+    write_index(target, [s for s in current if "source" in s])
+    return changed
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2 or argv[0] != "split":
+        print(__doc__.strip().splitlines()[-1]); return 2
+    changed = split_unified(argv[1], log=print)
+    print(f"{len(changed)} arquivo(s) atualizado(s).")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
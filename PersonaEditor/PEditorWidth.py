@@ -0,0 +1,134 @@
+"""Validação da largura do %NEWSTR antes do -imptext.
+
+Mede cada texto dos TSVs com as larguras dos glifos da NewFont do PersonaEditor.xml
+e quebra as linhas como o /auto do PersonaEditorCMD: quebra por palavra, sem passar
+da largura. Códigos de controle ({F5 ...}) não ocupam espaço e {0A} começa uma nova
+linha no jogo. Uma linha estoura quando uma palavra
+sozinha não cabe na largura (ou, sem /auto, quando a linha inteira não cabe) e o
+texto estoura quando passa de --max-lines linhas.
+
+Uso: python PEditorWidth.py [--exe-dir PASTA] [--width 600] [--no-auto] [--max-lines N] [TSV ou PASTA ...]
+"""
+import argparse
+import os
+import sys
+from collections import namedtuple
+
+from PEditorFont import font_registry
+from PEditorText import read_rows, text_files
+from PEditorTokens import line_texts, plain_text
+
+DEFAULT_WIDTH = 600
+
+Overflow = namedtuple("Overflow", "path row kind width lines text")
+
+
+def load_new_font(exe_dir):
+    """GlyphWidths da NewFont configurada no PersonaEditor.xml."""
+    registry = font_registry(exe_dir)
+    return registry.widths(registry.selected()[1])
+
+
+def line_widths(text, font, width):
+    """Largura de cada linha do texto no jogo depois da quebra do /auto.
+
+    O /auto não zera a largura no {0A} (conta como código de controle), mas no jogo
+    ele quebra a linha; por isso as duas larguras são acompanhadas separadamente.
+    """
+    measure = font.measure_word; cache = font.word_cache; space = font.by_char[" "]
+    widths = []; line_width = 0; shown = 0; first = True
+    for word in text.split(" "):
+        if "{" in word:
+            parts = [measure(part) for part in line_texts(word)]
+            word_width = sum(parts); head = parts[0]
+        else:
+            word_width = cache.get(word)
+            if word_width is None:
+                word_width = measure(word)
+            parts = None; head = word_width
+        if first:
+            first = False
+        elif line_width + space + word_width > width:
+            widths.append(shown); line_width = shown = 0
+        else:
+            line_width += space; shown += space
+        line_width += word_width; shown += head
+        if parts is not None:
+            for part in parts[1:]:
+                widths.append(shown); shown = part
+    widths.append(shown)
+    return widths
+
+
+def _plain_widths(text, font):
+    return [font.measure_word(line) for line in line_texts(text)]
+
+
+def check_text(text, font, width=DEFAULT_WIDTH, auto=True, max_lines=0):
+    """Problemas de um texto: [(tipo, largura, nº de linhas)]."""
+    if not text:
+        return []
+    lines = line_widths(text, font, width) if auto else _plain_widths(text, font)
+    problems = []
+    widest = max(lines)
+    if widest > width:
+        problems.append(("largura", widest, len(lines)))
+    if max_lines and len(lines) > max_lines:
+        problems.append(("linhas", widest, len(lines)))
+    return problems
+
+
+def check_file(path, font, width=DEFAULT_WIDTH, auto=True, max_lines=0, encoding="utf-8", missing=None):
+    """Gera um Overflow para cada %NEWSTR do TSV que não cabe na caixa de texto.
+
+    Se `missing` for um dict, conta nele os caracteres sem glifo na fonte.
+    """
+    for row in read_rows(path, encoding):
+        if row.msg_index < 0 or not row.new_str:
+            continue
+        if missing is not None:
+            for ch in font.missing(plain_text(row.new_str, "")):
+                missing[ch] = missing.get(ch, 0) + 1
+        for kind, line_width, lines in check_text(row.new_str, font, width, auto, max_lines):
+            yield Overflow(path, row, kind, line_width, lines, row.new_str)
+
+
+def check_paths(paths, font, width=DEFAULT_WIDTH, auto=True, max_lines=0, encoding="utf-8", missing=None):
+    """Valida TSVs e pastas (todos os .txt/.tsv de cada pasta)."""
+    for path in paths:
+        files = text_files(path) if os.path.isdir(path) else [path]
+        for file_path in files:
+            yield from check_file(file_path, font, width, auto, max_lines, encoding, missing)
+
+
+def format_overflow(item):
+    row = item.row
+    where = f"{os.path.basename(item.path)}:{row.line} {row.fn} {row.msg_index} {row.str_index}"
+    if item.kind == "largura":
+        return f"{where}: linha com largura {item.width} - {item.text}"
+    return f"{where}: {item.lines} linhas - {item.text}"
+
+
+def main(argv=None):
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Valida a largura dos textos traduzidos antes do -imptext.")
+    parser.add_argument("paths", nargs="*", default=[os.path.join(here, os.pardir, "Text")])
+    parser.add_argument("--exe-dir", default=here)
+    parser.add_argument("--width", type=int, default=DEFAULT_WIDTH, help="largura do /auto (padrão: 600)")
+    parser.add_argument("--no-auto", action="store_true", help="não quebra as linhas, mede cada trecho entre {0A}")
+    parser.add_argument("--max-lines", type=int, default=0, help="máximo de linhas por texto (0 = sem limite)")
+    parser.add_argument("--enc", default="utf-8")
+    args = parser.parse_args(argv)
+
+    font = load_new_font(args.exe_dir)
+    count = 0; missing = {}
+    for item in check_paths(args.paths, font, args.width, not args.no_auto, args.max_lines, args.enc, missing):
+        print(format_overflow(item)); count += 1
+    if missing:
+        print("Caracteres sem glifo na NewFont: " + " ".join(f"{ch!r}x{n}" for ch, n in sorted(missing.items())))
+    print(f"{count} texto(s) estourando a largura {args.width}.")
+    return 1 if count else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
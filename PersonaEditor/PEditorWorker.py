@@ -0,0 +1,224 @@
+"""Processos residentes do PersonaEditorCMD: cada worker carrega o executável uma vez e
+recebe vários arquivos por um protocolo de linhas, em vez de abrir um processo .NET (e,
+no Linux, um Wine) por arquivo.
+
+Protocolo (uma linha JSON por mensagem, UTF-8):
+    worker -> {"ready": true, "resident": true|false, "reason": "..."}      ao iniciar
+    driver -> {"id": 1, "cwd": "PASTA", "args": ["arquivo.BF", "-impptp", ...]}
+    worker -> {"id": 1, "returncode": 0, "stdout": "...", "stderr": "..."}
+Uma linha vazia ou o fim da entrada encerra o worker.
+
+O worker hospeda o .exe no próprio processo pelo pythonnet (pip install pythonnet) e chama
+o ponto de entrada uma vez por arquivo. Sem o pythonnet, ou se o executável não aguenta
+ficar carregado (o worker morre no meio de um arquivo), o WorkerPool desiste e o
+BatchRunner volta a abrir um processo por arquivo, começando pelo arquivo interrompido.
+Com --stand-in o worker usa o stub do PEditorBench no lugar do executável, para testar o
+lado do driver sem o .NET.
+
+Uso: python PEditorWorker.py serve EXE [--stand-in]     (aberto pelo WorkerPool)
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import redirect_stderr, redirect_stdout
+
+from PEditorBatch import Result
+from PEditorProfile import NO_USAGE, Timing
+
+WORKER_START_TIMEOUT = 60
+
+
+def _protocol_channel():
+    """Separa o canal do protocolo do stdout: o que o .NET ou o Python imprimirem vai para o stderr."""
+    channel = os.fdopen(os.dup(1), 'w', encoding='utf-8', newline='\n')
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+    return channel
+
+
+def _send(channel, message):
+    channel.write(json.dumps(message, ensure_ascii=False) + "\n"); channel.flush()
+
+
+class DotNetHost:
+    """O PersonaEditorCMD carregado no processo pelo pythonnet."""
+
+    def __init__(self, exe_path):
+        import pythonnet
+        runtime_config = os.path.splitext(exe_path)[0] + ".runtimeconfig.json"
+        if os.path.isfile(runtime_config):
+            pythonnet.load("coreclr", runtime_config=runtime_config)
+        else:
+            pythonnet.load()  # .NET Framework no Windows (e no Wine), Mono nos outros
+        import clr  # noqa: F401
+        from System import Array, Console, Environment, Object, String
+        from System.IO import StringWriter
+        from System.Reflection import Assembly
+        self.entry = Assembly.LoadFrom(os.path.abspath(exe_path)).EntryPoint
+        if self.entry is None:
+            raise ValueError(f"{exe_path} não tem ponto de entrada")
+        self.Array, self.Console, self.Environment, self.Object, self.String = Array, Console, Environment, Object, String
+        self.StringWriter = StringWriter
+
+    def run(self, cwd, args):
+        os.chdir(cwd); self.Environment.CurrentDirectory = cwd
+        out, err = self.StringWriter(), self.StringWriter()
+        self.Console.SetOut(out); self.Console.SetError(err)
+        parameters = [self.Array[self.String](args)] if self.entry.GetParameters().Length else []
+        try:
+            value = self.entry.Invoke(None, self.Array[self.Object](parameters))
+            code = 0 if value is None else int(value)
+        except Exception as e:
+            err.Write(str(e)); code = 1
+        return code, out.ToString(), err.ToString()
+
+
+class StandInHost:
+    """Stub do PEditorBench no lugar do executável (mesmos argumentos, mesma pasta)."""
+
+    def run(self, cwd, args):
+        from PEditorBench import stub_tool
+        os.chdir(cwd)
+        out, err = io.StringIO(), io.StringIO()
+        try:
+            with redirect_stdout(out), redirect_stderr(err):
+                code = stub_tool(args)
+        except Exception as e:
+            return 1, out.getvalue(), err.getvalue() + str(e)
+        return code, out.getvalue(), err.getvalue()
+
+
+def serve(exe_path, stand_in=False):
+    """Lado do worker: responde às linhas do driver até a entrada acabar."""
+    channel = _protocol_channel()
+    try:
+        host = StandInHost() if stand_in else DotNetHost(exe_path)
+        _send(channel, {"ready": True, "resident": True})
+    except Exception as e:
+        _send(channel, {"ready": True, "resident": False, "reason": f"{type(e).__name__}: {e}"})
+        return 1
+    sys.stdin.reconfigure(encoding='utf-8')
+    for line in sys.stdin:
+        if not line.strip():
+            break
+        request = json.loads(line)
+        code, stdout, stderr = host.run(request["cwd"], request["args"])
+        _send(channel, {"id": request["id"], "returncode": code, "stdout": stdout, "stderr": stderr})
+    return 0
+
+
+class _Worker:
+    def __init__(self, command):
+        startupinfo = None
+        if os.name == 'nt':
+            startupinfo = subprocess.STARTUPINFO(); startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        self.proc = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                     text=True, encoding='utf-8', errors='replace', startupinfo=startupinfo)
+        self.next_id = 0
+        hello = self._receive()
+        self.resident = bool(hello and hello.get("resident"))
+        self.reason = (hello or {}).get("reason", "o worker não respondeu")
+
+    def _receive(self):
+        try:
+            line = self.proc.stdout.readline()
+            return json.loads(line) if line.strip() else None
+        except (OSError, ValueError):
+            return None
+
+    def call(self, job):
+        """Resposta do worker para o job, ou None se ele morreu no meio."""
+        self.next_id += 1
+        try:
+            self.proc.stdin.write(json.dumps({"id": self.next_id, "cwd": job.cwd, "args": job.args}) + "\n")
+            self.proc.stdin.flush()
+        except OSError:
+            return None
+        reply = self._receive()
+        return reply if reply and reply.get("id") == self.next_id else None
+
+    def close(self, kill=False):
+        if self.proc.returncode is not None:
+            return
+        try:
+            if kill:
+                self.proc.kill()
+            else:
+                self.proc.stdin.write("\n"); self.proc.stdin.close()
+            self.proc.wait(timeout=WORKER_START_TIMEOUT)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            self.proc.kill(); self.proc.wait()
+
+
+class WorkerPool:
+    """Um worker residente por thread do BatchRunner, aberto no primeiro arquivo da thread.
+
+    run(job) devolve o Result, ou None quando o arquivo deve ir para um processo próprio
+    (modo residente indisponível; o motivo fica em `disabled`).
+    """
+
+    def __init__(self, exe_path, stand_in=False):
+        self.command = [sys.executable, os.path.abspath(__file__), "serve", exe_path] + (["--stand-in"] if stand_in else [])
+        self.disabled = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._workers = []
+
+    def _disable(self, reason):
+        with self._lock:
+            if self.disabled is None:
+                self.disabled = reason
+
+    def _worker(self):
+        worker = getattr(self._local, "worker", None)
+        if worker is None:
+            try:
+                worker = _Worker(self.command)
+            except OSError as e:
+                self._disable(str(e)); return None
+            with self._lock:
+                self._workers.append(worker)
+            if not worker.resident:
+                self._disable(worker.reason); worker.close(); return None
+            self._local.worker = worker
+        return worker
+
+    def run(self, job):
+        if self.disabled is not None:
+            return None
+        worker = self._worker()
+        if worker is None:
+            return None
+        start = time.perf_counter()
+        reply = worker.call(job)
+        if reply is None:
+            self._disable(f"o worker encerrou durante {os.path.basename(job.file_path)}")
+            self._local.worker = None; worker.close(kill=True)
+            return None
+        timing = Timing(start, 0.0, time.perf_counter() - start, *NO_USAGE)
+        return Result(job, reply["returncode"], reply.get("stdout", ""), reply.get("stderr", ""), timing=timing)
+
+    def close(self, kill=False):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close(kill)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Worker residente do PersonaEditorCMD (protocolo de linhas JSON).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="Roda um worker lendo jobs da entrada padrão")
+    serve_parser.add_argument("exe")
+    serve_parser.add_argument("--stand-in", action="store_true", help="Usa o stub do PEditorBench no lugar do executável")
+    args = parser.parse_args(argv)
+    return serve(args.exe, args.stand_in)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,2 +1 @@
-$files = Get-Childitem -Recurse -Force *.BF
-ForEach ($file in $files) {PersonaEditorCMD.exe $file -impptp /sub -save /ovrw}
\ No newline at end of file
+python PEditorCache.py PersonaEditorCMD.exe *.BF -impptp /sub -save /ovrw
\ No newline at end of file
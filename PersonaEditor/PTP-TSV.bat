@@ -1,2 +1 @@
-$files = Get-Childitem -Recurse -Force *.PTP
-ForEach ($file in $files) {PersonaEditorCMD.exe $file -exptext /sub}
\ No newline at end of file
+python PEditorPTP.py exptext .
\ No newline at end of file
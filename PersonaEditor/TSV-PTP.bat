@@ -1,2 +1 @@
-$files = Get-Childitem -Recurse -Force *.PTP
-ForEach ($file in $files) {PersonaEditorCMD.exe $file -imptext /sub /auto 600 -save /ovrw}
\ No newline at end of file
+python PEditorImport.py --exe PersonaEditorCMD.exe --auto 600 .
\ No newline at end of file
@@ -1,32 +1,368 @@
-import openpyxl
+"""Converte as abas de uma planilha XLSX em Text/<aba>.txt (TSV) e vice-versa.
+
+O XML das abas é lido direto do zip, em streaming, e as abas são convertidas em
+paralelo (um processo por aba). Um TSV só é regravado quando o conteúdo muda, então
+as abas sem alteração mantêm o mtime e não parecem sujas para o cache de importação.
+A saída é a mesma do openpyxl (read_only, values_only) + csv.writer com tabulação.
+
+Uso: python XLSX-TSV.py                          (input.xlsx -> Text/)
+     python XLSX-TSV.py planilha.xlsx --out Text [--workers N]
+     python XLSX-TSV.py --to-xlsx saida.xlsx [--text-dir Text]
+"""
+import argparse
 import csv
+import hashlib
+import io
 import os
+import posixpath
+import re
+import sys
+import xml.etree.ElementTree as ET
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape, quoteattr
+
+from openpyxl.formula.translate import Translator
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
 
 # Caminho do arquivo Excel
 excel_file = "input.xlsx"  # Substitua pelo caminho do seu arquivo Excel
-
-# Cria a pasta 'Text' se não existir
 output_dir = "Text"
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
-
-# Carrega o arquivo Excel
-workbook = openpyxl.load_workbook(excel_file, read_only=True)
-
-# Itera sobre todas as abas
-for sheet_name in workbook.sheetnames:
-    sheet = workbook[sheet_name]
-    
-    # Define o caminho do arquivo TSV
-    tsv_file = os.path.join(output_dir, f"{sheet_name}.txt")
-    
-    # Escreve diretamente como TSV
-    with open(tsv_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f, delimiter='\t', lineterminator='\n')
-        for row in sheet.iter_rows(values_only=True):
-            # Converte valores para string e lida com None
-            row = ['' if cell is None else str(cell) for cell in row]
-            writer.writerow(row)
-
-# Fecha o workbook
-workbook.close()
\ No newline at end of file
+
+NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+WORKSHEET_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"
+STRINGS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"
+STYLES_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"
+ROW, CELL, VALUE, FORMULA, INLINE = NS + "row", NS + "c", NS + "v", NS + "f", NS + "is"
+TEXT, RUN, DIMENSION = NS + "t", NS + "r", NS + "dimension"
+PARALLEL_MIN_BYTES = 4 << 20  # abaixo disso, abrir processos custa mais do que converter
+ILLEGAL_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_columns = {}
+
+
+def column_index(ref):
+    """'AB12' -> 28."""
+    letters = ref.rstrip("0123456789")
+    index = _columns.get(letters)
+    if index is None:
+        index = 0
+        for ch in letters:
+            index = index * 26 + ord(ch) - 64
+        _columns[letters] = index
+    return index
+
+
+def column_letter(index):
+    letters = ""
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _text_content(node):
+    """Texto de um <si>/<is>: <t> + <r><t>, sem o fonético (<rPh>), como o openpyxl."""
+    parts = []
+    for child in node:
+        if child.tag == TEXT:
+            parts.append(child.text or "")
+        elif child.tag == RUN:
+            t = child.find(TEXT)
+            if t is not None:
+                parts.append(t.text or "")
+    return "".join(parts)
+
+
+class Workbook:
+    """Estrutura da planilha: abas, textos compartilhados e estilos de data."""
+
+    def __init__(self, path):
+        self.path = path
+        with zipfile.ZipFile(path) as zf:
+            rels = self._rels(zf, "xl/_rels/workbook.xml.rels")
+            root = ET.fromstring(zf.read("xl/workbook.xml"))
+            pr = root.find(NS + "workbookPr")
+            date1904 = pr is not None and pr.get("date1904", "").lower() in ("1", "true")
+            self.epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+            self.sheets = []
+            for sheet in root.iter(NS + "sheet"):
+                rel = rels.get(sheet.get(REL_NS + "id"))
+                if rel and rel[0] == WORKSHEET_REL:
+                    self.sheets.append((sheet.get("name"), rel[1]))
+            targets = {kind: target for kind, target in rels.values()}
+            names = set(zf.namelist())
+            strings_path = targets.get(STRINGS_REL)
+            self.strings = self._read_strings(zf, strings_path) if strings_path in names else []
+            styles_path = targets.get(STYLES_REL)
+            self.date_styles, self.delta_styles = self._read_styles(zf, styles_path) if styles_path in names else (set(), set())
+            self.sizes = {name: zf.getinfo(path).file_size for name, path in self.sheets if path in names}
+
+    @staticmethod
+    def _rels(zf, path):
+        rels = {}
+        for rel in ET.fromstring(zf.read(path)).iter(PKG_REL_NS + "Relationship"):
+            target = rel.get("Target")
+            target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+            rels[rel.get("Id")] = (rel.get("Type"), target)
+        return rels
+
+    @staticmethod
+    def _read_strings(zf, path):
+        strings = []
+        with zf.open(path) as src:
+            for _, node in ET.iterparse(src):
+                if node.tag == NS + "si":
+                    strings.append(_text_content(node).replace('x005F_', '')); node.clear()
+        return strings
+
+    @staticmethod
+    def _read_styles(zf, path):
+        root = ET.fromstring(zf.read(path))
+        custom = {}
+        num_fmts = root.find(NS + "numFmts")
+        if num_fmts is not None:
+            for fmt in num_fmts.iter(NS + "numFmt"):
+                custom[int(fmt.get("numFmtId"))] = fmt.get("formatCode")
+        date_styles, delta_styles = set(), set()
+        xfs = root.find(NS + "cellXfs")
+        for idx, xf in enumerate(xfs.iter(NS + "xf") if xfs is not None else ()):
+            fmt_id = int(xf.get("numFmtId", 0))
+            fmt = custom.get(fmt_id, BUILTIN_FORMATS.get(fmt_id))
+            if is_date_format(fmt): date_styles.add(idx)
+            if is_timedelta_format(fmt): delta_styles.add(idx)
+        return date_styles, delta_styles
+
+    def iter_rows(self, zf, sheet_path):
+        """Valores de cada linha, com as mesmas lacunas preenchidas que o openpyxl em read_only."""
+        strings = self.strings; date_styles = self.date_styles
+        max_col = max_row = None
+        empty_row = []
+        counter = 1; row_idx = 0; shared_formulae = {}
+        with zf.open(sheet_path) as src:
+            for _, el in ET.iterparse(src):
+                tag = el.tag
+                if tag == DIMENSION:
+                    ref = el.get("ref", "")
+                    if ref:
+                        last = ref.split(":")[-1]
+                        max_col = column_index(last); max_row = int(last[len(last.rstrip("0123456789")):] or 0) or None
+                        empty_row = (None,) * max_col
+                    continue
+                if tag != ROW:
+                    continue
+                row_idx = int(float(el.get("r"))) if el.get("r") else row_idx + 1
+                if max_row is not None and row_idx > max_row:
+                    break
+                while counter < row_idx:
+                    counter += 1
+                    yield empty_row
+                if counter <= row_idx:
+                    counter += 1
+                    yield self._row_values(el, max_col, shared_formulae, strings, date_styles)
+                el.clear()
+
+    def _row_values(self, row, max_col, shared_formulae, strings, date_styles):
+        cells = []; col = 0
+        for c in row:
+            if c.tag != CELL:
+                continue
+            ref = c.get("r")
+            col = column_index(ref) if ref else col + 1
+            data_type = c.get("t", "n")
+            value = None if data_type == "inlineStr" else (c.findtext(VALUE) or None)
+            formula = c.find(FORMULA)
+            if formula is not None:
+                value = self._formula(formula, ref, shared_formulae)
+            elif value is not None:
+                if data_type == "n":
+                    value = float(value) if ("." in value or "E" in value or "e" in value) else int(value)
+                    style = int(c.get("s") or 0)
+                    if style in date_styles:
+                        try:
+                            value = from_excel(value, self.epoch, timedelta=style in self.delta_styles)
+                        except (OverflowError, ValueError):
+                            value = "#VALUE!"
+                elif data_type == "s":
+                    value = strings[int(value)]
+                elif data_type == "b":
+                    value = bool(int(value))
+                elif data_type == "d":
+                    value = from_ISO8601(value)
+            elif data_type == "inlineStr":
+                node = c.find(INLINE)
+                if node is not None:
+                    value = _text_content(node)
+            cells.append((col, value))
+        if not cells and not max_col:
+            return ()
+        width = max_col or cells[-1][0]
+        values = [None] * width
+        for col, value in cells:
+            if 1 <= col <= width:
+                values[col - 1] = value
+        return values
+
+    @staticmethod
+    def _formula(formula, ref, shared_formulae):
+        value = "=" + (formula.text or "")
+        if formula.get("t") == "shared":
+            idx = formula.get("si")
+            if idx in shared_formulae:
+                value = shared_formulae[idx].translate_formula(ref)
+            elif value != "=":
+                shared_formulae[idx] = Translator(value, ref)
+        return value
+
+
+def sheet_tsv(workbook, zf, sheet_path):
+    """Conteúdo do TSV de uma aba, exatamente como o csv.writer do script antigo gravava."""
+    out = io.StringIO()
+    writer = csv.writer(out, delimiter='\t', lineterminator='\n')
+    for row in workbook.iter_rows(zf, sheet_path):
+        writer.writerow(['' if cell is None else str(cell) for cell in row])
+    return out.getvalue().encode('utf-8')
+
+
+def write_if_changed(path, data):
+    """Grava `data` em `path` só se o hash do conteúdo mudou. Devolve True se gravou."""
+    if os.path.isfile(path) and os.path.getsize(path) == len(data):
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        if h.digest() == hashlib.blake2b(data, digest_size=16).digest():
+            return False
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+_worker_workbook = None
+
+
+def _init_worker(xlsx_path):
+    global _worker_workbook
+    _worker_workbook = Workbook(xlsx_path)
+
+
+def _convert_sheet(args, workbook=None):
+    sheet_name, sheet_path, out_dir = args
+    workbook = workbook or _worker_workbook
+    with zipfile.ZipFile(workbook.path) as zf:
+        data = sheet_tsv(workbook, zf, sheet_path)
+    return sheet_name, write_if_changed(os.path.join(out_dir, f"{sheet_name}.txt"), data)
+
+
+def xlsx_to_tsv(xlsx_path, out_dir, workers=None):
+    """Converte todas as abas; devolve [(aba, regravada?)] na ordem da planilha."""
+    os.makedirs(out_dir, exist_ok=True)
+    workbook = Workbook(xlsx_path)
+    tasks = [(name, path, out_dir) for name, path in workbook.sheets]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers > 1 and sum(workbook.sizes.values()) >= PARALLEL_MIN_BYTES:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(xlsx_path,)) as pool:
+            return list(pool.map(_convert_sheet, tasks))
+    return [_convert_sheet(task, workbook) for task in tasks]
+
+
+def _xml_text(value):
+    return escape(ILLEGAL_XML.sub(lambda m: f"_x{ord(m.group()):04X}_", value))
+
+
+def _write_sheet(zf, name, tsv_path):
+    """Grava uma aba linha a linha a partir do TSV (textos inline, inteiros como número).
+
+    Células vazias são omitidas, menos a última da linha, que guarda a quantidade de colunas.
+    """
+    with zf.open(name, 'w', force_zip64=True) as raw, io.TextIOWrapper(raw, encoding='utf-8', newline='') as out:
+        out.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                  f'<worksheet xmlns="{NS[1:-1]}"><sheetData>')
+        with open(tsv_path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+            for row_no, row in enumerate(csv.reader(f, delimiter='\t'), 1):
+                out.write(f'<row r="{row_no}">')
+                for col, value in enumerate(row, 1):
+                    if value == "" and col < len(row):
+                        continue
+                    ref = f"{column_letter(col)}{row_no}"
+                    if value.isdigit() and str(int(value)) == value:
+                        out.write(f'<c r="{ref}"><v>{value}</v></c>')
+                    else:
+                        out.write(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{_xml_text(value)}</t></is></c>')
+                out.write('</row>')
+        out.write('</sheetData></worksheet>')
+
+
+def tsv_to_xlsx(tsv_paths, xlsx_path):
+    """Monta uma planilha com uma aba por TSV (nome da aba = nome do arquivo sem extensão)."""
+    names = [os.path.splitext(os.path.basename(p))[0] for p in tsv_paths]
+    tmp_path = xlsx_path + ".tmp"
+    with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        sheets = "".join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                         for i in range(1, len(names) + 1))
+        zf.writestr("[Content_Types].xml",
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                    '<Default Extension="xml" ContentType="application/xml"/>'
+                    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+                    f'{sheets}</Types>')
+        zf.writestr("_rels/.rels",
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    f'<Relationships xmlns="{PKG_REL_NS[1:-1]}">'
+                    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+                    '</Relationships>')
+        zf.writestr("xl/workbook.xml",
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    f'<workbook xmlns="{NS[1:-1]}" xmlns:r="{REL_NS[1:-1]}"><sheets>'
+                    + "".join(f'<sheet name={quoteattr(name)} sheetId="{i}" r:id="rId{i}"/>' for i, name in enumerate(names, 1))
+                    + '</sheets></workbook>')
+        zf.writestr("xl/_rels/workbook.xml.rels",
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    f'<Relationships xmlns="{PKG_REL_NS[1:-1]}">'
+                    + "".join(f'<Relationship Id="rId{i}" Type="{WORKSHEET_REL}" Target="worksheets/sheet{i}.xml"/>' for i in range(1, len(names) + 1))
+                    + f'<Relationship Id="rId{len(names) + 1}" Type="{STYLES_REL}" Target="styles.xml"/></Relationships>')
+        zf.writestr("xl/styles.xml",
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    f'<styleSheet xmlns="{NS[1:-1]}">'
+                    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+                    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+                    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+                    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+                    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+                    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+                    '</styleSheet>')
+        for i, tsv_path in enumerate(tsv_paths, 1):
+            _write_sheet(zf, f"xl/worksheets/sheet{i}.xml", tsv_path)
+    os.replace(tmp_path, xlsx_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Converte as abas de uma planilha em TSVs da pasta Text/ (ou o contrário).")
+    parser.add_argument("xlsx", nargs="?", default=excel_file, help="Planilha de entrada (padrão: %(default)s)")
+    parser.add_argument("--out", default=output_dir, help="Pasta dos TSVs (padrão: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None, help="Processos simultâneos (padrão: nº de CPUs)")
+    parser.add_argument("--to-xlsx", metavar="SAIDA", help="Gera a planilha SAIDA a partir dos TSVs de --text-dir")
+    parser.add_argument("--text-dir", default=output_dir, help="Pasta dos TSVs para --to-xlsx (padrão: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.to_xlsx:
+        tsv_paths = sorted(os.path.join(args.text_dir, f) for f in os.listdir(args.text_dir) if f.lower().endswith((".txt", ".tsv")))
+        tsv_to_xlsx(tsv_paths, args.to_xlsx)
+        print(f"{len(tsv_paths)} aba(s) gravada(s) em {args.to_xlsx}.")
+        return 0
+
+    results = xlsx_to_tsv(args.xlsx, args.out, args.workers)
+    for name, written in results:
+        if written: print(f"Atualizado: {name}.txt")
+    print(f"{sum(1 for _, w in results if w)} de {len(results)} aba(s) alterada(s).")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())